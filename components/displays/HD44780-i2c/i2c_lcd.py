@@ -5,8 +5,12 @@ from time import *
 import time
 import subprocess
 import numpy
+import os
+import sys
 # import datetime
-from mpd import MPDClient
+# the MPD state is shared with the other python daemons in scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', '..', 'scripts'))
+from mpd_state import MpdState  # noqa: E402
 # constants
 mylcd = i2c_lcd_driver.lcd()
 info_at_lines_play = [" "] * 4
@@ -251,12 +255,10 @@ def sec_to_min_and_sec(seconds):
 
 ######### BEGIN OF CODE ################################
 ##  init mpd-client
-try:
-    client = MPDClient()
-    client.timeout = 0.3
-    client.connect("localhost", 6600)                               #
-except Exception:  # if reconnect isn't possible, client is not running  #
-    print("mpd not avalible")
+# the player state is updated in the background when MPD reports a change (idle),
+# the display loop only reads it and does not ask MPD every cycle
+mpd_state = MpdState("localhost", 6600)
+mpd_state.start()
 if use_state_icons == "yes":
     mylcd.lcd_load_custom_chars(user_icons)
 try:
@@ -271,21 +273,10 @@ try:
         #################################################################################
 
         ########################## GET STATE ############################################
-        try:                                                                            #
-            client.ping()  # test if client is up                                    #
-            status = client.status()                                                  #
-            state = status['state']                                                   #
-            current_song_infos = client.currentsong()                                 #
-        except Exception:                                                               #
-            try:  # if client is not connected, try to reconnect                     #
-                client = MPDClient()                                            #
-                client.timeout = 0.3                                              #
-                client.connect("localhost", 6600)                               #
-                status = client.status()                                          #
-                state = status['state']                                           #
-                current_song_infos = client.currentsong()                         #
-            except Exception:  # if reconnect isn't possible, client is not running  #
-                state = "not_running"                                             #
+        player = mpd_state.state  # the latest state, "not_running" if MPD can't be reached #
+        status = player.status                                                          #
+        current_song_infos = player.song                                                #
+        state = player.state                                                            #
         # it is running, get more details                                               #
         #################################################################################
         ########### RESTART COUNTER, IF STATE CHANGED####################################
@@ -343,9 +334,9 @@ try:
                     artist = artist.replace("\n", "").replace("ä", "\341").replace("ö", "\357").replace("ü", "\365").replace("ß", "\342").replace("Ä", "\341").replace("Ö", "\357").replace("Ü", "\365")  # weitere codes siehe https://www.mikrocontroller.net/topic/293125                         #
                 except KeyError:                                                                  #
                     artist = ""                                                               #
-            if (client.mpd_version) >= "0.20":
+            if (player.mpd_version) >= "0.20":
                 try:                                                                              #
-                    elapsed = status['elapsed'].split(".")[0]                                   #
+                    elapsed = player.elapsed  # counts on while playing                         #
                     duration = status['duration'].split(".")[0]                                 #
                     track_time = sec_to_min_and_sec(elapsed) + "/" + sec_to_min_and_sec(duration)  #
                 except KeyError:                                                                  #
@@ -427,5 +418,4 @@ except KeyboardInterrupt:
         lines[3] = print_nothing()
     for row in range(n_rows):
         print_changes(lines[row], last_lines[row], row + 1)
-    client.close()                     # send the close command
-    client.disconnect()                # disconnect from the server
+    mpd_state.stop()                   # disconnect from the server
@@ -3,11 +3,14 @@
 import paho.mqtt.client as mqtt
 import os, subprocess, re, ssl, time, datetime
 
+from mpd_state import MpdState
+
 
 # ----------------------------------------------------------
 #  Prerequisites
 # ----------------------------------------------------------
 # pip3 install paho-mqtt
+# python-mpd2 (installed with the Phoniebox), this script has to be in the scripts folder for mpd_state.py
 
 
 # ----------------------------------------------------------
@@ -37,6 +40,16 @@ path = os.path.dirname(os.path.realpath(__file__))
 # internal refresh interval
 refreshInterval = refreshIntervalPlaying
 
+# player state of MPD, updated when MPD reports a change
+mpd = MpdState()
+
+# attributes which are taken from the MPD state and published as soon as they change
+arMpdAttributes = ['state', 'volume', 'mute', 'repeat', 'random', 'file', 'artist', 'albumartist', 'title', 'album',
+                   'track', 'trackdate', 'duration']
+
+# last published value of every attribute, so unchanged values are not published again
+lastPublished = {}
+
 # list of available commands and attributes
 arAvailableCommands = ['volumeup', 'volumedown', 'mute', 'playerplay', 'playerpause', 'playernext', 'playerprev', 'playerstop', 'playerrewind', 'playershuffle', 'playerreplay', 'scan', 'shutdown', 'shutdownsilent', 'reboot', 'disablewifi']
 arAvailableCommandsWithParam = ['setvolume', 'setvolstep', 'setmaxvolume', 'setidletime', 'playerseek', 'shutdownafter', 'playerstopafter', 'playerrepeat', 'rfid', 'gpio', 'swipecard', 'playfolder', 'playfolderrecursive']
@@ -159,6 +172,7 @@ def processGet(attribute):
     if attribute == "all":
         for attribute in mpd_status:
             client.publish(mqttBaseTopic + "/attribute/" + attribute, payload=mpd_status[attribute])
+            lastPublished[attribute] = mpd_status[attribute]
             print(" --> Publishing response " + attribute + " = " + mpd_status[attribute])
 
     # list all possible attributes
@@ -266,30 +280,26 @@ def normalizeTrueFalse(s):
         return "true"
 
 
-def regex(needle, hay, exception="-"):
-    regex_extract = re.search(needle, hay)
-    if regex_extract:
-        return regex_extract.group(1)
-    else:
-        return exception
-
+def mpdValue(values, key, exception="-"):
+    value = values.get(key, exception)
+    # tags which are set more than once are returned as list
+    if isinstance(value, list):
+        value = value[0]
+    return value
 
-def fetchData():
-    # use global refreshInterval as this function is run as a thread through the paho-mqtt loop
-    global refreshInterval
 
+def fetchMpdData(player):
     result = {}
 
-    # fetch status from MPD
-    cmd = ['nc', '-w', '1', 'localhost', '6600']
-    input = 'status\ncurrentsong\nclose'.encode('utf-8')
-    status = subprocess.run(cmd, stdout=subprocess.PIPE, input=input).stdout.decode('utf-8')
+    # status and current song of the latest MPD state (no request to MPD)
+    status = player.status
+    song = player.song
 
     # interpret status
-    result["state"] = regex('\nstate: (.*)\n', status).lower()
-    result["volume"] = regex('\nvolume: (.*)\n', status)
-    result["repeat"] = normalizeTrueFalse(regex('\nrepeat: (.*)\n', status))
-    result["random"] = normalizeTrueFalse(regex('\nrandom: (.*)\n', status))
+    result["state"] = mpdValue(status, 'state').lower()
+    result["volume"] = mpdValue(status, 'volume')
+    result["repeat"] = normalizeTrueFalse(mpdValue(status, 'repeat'))
+    result["random"] = normalizeTrueFalse(mpdValue(status, 'random'))
 
     # interpret mute state based on volume
     if result["volume"] == "0":
@@ -300,27 +310,46 @@ def fetchData():
     # interpret metadata when in play/pause mode
     if result["state"] != "stop":
 
-        result["file"] = regex('\nfile: (.*)\n', status)
-        result["artist"] = regex('\nArtist: (.*)\n', status)
-        result["albumartist"] = regex('\nAlbumArtist: (.*)\n', status)
-        result["title"] = regex('\nTitle: (.*)\n', status)
-        result["album"] = regex('\nAlbum: (.*)\n', status)
-        result["track"] = regex('\nTrack: (.*)\n', status, "0")
-        result["trackdate"] = regex('\nDate: (.*)\n', status)
+        result["file"] = mpdValue(song, 'file')
+        result["artist"] = mpdValue(song, 'artist')
+        result["albumartist"] = mpdValue(song, 'albumartist')
+        result["title"] = mpdValue(song, 'title')
+        result["album"] = mpdValue(song, 'album')
+        result["track"] = mpdValue(song, 'track', "0")
+        result["trackdate"] = mpdValue(song, 'date')
 
         if result["title"] == "-":
             result["title"] = result["file"]
 
-        elapsed = int(float(regex('\nelapsed: (.*)\n', status, "0")))
+        elapsed = int(player.elapsed)
         hours, remainder = divmod(elapsed, 3600)
         minutes, seconds = divmod(remainder, 60)
         result["elapsed"] = '{:02}:{:02}:{:02}'.format(int(hours), int(minutes), int(seconds))
 
-        duration = int(float(regex('\nduration: (.*)\n', status, "0")))
+        duration = int(float(mpdValue(status, 'duration', "0")))
         hours, remainder = divmod(duration, 3600)
         minutes, seconds = divmod(remainder, 60)
         result["duration"] = '{:02}:{:02}:{:02}'.format(int(hours), int(minutes), int(seconds))
 
+    return result
+
+
+def publishMpdChanges(player, changes):
+    # called by MpdState when MPD reported a change: publish the changed attributes at once
+    result = fetchMpdData(player)
+    for attribute in arMpdAttributes:
+        if attribute in result and lastPublished.get(attribute) != result[attribute]:
+            client.publish(mqttBaseTopic + "/attribute/" + attribute, payload=result[attribute])
+            lastPublished[attribute] = result[attribute]
+            print(" --> Publishing change " + attribute + " = " + result[attribute])
+
+
+def fetchData():
+    # use global refreshInterval as this function is run as a thread through the paho-mqtt loop
+    global refreshInterval
+
+    result = fetchMpdData(mpd.state)
+
     # fetch some more data from global.conf (via playout_controls.sh)
     result["maxvolume"] = subprocess.run([path + "/playout_controls.sh", "-c=getmaxvolume"], stdout=subprocess.PIPE).stdout.decode('utf-8').rstrip()
     result["volstep"] = subprocess.run([path + "/playout_controls.sh", "-c=getvolstep"], stdout=subprocess.PIPE).stdout.decode('utf-8').rstrip()
@@ -388,6 +417,9 @@ client.subscribe(mqttBaseTopic + "/get/#")
 
 # start endless loop
 client.loop_start()
+# changes of MPD are published at once, the rest every refreshInterval
+mpd.subscribe(publishMpdChanges)
+mpd.start()
 while True:
     processGet("all")
     time.sleep(refreshInterval)
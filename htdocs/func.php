@@ -275,6 +275,31 @@ function dir_list_recursively($rootdir = "") {
     return $paths;
 }
 
+function manifest_tracks($audioFoldersPath, $folder) {
+  /*
+  * Get the sorted track names of an audio folder from its manifest
+  * in shared/manifests (written by scripts/playlist_manifest.py).
+  * Returns false if there is no manifest or the folder was changed
+  * after the manifest was written.
+  */
+
+    $folderRel = substr($folder, strlen($audioFoldersPath) + 1);
+    $manifestFile = dirname(__FILE__).'/../shared/manifests/'.str_replace('/', ' % ', $folderRel).'.json';
+    if(!file_exists($manifestFile)) {
+        return false;
+    }
+    $manifest = json_decode(file_get_contents($manifestFile), true);
+    if(!is_array($manifest) || $manifest['version'] != 1) {
+        return false;
+    }
+    // the modification time is only known in seconds here, so the manifest
+    // must have been written in a later second than the last change
+    if($manifest['mtime'] != filemtime($folder) || $manifest['mtime'] >= $manifest['built']) {
+        return false;
+    }
+    return array_column($manifest['tracks'], 'name');
+}
+
 function index_folders_print($item, $key)
 {
     global $lang;
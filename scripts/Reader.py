@@ -3,61 +3,65 @@
 # This might create problems in recognizing the reader you are using.
 # We haven't found the silver bullet yet. If you can contribute to this
 # quest, please comment in the issue thread or create pull requests.
-# ALTERNATIVE SCRIPTS:
-# If you encounter problems with this script Reader.py
-# consider and test one of the alternatives in the same scripts folder.
-# Replace the Reader.py file with one of the following files:
-# * Reader.py.experimental
-#     This alternative Reader.py script was meant to cover not only USB readers but more.
-#     It can be used to replace Reader.py if you have readers such as
-#     MFRC522, RDM6300 or PN532.
-# * Reader.py.kkmoonRFIDreader
-#     KKMOON RFID Reader which appears twice in the devices list as HID 413d:2107
-#     and this required to check "if" the device is a keyboard.
-
-# import string
-# import csv
+#
+# Reader.py reads the card ids of the reader(s) registered in deviceName.txt
+# (see RegisterDevice.py and RegisterDevice.py.Multi). The backends for the
+# different readers are in the readers package:
+# * readers/usb.py      USB readers which act like a keyboard (e.g. Neuftech, KKMOON)
+# * readers/mfrc522.py  MFRC522 (RC522) on the SPI bus
+# * readers/rdm6300.py  RDM6300 on the serial port
+# * readers/pn532.py    PN532 on the I2C bus
+# * readers/pcsc.py     PC/SC readers through pcscd
+# Only the backends of the registered readers are imported.
+
+import logging
 import os.path
+import queue
 import sys
+import threading
 
-from evdev import InputDevice, ecodes, list_devices
-from select import select
+from readers import create_readers, get_devices, read_device_file  # noqa: F401 (get_devices for RegisterDevice.py)
 
+logger = logging.getLogger(__name__)
 
-def get_devices():
-    return [InputDevice(fn) for fn in list_devices()]
 
+class Reader(object):
+    """ the registered readers
 
-class Reader:
-    reader = None
+        readers: the reader backends, see readers.base.CardReader
+        reader: the backend if there is only one, otherwise the Reader itself
+    """
 
     def __init__(self):
-        self.reader = self
         path = os.path.dirname(os.path.realpath(__file__))
-        self.keys = "X^1234567890XXXXqwertzuiopXXXXasdfghjklXXXXXyxcvbnmXXXXXXXXXXXXXXXXXXXXXXX"
-        if not os.path.isfile(path + '/deviceName.txt'):
+        device_file = os.path.join(path, 'deviceName.txt')
+        if not os.path.isfile(device_file):
+            sys.exit('Please run RegisterDevice.py first')
+        entries = read_device_file(device_file)
+        if not entries:
             sys.exit('Please run RegisterDevice.py first')
-        else:
-            with open(path + '/deviceName.txt', 'r') as f:
-                deviceName = f.read()
-            devices = get_devices()
-            for device in devices:
-                if device.name == deviceName:
-                    self.dev = device
-                    break
-            try:
-                self.dev
-            except:
-                sys.exit('Could not find the device %s\n. Make sure is connected' % deviceName)
+        self.readers = create_readers(entries)
+        self.reader = self.readers[0] if len(self.readers) == 1 else self
+        self.cards = None
 
     def readCard(self):
-        stri = ''
-        key = ''
-        while key != 'KEY_ENTER':
-            r, w, x = select([self.dev], [], [])
-            for event in self.dev.read():
-                if event.type == 1 and event.value == 1:
-                    stri += self.keys[event.code]
-                    # print( keys[ event.code ] )
-                    key = ecodes.KEY[event.code]
-        return stri[:-1]
+        """ block until any of the readers read a card, returns the card id """
+        if len(self.readers) == 1:
+            return self.readers[0].readCard()
+        if self.cards is None:
+            self.cards = queue.Queue()
+            for reader in self.readers:
+                thread = threading.Thread(target=self._read, args=(reader,), name='card-reader')
+                thread.daemon = True
+                thread.start()
+        return self.cards.get()
+
+    def _read(self, reader):
+        while True:
+            cardid = reader.readCard()
+            if cardid is not None:
+                self.cards.put(cardid)
+
+    def cleanup(self):
+        for reader in self.readers:
+            reader.cleanup()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Card ids of the different reader backends
+#
+# Every backend reports the card id it always did (legacy format):
+# * MFRC522  decimal values of the UID bytes and the check byte, without separator
+# * PN532    the UID as one decimal number
+# * PCSC     hex digits of the UID followed by the status bytes (9000)
+# * RDM6300  12 hex digits (version, 4 data bytes, checksum) or the
+#            card_id_dec / card_id_float number format
+# * USB      whatever digits the reader types
+# So the same card gets a different card id (and shortcut) on every kind of reader.
+#
+# Backends which know the UID of the card return a CardId, which is the
+# legacy card id and carries the canonical card id, computed once when the
+# card is read: the UID as one decimal number, padded with zeros to the
+# digits of the largest UID of its length (10 digits for 4 bytes, like the
+# card_id_dec format of the RDM6300 and most USB readers). Card ids have to
+# stay digits, because inc.writeGlobalConfig.sh drops everything else.
+#
+# With Card_Id_Format set to CANONICAL (settings/Card_Id_Format) the daemon
+# uses the canonical card ids. The ids of USB readers are the same in both
+# formats. helperscripts/migrate_card_ids.py renames the shortcuts and
+# changes the control cards of a box to the canonical format.
+
+import itertools
+
+LEGACY = 'LEGACY'
+CANONICAL = 'CANONICAL'
+FORMATS = (LEGACY, CANONICAL)
+
+
+def canonical_card_id(uid):
+    """ canonical card id of the UID bytes """
+    width = len(str(256 ** len(uid) - 1))
+    return '{0:0{width}d}'.format(int.from_bytes(bytes(uid), 'big'), width=width)
+
+
+class CardId(str):
+    """ legacy card id of a card whose UID is known
+
+        uid: the UID bytes
+        canonical: the canonical card id
+    """
+
+    def __new__(cls, legacy, uid):
+        card_id = str.__new__(cls, legacy)
+        card_id.uid = bytes(uid)
+        card_id.canonical = canonical_card_id(uid)
+        return card_id
+
+
+def normalize(cardid, card_id_format):
+    """ the card id in the given format (the legacy one if the UID is not known) """
+    if card_id_format == CANONICAL and isinstance(cardid, CardId):
+        return cardid.canonical
+    return cardid
+
+
+# Reading the UID back out of legacy card ids (for migrate_card_ids.py).
+# Each function returns the UID bytes or None if the card id can not be
+# converted.
+
+def mfrc522_uid(cardid):
+    """ the decimal numbers have no separator, so all ways of splitting the card id into
+        5 numbers are tried; it is only converted if there is exactly one split with a
+        matching check byte
+    """
+    if not cardid.isdigit() or not 5 <= len(cardid) <= 15:
+        return None
+    found = []
+    for lengths in itertools.product((1, 2, 3), repeat=5):
+        if sum(lengths) != len(cardid):
+            continue
+        values = []
+        start = 0
+        for length in lengths:
+            part = cardid[start:start + length]
+            start += length
+            if (length > 1 and part[0] == '0') or int(part) > 255:
+                break
+            values.append(int(part))
+        else:
+            if values[0] ^ values[1] ^ values[2] ^ values[3] == values[4]:
+                found.append(values[:4])
+    return bytes(found[0]) if len(found) == 1 else None
+
+
+def pn532_uid(cardid):
+    if not cardid.isdigit():
+        return None
+    value = int(cardid)
+    # UIDs have 4, 7 or 10 bytes, leading zero bytes were lost in the decimal number
+    for length in (4, 7, 10):
+        if value < 256 ** length:
+            return value.to_bytes(length, 'big')
+    return None
+
+
+def pcsc_uid(cardid):
+    if not cardid.endswith('9000'):
+        return None
+    try:
+        uid = bytes.fromhex(cardid[:-4])
+    except ValueError:
+        return None
+    return uid or None
+
+
+def rdm6300_uid(cardid):
+    """ the 4 data bytes of any of the number formats, the version byte is ignored
+        like the card_id_dec and card_id_float formats always did
+    """
+    if ',' in cardid:
+        high, _, low = cardid.partition(',')
+        if not high.isdigit() or not low.isdigit() or int(high) > 0xFFFF or int(low) > 0xFFFF:
+            return None
+        return ((int(high) << 16) + int(low)).to_bytes(4, 'big')
+    if len(cardid) == 10 and cardid.isdigit() and int(cardid) <= 0xFFFFFFFF:
+        return int(cardid).to_bytes(4, 'big')
+    if len(cardid) == 12:
+        try:
+            return bytes.fromhex(cardid)[1:5]
+        except ValueError:
+            return None
+    return None
+
+
+LEGACY_UIDS = {
+    'MFRC522': mfrc522_uid,
+    'PN532': pn532_uid,
+    'PCSC': pcsc_uid,
+    'RDM6300': rdm6300_uid,
+}
+
+
+def migrate(cardids, backend):
+    """ canonical card ids of the legacy card ids of a backend
+        returns a dict legacy card id: canonical card id without the card ids which can not be converted
+    """
+    legacy_uid = LEGACY_UIDS[backend]
+    canonical = {}
+    for cardid in cardids:
+        uid = legacy_uid(cardid)
+        if uid is not None:
+            canonical[cardid] = canonical_card_id(uid)
+    return canonical
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# In-memory index of shared/shortcuts and the audio folders for the playback engine
+#
+# The index holds card id -> audio folder (the first line of the shortcut)
+# and audio folder -> the sorted track list of the folder, so a swipe of a
+# known card neither reads the shortcut nor lists the folder again.
+#
+# The index is kept current by the FileWatcher of the daemon: the shortcuts
+# folder and every audio folder in the index are watched (inotify if
+# available). A changed shortcut is read again, a changed audio folder is
+# listed again the next time it is played. An audio folder which is
+# deleted (or moved away) loses its watch and is watched again when it is
+# listed the next time. Without a watcher nothing is
+# cached in memory and every lookup goes to the file system (or the
+# manifest of the folder, see playlist_manifest.py).
+
+import collections
+import functools
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# files which are never part of a playlist (see playlist_recursive_by_folder.php)
+IGNORED_FILES = ('folder.conf', 'cover.jpg', 'title.txt', 'Thumbs.db')
+IGNORED_EXTENSIONS = ('.m3u', '.png')
+
+natural_split_re = re.compile(r'(\d+)')
+
+# names: all entries of the folder, tracks: the files of the playlist in playing order
+FolderContents = collections.namedtuple('FolderContents', ['names', 'tracks'])
+
+
+def natural_sort_key(name):
+    """ sort key equivalent to php's strnatcasecmp """
+    return [int(part) if part.isdigit() else part for part in natural_split_re.split(name.lower())]
+
+
+def read_shortcut(path):
+    """ the audio folder of a shortcut or None """
+    try:
+        with open(path, 'r') as f:
+            return f.readline().strip() or None
+    except (IOError, OSError):
+        return None
+
+
+def is_track(entry):
+    """ True if the os.DirEntry is part of the playlist of its folder """
+    if entry.name.startswith('.') or entry.name in IGNORED_FILES or entry.name.lower().endswith(IGNORED_EXTENSIONS):
+        return False
+    return not entry.is_dir()
+
+
+def list_folder(folder_path):
+    """ python version of playlist_recursive_by_folder.php for a folder of local files
+        returns FolderContents or None if the folder does not exist
+    """
+    try:
+        entries = list(os.scandir(folder_path))
+    except OSError:
+        return None
+    tracks = sorted((entry.name for entry in entries if is_track(entry)), key=natural_sort_key)
+    return FolderContents(frozenset(entry.name for entry in entries), tracks)
+
+
+class CardIndex(object):
+    """ card id -> audio folder -> track list
+
+        folder(cardid): the audio folder assigned to the card or None
+        contents(folder, folder_path): FolderContents of an audio folder or None
+        manifests: playlist_manifest.ManifestCache the folders are listed through or None
+    """
+
+    def __init__(self, shortcuts_path, watcher=None, manifests=None):
+        self.shortcuts_path = shortcuts_path
+        self.watcher = watcher
+        self.manifests = manifests
+        # card id: audio folder, None until the shortcuts are read
+        self.cards = None
+        # folder path: FolderContents
+        self.folders = {}
+        self.watched = set()
+        if watcher is not None:
+            watcher.watch_directory(shortcuts_path, self.on_shortcut_changed)
+
+    def load(self):
+        cards = {}
+        try:
+            names = os.listdir(self.shortcuts_path)
+        except OSError as e:
+            logger.error('Could not read the shortcuts: {e}'.format(e=e))
+            names = []
+        for name in names:
+            folder = read_shortcut(os.path.join(self.shortcuts_path, name))
+            if folder is not None:
+                cards[name] = folder
+        self.cards = cards
+        logger.debug('{count} shortcuts in the card index'.format(count=len(cards)))
+
+    def folder(self, cardid):
+        if self.watcher is None:
+            return read_shortcut(os.path.join(self.shortcuts_path, cardid))
+        if self.cards is None:
+            self.load()
+        return self.cards.get(cardid)
+
+    def on_shortcut_changed(self, name):
+        if self.cards is None:
+            return
+        if name is None:
+            # read all shortcuts again on the next lookup
+            self.cards = None
+            return
+        folder = read_shortcut(os.path.join(self.shortcuts_path, name))
+        if folder is None:
+            self.cards.pop(name, None)
+        else:
+            self.cards[name] = folder
+
+    def list(self, folder, folder_path):
+        if self.manifests is not None:
+            return self.manifests.contents(folder, folder_path)
+        return list_folder(folder_path)
+
+    def contents(self, folder, folder_path):
+        if self.watcher is None:
+            return self.list(folder, folder_path)
+        contents = self.folders.get(folder_path)
+        if contents is None:
+            contents = self.list(folder, folder_path)
+            if contents is None:
+                return None
+            self.folders[folder_path] = contents
+            if folder_path not in self.watched:
+                self.watched.add(folder_path)
+                self.watcher.watch_directory(folder_path, functools.partial(self.on_folder_changed, folder_path),
+                                             functools.partial(self.on_folder_removed, folder_path))
+        return contents
+
+    def on_folder_changed(self, folder_path, name):
+        # the engine saves the position in folder.conf, which does not change the track list
+        if name == 'folder.conf' and os.path.isfile(os.path.join(folder_path, name)):
+            return
+        self.folders.pop(folder_path, None)
+
+    def on_folder_removed(self, folder_path):
+        self.folders.pop(folder_path, None)
+        self.watched.discard(folder_path)
+
+    def preload(self, audiofolders_path):
+        """ read the shortcuts and list all assigned audio folders """
+        if self.watcher is None:
+            return
+        self.load()
+        for folder in set(self.cards.values()):
+            self.contents(folder, os.path.join(audiofolders_path, folder))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# Card presence detection for the PLACENOTSWIPE mode of daemon_rfid_reader.py
+#
+# Readers which can tell if a card is in the field (they implement pollCard())
+# are polled every poll_interval seconds. A card counts as removed when it was
+# missing for removal_polls polls in a row AND removal_timeout seconds passed
+# since it was seen last (hysteresis against single failed reads).
+# For all other readers a card counts as removed if it was not read again
+# within removal_timeout seconds. A poll which fails (SPI, serial or PC/SC
+# error) counts as a missed card, polling goes on.
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CardPresenceTracker(object):
+    """ turns card reads into card placed / card removed events """
+
+    def __init__(self, loop, on_placed, on_removed, removal_timeout=1.0, removal_polls=2):
+        self.loop = loop
+        self.on_placed = on_placed
+        self.on_removed = on_removed
+        self.removal_timeout = removal_timeout
+        self.removal_polls = removal_polls
+        self.cardid = None
+        self.last_seen = 0
+        self.missed_polls = 0
+        self.timer = None
+
+    def card_seen(self, cardid):
+        """ a card was read, report it if it was not present before """
+        self.last_seen = time.monotonic()
+        self.missed_polls = 0
+        if cardid != self.cardid:
+            self.cardid = cardid
+            logger.debug('Card {cardid} placed'.format(cardid=cardid))
+            self.on_placed(cardid)
+
+    def card_missed(self):
+        """ a poll found no card in the field """
+        self.missed_polls += 1
+        if self.cardid is not None and self.missed_polls >= self.removal_polls:
+            self.check()
+
+    def check(self):
+        """ report the card as removed if it was not seen for removal_timeout """
+        if self.cardid is not None and time.monotonic() - self.last_seen >= self.removal_timeout:
+            logger.debug('Card {cardid} removed'.format(cardid=self.cardid))
+            self.cardid = None
+            self.on_removed()
+
+    def card_read(self, cardid):
+        """ card read by a reader without presence polling, removal is detected by timeout """
+        if self.timer is not None:
+            self.timer.cancel()
+        self.card_seen(cardid)
+        self.timer = self.loop.call_later(self.removal_timeout, self.check)
+
+    def start_polling(self, reader, poll_interval=0.05):
+        """ poll reader.pollCard() every poll_interval seconds """
+        failing = False
+
+        def poll():
+            nonlocal failing
+            try:
+                cardid = reader.pollCard()
+            except Exception as e:
+                # logged once and not on every poll while the reader keeps failing
+                if not failing:
+                    logger.error('Polling the reader failed: {e}'.format(e=e))
+                    failing = True
+                cardid = None
+            else:
+                if failing:
+                    logger.info('Polling the reader works again')
+                    failing = False
+            try:
+                if cardid is None:
+                    self.card_missed()
+                else:
+                    self.card_seen(cardid)
+            finally:
+                self.loop.call_later(poll_interval, poll)
+        poll()
@@ -4,10 +4,14 @@ import logging
 import os
 import subprocess
 import time
-import re
-import signal
 
 from Reader import Reader
+from card_ids import normalize
+from card_presence import CardPresenceTracker
+from event_loop import EventLoop, add_card_reader, add_multi_card_reader
+from file_watcher import FileWatcher
+from playback_engine import PlaybackEngine
+from reader_settings import ReaderSettingsCache
 
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
@@ -23,96 +27,144 @@ reader = Reader()
 dir_path = os.path.dirname(os.path.realpath(__file__))
 logger.info('Dir_PATH: {dir_path}'.format(dir_path=dir_path))
 
-# get control card ids
 file_path = os.path.dirname(__file__)
 if file_path != "":
     os.chdir(file_path)
 
 # vars for ensuring delay between same-card-swipes
-ssp = open('../settings/Second_Swipe_Pause', 'r')
-same_id_delay = ssp.read().strip()
-sspc = open('../settings/Second_Swipe_Pause_Controls', 'r')
-sspc_nodelay = sspc.readline().strip()
 previous_id = ""
 previous_time = time.time()
 
-# get swipe or place configuration value
-sop = open('../settings/Swipe_or_Place', 'r')
-swipe_or_place = sop.read().strip()
+loop = EventLoop()
+watcher = FileWatcher(loop)
 
-# create array for control card ids
-cards = []
+# plays audio folders in-process, rfid_trigger_play.sh is only used for everything else
+# the shortcuts and track lists are indexed once and kept current through the watcher
+engine = PlaybackEngine(dir_path, watcher=watcher)
+loop.call_later(0, engine.preload)
 
-# open file and read the content in a list
-with open('../settings/global.conf', 'r') as filehandle:
-    filecontents = filehandle.readlines()
 
-    for line in filecontents:
-        cids = line[:-1]
-        cards.append(cids)
+def mpd_keepalive():
+    # keep the connection to MPD open while no card is swiped
+    engine.mpd.keepalive()
+    loop.call_later(15, mpd_keepalive)
 
 
-extract = [s for s in cards if s.startswith('CMD')]
-string = ''.join(extract)
+loop.call_later(15, mpd_keepalive)
 
-# if controlcards delay is deactivated, let the cards pass, otherwise, they have to wait...
-if sspc_nodelay == "ON":
-    ids = re.findall("(\d+)", string)
-else:
-    ids = ""
+# card presence trackers and if their reader can poll for the card
+trackers = []
+
+
+def removal_timeout(settings, can_poll):
+    # seconds without a card in the field until it counts as removed (PLACENOTSWIPE)
+    # readers which can poll for the card (MFRC522, PN532) default to 0.1s, all others to 1s
+    if settings.card_removal_timeout is not None:
+        return settings.card_removal_timeout
+    return 0.1 if can_poll else 1
+
+
+def add_tracker(can_poll):
+    tracker = CardPresenceTracker(loop, on_card_placed, on_card_removed,
+                                  removal_timeout(settings_cache.settings, can_poll))
+    trackers.append((tracker, can_poll))
+    return tracker
+
+
+def on_settings_change(settings):
+    for tracker, can_poll in trackers:
+        tracker.removal_timeout = removal_timeout(settings, can_poll)
+
+
+# Second_Swipe_Pause, Second_Swipe_Pause_Controls, Swipe_or_Place, Card_Removal_Timeout,
+# Card_Id_Format and the control cards in global.conf, reloaded whenever the web app changes them
+settings_cache = ReaderSettingsCache('../settings', watcher, on_settings_change)
 
 
 # handler for RFID reading no cardid
-def handler(signum, frame):
+def handler():
     logger.info('No RFID Signal detected.')
+    # force pause the player
+    logger.info('Trigger Pause Force')
+    if engine.pause():
+        return
     try:
-        # force pause the player script
-        logger.info('Trigger Pause Force')
-        subprocess.call([dir_path + '/playout_controls.sh -c=playerpauseforce -v=0.1'], shell=True)
+        subprocess.call([dir_path + '/playout_controls.sh -c=playerpauseforce'], shell=True)
     except OSError as e:
         logger.info('Execution of Pause failed.')
 
 
-# associate the handler to signal alarm
-signal.signal(signal.SIGALRM, handler)
+def trigger_play(cardid):
+    global previous_id
+    logger.info('Trigger Play Cardid={cardid}'.format(cardid=cardid))
+    if not engine.play_card(cardid):
+        subprocess.call([dir_path + '/rfid_trigger_play.sh --cardid=' + cardid], shell=True)
+    previous_id = cardid
 
-while True:
-    # slow down the card reading while loop
-    time.sleep(0.2)
 
-    if swipe_or_place == "PLACENOTSWIPE":
-        # enable the signal alarm (if no card is present for 1 second)
-        signal.alarm(1)
+def on_card_placed(cardid):
+    cardid = normalize(cardid, settings_cache.settings.card_id_format)
+    if settings_cache.settings.swipe_or_place != "PLACENOTSWIPE":
+        on_card(cardid)
+        return
+    try:
+        trigger_play(cardid)
+    except OSError as e:
+        logger.error('Execution failed: {e}'.format(e=e))
+
+
+def on_card_removed():
+    if settings_cache.settings.swipe_or_place == "PLACENOTSWIPE":
+        handler()
+
+
+def on_card_read(cardid):
+    # Card_Id_Format: the legacy card id of the backend or the canonical one, see card_ids.py
+    cardid = normalize(cardid, settings_cache.settings.card_id_format)
+    if settings_cache.settings.swipe_or_place == "PLACENOTSWIPE":
+        presence.card_read(cardid)
+    else:
+        on_card(cardid)
 
-    # reading the card id
-    # NOTE: it's been reported that KKMOON Reader might need the following line altered.
-    # Instead of:
-    # cardid = reader.reader.readCard()
-    # change the line to:
-    # cardid = reader.readCard()
-    # See here for (German ;) details:
-    # https://github.com/MiczFlor/RPi-Jukebox-RFID/issues/551
-    cardid = reader.reader.readCard()
 
-    # disable the alarm after a successful read
-    signal.alarm(0)
+def on_multi_card_read(reader_id, cardid, timestamp):
+    logger.debug('Card {cardid} read by {reader_id}'.format(cardid=cardid, reader_id=reader_id))
+    on_card_read(cardid)
+
+
+def on_card(cardid):
+    global previous_time
+    settings = settings_cache.settings
 
     try:
         # start the player script and pass on the cardid (but only if new card or otherwise
         # "same_id_delay" seconds have passed)
-        if cardid is not None:
-            if cardid != previous_id or (time.time() - previous_time) >= float(same_id_delay) or cardid in str(ids):
-                logger.info('Trigger Play Cardid={cardid}'.format(cardid=cardid))
-                subprocess.call([dir_path + '/rfid_trigger_play.sh --cardid=' + cardid], shell=True)
-                previous_id = cardid
+        if cardid != previous_id or (time.time() - previous_time) >= settings.same_id_delay or \
+                (settings.control_cards_nodelay and cardid in settings.control_cards):
+            trigger_play(cardid)
 
-            else:
-                logger.debug('Ignoring Card id {cardid} due to same-card-delay, delay: {same_id_delay}'.format(
-                    cardid=cardid,
-                    same_id_delay=same_id_delay
-                ))
+        else:
+            logger.debug('Ignoring Card id {cardid} due to same-card-delay, delay: {same_id_delay}'.format(
+                cardid=cardid,
+                same_id_delay=settings.same_id_delay
+            ))
 
-            previous_time = time.time()
+        previous_time = time.time()
 
     except OSError as e:
         logger.error('Execution failed: {e}'.format(e=e))
+
+
+# reading the card ids
+# cards of readers which can not poll are removed when they were not read again in time
+presence = add_tracker(False)
+for card_reader in reader.readers:
+    if card_reader.can_poll:
+        # readers which can poll for the card report placed and removed cards directly
+        add_tracker(True).start_polling(card_reader, card_reader.poll_interval)
+    elif hasattr(card_reader, 'readEvents'):
+        # USB readers, every device with its own key buffer
+        add_multi_card_reader(loop, card_reader, on_multi_card_read)
+    else:
+        add_card_reader(loop, card_reader, on_card_read)
+loop.run_forever()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Small event loop for daemon_rfid_reader.py
+#
+# The loop sleeps in select/epoll until a reader has data or a timer is due.
+# The devices of USB (evdev) readers are watched directly through their file
+# descriptors. Readers without a file descriptor (RDM6300, PC/SC, ...) block
+# inside readCard(), so they are run in a thread which hands the card ids to
+# the loop through a pipe. Slow work (MPD commands, writing files) can be
+# handed to a Worker thread, so it does not hold up the loop. A callback
+# which raises is logged, the loop (and the daemon) keeps running.
+
+import functools
+import heapq
+import itertools
+import logging
+import os
+import queue
+import selectors
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def run_callback(callback, *args):
+    """ call callback(*args) and log instead of raising if it fails """
+    try:
+        callback(*args)
+    except Exception:
+        logger.exception('{callback} failed'.format(callback=callback))
+
+
+class Timer(object):
+    """ handle of a scheduled callback, see EventLoop.call_later """
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventLoop(object):
+    """ selectors based dispatcher with a timer queue on the monotonic clock """
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.timers = []
+        self.counter = itertools.count()
+        self.running = False
+
+    def add_reader(self, fileobj, callback):
+        """ call callback() whenever fileobj is readable """
+        self.selector.register(fileobj, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, fileobj):
+        self.selector.unregister(fileobj)
+
+    def call_later(self, delay, callback):
+        """ call callback() after delay seconds, returns a Timer which can be cancelled """
+        timer = Timer(time.monotonic() + delay, callback)
+        heapq.heappush(self.timers, (timer.deadline, next(self.counter), timer))
+        return timer
+
+    def run_once(self):
+        while self.timers and self.timers[0][2].cancelled:
+            heapq.heappop(self.timers)
+        timeout = None
+        if self.timers:
+            timeout = max(0, self.timers[0][0] - time.monotonic())
+
+        for key, mask in self.selector.select(timeout):
+            run_callback(key.data)
+
+        now = time.monotonic()
+        while self.timers and self.timers[0][0] <= now:
+            timer = heapq.heappop(self.timers)[2]
+            if not timer.cancelled:
+                run_callback(timer.callback)
+
+    def run_forever(self):
+        self.running = True
+        while self.running:
+            self.run_once()
+
+    def stop(self):
+        self.running = False
+
+
+class ThreadedReader(object):
+    """ runs a blocking reader in a thread and passes the card ids to the event loop """
+
+    def __init__(self, loop, reader, callback):
+        self.reader = reader
+        self.callback = callback
+        self.cards = queue.Queue()
+        self.pipe_r, self.pipe_w = os.pipe()
+        loop.add_reader(self.pipe_r, self.dispatch)
+        self.thread = threading.Thread(target=self.run, name='card-reader')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while True:
+            cardid = self.reader.readCard()
+            if cardid is not None:
+                self.cards.put(cardid)
+                os.write(self.pipe_w, b'\0')
+
+    def dispatch(self):
+        os.read(self.pipe_r, 512)
+        while not self.cards.empty():
+            run_callback(self.callback, self.cards.get_nowait())
+
+
+class Worker(object):
+    """ runs the submitted callbacks one after another in its own thread
+
+        At most maxsize callbacks wait, submit() does not block but returns False if the queue is full.
+    """
+
+    def __init__(self, name, maxsize=1):
+        self.name = name
+        self.queue = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self.run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, callback):
+        try:
+            self.queue.put_nowait(callback)
+            return True
+        except queue.Full:
+            logger.warning('{name} is busy, dropped {callback}'.format(name=self.name, callback=callback))
+            return False
+
+    def run(self):
+        while True:
+            callback = self.queue.get()
+            try:
+                callback()
+            except Exception:
+                logger.exception('{name} failed'.format(name=self.name))
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        """ wait until all submitted callbacks are done """
+        self.queue.join()
+
+
+def add_card_reader(loop, reader, callback):
+    """ call callback(cardid) for every card read by reader """
+    ThreadedReader(loop, reader, callback)
+
+
+def add_multi_card_reader(loop, reader, callback):
+    """ call callback(reader_id, cardid, timestamp) for every card read by one of the devices of a UsbReader """
+    def on_readable(fd):
+        for reader_id, cardid, timestamp in reader.readEvents(fd):
+            run_callback(callback, reader_id, cardid, timestamp)
+    for fd in reader.devices:
+        loop.add_reader(fd, functools.partial(on_readable, fd))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Watch settings files and folders for changes on the daemon's event loop.
+#
+# On Linux inotify is used (through ctypes, no extra package needed).
+# If inotify is not available, the modification times are polled instead.
+# Files are watched through their folder, because the shell scripts usually
+# delete and re-create files (e.g. inc.writeGlobalConfig.sh) instead of
+# changing them in place.
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+# the watched folder itself went away
+GONE_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | GONE_MASK
+
+event_header = struct.Struct('iIII')
+
+
+def inotify_init():
+    """ returns the libc handle and an inotify file descriptor or (None, None) """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK)
+    except (OSError, AttributeError):
+        return None, None
+    if fd < 0:
+        return None, None
+    return libc, fd
+
+
+class FileWatcher(object):
+    """ calls callbacks when watched files or folders change
+
+        watch_file(path, callback): callback() after the file was changed,
+            changes within settle_time are reported once
+        watch_directory(path, callback, removed=None): callback(name) for every changed entry,
+            name is None if the folder has to be scanned again completely;
+            removed() after the folder itself was deleted or moved away (inotify only),
+            the folder is not watched any more then and has to be watched again
+    """
+
+    def __init__(self, loop, settle_time=0.1, poll_interval=2):
+        self.loop = loop
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.watches = {}
+        self.pending = {}
+        self.libc, self.fd = inotify_init()
+        if self.fd is not None:
+            loop.add_reader(self.fd, self.read_events)
+        else:
+            logger.info('inotify not available, polling for changes every {0}s'.format(poll_interval))
+            self.mtimes = {}
+            loop.call_later(poll_interval, self.poll)
+
+    def watch_file(self, path, callback):
+        path = os.path.abspath(path)
+        self._add(os.path.dirname(path), os.path.basename(path), callback)
+
+    def watch_directory(self, path, callback, removed=None):
+        self._add(os.path.abspath(path), None, callback, removed)
+
+    def _add(self, directory, name, callback, removed=None):
+        if self.fd is not None:
+            wd = self.libc.inotify_add_watch(self.fd, directory.encode(), WATCH_MASK)
+            if wd < 0:
+                logger.error('Could not watch {directory}: {e}'.format(
+                    directory=directory, e=os.strerror(ctypes.get_errno())))
+                return
+            key = wd
+        else:
+            key = directory
+            self.mtimes[(directory, name)] = self._mtime(directory, name)
+        self.watches.setdefault(key, []).append((name, callback, removed))
+
+    def read_events(self):
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        changed = []
+        gone = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = event_header.unpack_from(data, offset)
+            offset += event_header.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+            offset += length
+            if mask & GONE_MASK:
+                if wd not in gone:
+                    gone.append(wd)
+            elif (wd, name) not in changed:
+                changed.append((wd, name))
+        for wd, name in changed:
+            for watched_name, callback, removed in self.watches.get(wd, []):
+                if watched_name is None:
+                    callback(name)
+                elif watched_name == name:
+                    self._settle(callback)
+        for wd in gone:
+            self._remove(wd)
+
+    def _remove(self, wd):
+        """ the watched folder is gone, inotify drops (IN_IGNORED) or keeps following (IN_MOVE_SELF) its watch """
+        watches = self.watches.pop(wd, None)
+        if watches is None:
+            return
+        # a moved folder would be watched under its new name, which nobody asked for
+        self.libc.inotify_rm_watch(self.fd, wd)
+        for watched_name, callback, removed in watches:
+            if removed is not None:
+                removed()
+            else:
+                logger.warning('The folder of {name} was removed, it is not watched any more'.format(
+                    name=watched_name or 'a watched folder'))
+
+    def _settle(self, callback):
+        """ report changes of a file once after settle_time """
+        if callback in self.pending:
+            self.pending[callback].cancel()
+
+        def fire():
+            del self.pending[callback]
+            callback()
+        self.pending[callback] = self.loop.call_later(self.settle_time, fire)
+
+    @staticmethod
+    def _mtime(directory, name):
+        try:
+            return os.stat(directory if name is None else os.path.join(directory, name)).st_mtime
+        except OSError:
+            return None
+
+    def poll(self):
+        for directory, watches in self.watches.items():
+            for name, callback, removed in watches:
+                mtime = self._mtime(directory, name)
+                if mtime != self.mtimes[(directory, name)]:
+                    self.mtimes[(directory, name)] = mtime
+                    if name is None:
+                        callback(None)
+                    else:
+                        callback()
+        self.loop.call_later(self.poll_interval, self.poll)
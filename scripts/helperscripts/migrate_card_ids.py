@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# Changes the card ids of a box to the canonical format (see card_ids.py).
+#
+# * renames the files in shared/shortcuts
+# * changes the control cards in settings/rfid_trigger_play.conf and settings/global.conf
+# * writes CANONICAL to settings/Card_Id_Format, so the daemon reports canonical card ids
+#
+# Card ids which can not be converted (e.g. card ids of a USB reader or
+# MFRC522 card ids which can be split into more than one UID) are left alone.
+# Restart the phoniebox-rfid-reader service afterwards.
+#
+# Usage: python3 migrate_card_ids.py [--reader MFRC522|PN532|PCSC|RDM6300] [--dry-run]
+# Without --reader the reader registered in scripts/deviceName.txt is used.
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from card_ids import CANONICAL, LEGACY_UIDS, migrate  # noqa: E402
+from playback_engine import read_first_line, read_shell_config, write_file, write_shell_config  # noqa: E402
+from readers import read_device_file  # noqa: E402
+
+SCRIPTS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+SHORTCUTS_PATH = os.path.join(SCRIPTS_PATH, '..', 'shared', 'shortcuts')
+SETTINGS_PATH = os.path.join(SCRIPTS_PATH, '..', 'settings')
+CONTROL_CARD_FILES = ('rfid_trigger_play.conf', 'global.conf')
+
+
+def registered_reader():
+    device_file = os.path.join(SCRIPTS_PATH, 'deviceName.txt')
+    if not os.path.isfile(device_file):
+        sys.exit('Please run RegisterDevice.py first or choose the reader with --reader')
+    names = set(entry.name for entry in read_device_file(device_file) if entry.name in LEGACY_UIDS)
+    if len(names) != 1:
+        sys.exit('The card ids of the registered reader(s) can not be converted, choose the reader with --reader')
+    return names.pop()
+
+
+def migrate_shortcuts(backend, dry_run):
+    cardids = [name for name in os.listdir(SHORTCUTS_PATH)
+               if name != 'placeholder' and os.path.isfile(os.path.join(SHORTCUTS_PATH, name))]
+    canonical = migrate(cardids, backend)
+    for cardid in sorted(cardids):
+        if cardid not in canonical:
+            print('shortcut {cardid}: can not be converted, please assign the card again'.format(cardid=cardid))
+            continue
+        if canonical[cardid] == cardid:
+            continue
+        source = os.path.join(SHORTCUTS_PATH, cardid)
+        target = os.path.join(SHORTCUTS_PATH, canonical[cardid])
+        if os.path.exists(target) and read_first_line(target) != read_first_line(source):
+            print('shortcut {cardid}: {canonical} points to another folder, skipped'.format(
+                cardid=cardid, canonical=canonical[cardid]))
+            continue
+        print('shortcut {cardid}: {canonical}'.format(cardid=cardid, canonical=canonical[cardid]))
+        if not dry_run:
+            os.replace(source, target)
+
+
+def migrate_control_cards(path, backend, dry_run):
+    if not os.path.isfile(path):
+        return
+    config = read_shell_config(path)
+    cards = dict((key, value) for key, value in config.items()
+                 if key.startswith('CMD') and value and not value.startswith('%'))
+    canonical = migrate(cards.values(), backend)
+    changes = dict((key, canonical[value]) for key, value in cards.items()
+                   if canonical.get(value, value) != value)
+    for key in sorted(cards):
+        if cards[key] not in canonical:
+            print('{name} {key}: {cardid} can not be converted, please assign the card again'.format(
+                name=os.path.basename(path), key=key, cardid=cards[key]))
+    for key in sorted(changes):
+        print('{name} {key}: {cardid} -> {canonical}'.format(
+            name=os.path.basename(path), key=key, cardid=cards[key], canonical=changes[key]))
+    if changes and not dry_run:
+        write_shell_config(path, changes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Change the card ids to the canonical format')
+    parser.add_argument('--reader', choices=sorted(LEGACY_UIDS), help='reader the card ids were read with')
+    parser.add_argument('--dry-run', action='store_true', help='only show what would be changed')
+    args = parser.parse_args()
+
+    format_file = os.path.join(SETTINGS_PATH, 'Card_Id_Format')
+    if read_first_line(format_file) == CANONICAL:
+        sys.exit('The card ids are already in the canonical format')
+    backend = args.reader or registered_reader()
+
+    migrate_shortcuts(backend, args.dry_run)
+    for name in CONTROL_CARD_FILES:
+        migrate_control_cards(os.path.join(SETTINGS_PATH, name), backend, args.dry_run)
+    if not args.dry_run:
+        write_file(format_file, CANONICAL + '\n')
+        print('Done, please restart the phoniebox-rfid-reader service')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Decoder for USB RFID readers which type the card id like a keyboard.
+#
+# The key codes of the evdev key events are collected in a bytearray until
+# KEY_ENTER completes the card id, which is then translated with a bytes
+# table (one entry per key code). Keys which are not part of the table are
+# decoded as 'X', like the keys string the Reader.py scripts always used,
+# so registered card ids stay the same. Key codes beyond the keys string
+# do not raise and keys after KEY_ENTER start the next card. This is not
+# faster than the string concatenation it replaces, the per event loop
+# costs the same (see helperscripts/benchmark_keycode_decoder.py).
+#
+# Some readers send hex card ids and press shift for the letters A-F. With
+# shift=True the shift keys are not part of the card id and the letters typed
+# while shift is pressed are decoded as upper case letters.
+
+EV_KEY = 1
+KEY_UP = 0
+KEY_DOWN = 1
+KEY_ENTER = 28
+KEY_LEFTSHIFT = 42
+KEY_RIGHTSHIFT = 54
+
+# characters for the key codes 0-73 on a german (qwertz) keyboard layout
+QWERTZ_KEYS = "X^1234567890XXXXqwertzuiopXXXXasdfghjklXXXXXyxcvbnmXXXXXXXXXXXXXXXXXXXXXXX"
+UNKNOWN_KEY = b'X'
+# offset of the characters typed with shift in the translation table
+SHIFTED = 128
+UNKNOWN_CODE = SHIFTED - 1
+
+
+def make_table(keys):
+    """ bytes translation table: table[keycode] is the character of the key,
+        table[SHIFTED + keycode] the character of the key pressed together with shift
+    """
+    table = bytearray(UNKNOWN_KEY * 256)
+    table[:len(keys)] = keys.encode('ascii')
+    table[SHIFTED:SHIFTED + len(keys)] = keys.upper().encode('ascii')
+    return bytes(table)
+
+
+class KeycodeDecoder(object):
+    """ turns the key events of a USB reader into card ids """
+
+    def __init__(self, keys=QWERTZ_KEYS, shift=False, max_length=32):
+        self.table = make_table(keys)
+        self.shift = shift
+        self.shifted = 0
+        self.buffer = bytearray(max_length)
+        self.length = 0
+
+    def decode_events(self, events):
+        """ decode the evdev events read from the device
+            returns the completed card ids as (cardid, enter key event) pairs
+        """
+        # the key codes are collected in the buffer and translated once the card id is complete
+        cards = []
+        buffer = self.buffer
+        length = self.length
+        shift = self.shift
+        shifted = self.shifted
+        for event in events:
+            if event.value == KEY_DOWN and event.type == EV_KEY:
+                code = event.code
+                if code == KEY_ENTER:
+                    cards.append((buffer[:length].translate(self.table).decode('ascii'), event))
+                    length = 0
+                elif shift and (code == KEY_LEFTSHIFT or code == KEY_RIGHTSHIFT):
+                    shifted = SHIFTED
+                else:
+                    try:
+                        buffer[length] = code + shifted if code < SHIFTED else UNKNOWN_CODE
+                    except IndexError:
+                        buffer.extend(bytes(len(buffer)))
+                        buffer[length] = code + shifted if code < SHIFTED else UNKNOWN_CODE
+                    length += 1
+            elif shift and event.value == KEY_UP and event.type == EV_KEY and \
+                    (event.code == KEY_LEFTSHIFT or event.code == KEY_RIGHTSHIFT):
+                shifted = 0
+        self.length = length
+        self.shifted = shifted
+        return cards
+
+    def decode(self, events):
+        """ decode the evdev events read from the device, returns the completed card ids """
+        return [cardid for cardid, event in self.decode_events(events)]
+
+    def reset(self):
+        self.length = 0
+        self.shifted = 0
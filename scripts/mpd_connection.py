@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Persistent connection to MPD for the python daemons.
+# Instead of connecting (or forking nc/mpc) for every command, one
+# connection is kept open and only re-established if MPD dropped it.
+#
+# Used by daemon_rfid_reader.py, python-phoniebox, the MQTT client and the
+# HD44780 display:
+# * the password (if any) is sent once after connecting
+# * if MPD can not be reached, the next attempt is only made after a delay
+#   which doubles with every failed attempt (up to max_delay), so a stopped
+#   MPD is not flooded with connection attempts from every loop iteration
+# * keepalive() pings MPD when the connection was not used for a while, so
+#   MPD's connection_timeout (60s by default) does not close it
+# * command_list() sends several commands at once (command_list_ok_begin)
+#   and returns all results after one round trip
+
+import functools
+import logging
+import threading
+import time
+
+from mpd import CommandError, MPDClient, ConnectionError as MPDConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class MpdConnection(object):
+    """ Keeps one connection to MPD open and reconnects if it was lost.
+
+        MPD commands can be called directly on the object, e.g.
+        mpd = MpdConnection()
+        mpd.status()
+        status, song = mpd.command_list([('status',), ('currentsong',)])
+
+        If MPD can not be reached, MPDConnectionError (mpd.ConnectionError) or OSError is raised.
+    """
+
+    def __init__(self, host='localhost', port=6600, timeout=3, password=None,
+                 min_delay=0.5, max_delay=30, keepalive_interval=45):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.password = password
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.keepalive_interval = keepalive_interval
+        self.client = None
+        self.delay = 0
+        self.retry_at = 0
+        self.last_used = 0
+        # the MQTT client calls MPD from its own threads
+        self.lock = threading.RLock()
+
+    @property
+    def connected(self):
+        return self.client is not None
+
+    @property
+    def mpd_version(self):
+        """ version of the connected MPD or None """
+        return self.client.mpd_version if self.client is not None else None
+
+    def connect(self):
+        now = time.monotonic()
+        if now < self.retry_at:
+            raise MPDConnectionError('Not connected to MPD, next attempt in {0:.1f}s'.format(self.retry_at - now))
+        client = MPDClient()
+        client.timeout = self.timeout
+        try:
+            client.connect(self.host, self.port)
+            if self.password:
+                client.password(self.password)
+        except (MPDConnectionError, CommandError, OSError) as e:
+            # CommandError: wrong password
+            try:
+                client.disconnect()
+            except (MPDConnectionError, OSError):
+                pass
+            self.delay = min(self.delay * 2, self.max_delay) if self.delay else self.min_delay
+            self.retry_at = time.monotonic() + self.delay
+            logger.debug('Could not connect to MPD, next attempt in {delay}s: {e}'.format(delay=self.delay, e=e))
+            raise
+        self.client = client
+        self.delay = 0
+        self.retry_at = 0
+        self.last_used = time.monotonic()
+        logger.debug('Connected to MPD at {host}:{port}'.format(host=self.host, port=self.port))
+
+    def connect_wait(self, timeout):
+        """ try to connect for up to timeout seconds, returns True if connected """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with self.lock:
+                    if self.client is None:
+                        self.connect()
+                return True
+            except (MPDConnectionError, OSError):
+                wait = self.retry_at - time.monotonic()
+                if time.monotonic() + max(wait, 0) > deadline:
+                    return False
+                time.sleep(max(wait, 0))
+
+    def disconnect(self):
+        with self.lock:
+            if self.client is None:
+                return
+            try:
+                self.client.disconnect()
+            except (MPDConnectionError, OSError):
+                pass
+            self.client = None
+
+    def _call(self, function):
+        """ call function(client), reconnecting once if the connection was lost """
+        with self.lock:
+            for attempt in range(2):
+                if self.client is None:
+                    self.connect()
+                try:
+                    result = function(self.client)
+                    self.last_used = time.monotonic()
+                    return result
+                except (MPDConnectionError, OSError) as e:
+                    logger.debug('Lost connection to MPD: {e}'.format(e=e))
+                    self.disconnect()
+                    if attempt:
+                        raise
+
+    def execute(self, command, *args):
+        """ run an MPD command, reconnecting once if the connection was lost """
+        return self._call(lambda client: getattr(client, command)(*args))
+
+    def command_list(self, commands):
+        """ run the commands ([(command, arg, ...), ...]) in one command list
+            returns the list of their results
+        """
+        def run(client):
+            client.command_list_ok_begin()
+            try:
+                for command in commands:
+                    getattr(client, command[0])(*command[1:])
+            except (AttributeError, TypeError):
+                # unknown command or wrong arguments, the client is stuck in the command list
+                self.disconnect()
+                raise
+            return client.command_list_end()
+        return self._call(run)
+
+    def keepalive(self):
+        """ ping MPD if the connection was not used for keepalive_interval seconds
+            (call this regularly, e.g. from an event loop)
+        """
+        with self.lock:
+            if self.client is None or time.monotonic() - self.last_used < self.keepalive_interval:
+                return
+            try:
+                self.execute('ping')
+            except (MPDConnectionError, OSError) as e:
+                logger.debug('MPD keepalive failed: {e}'.format(e=e))
+
+    def __getattr__(self, command):
+        if command.startswith('_'):
+            raise AttributeError(command)
+        return functools.partial(self.execute, command)
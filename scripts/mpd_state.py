@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Player state of MPD for the python daemons, without polling
+#
+# Instead of asking MPD for status and currentsong every cycle, MpdState
+# holds one extra connection which waits in "idle player mixer options
+# playlist". MPD answers the idle command only when something changed;
+# then status and currentsong are fetched once (in one command list) and
+# every subscriber gets the new state and what changed. While nothing
+# changes, MPD is not asked anything at all.
+#
+# The elapsed time is not announced by MPD while playing, PlayerState
+# extrapolates it from the time the status was received.
+#
+# Usage:
+#   state = MpdState()
+#   state.subscribe(callback)    # callback(state, changes) from the MpdState thread
+#   state.start()
+#   state.state                  # the current PlayerState, e.g. in a display loop
+
+import logging
+import threading
+import time
+
+from mpd import MPDError
+
+from mpd_connection import MpdConnection
+
+logger = logging.getLogger(__name__)
+
+SUBSYSTEMS = ('player', 'mixer', 'options', 'playlist')
+
+
+class PlayerState(object):
+    """ status and currentsong of MPD at one point in time
+
+        connected: False if MPD could not be reached (status and song are empty then)
+    """
+
+    def __init__(self, status=None, song=None, connected=True, mpd_version=None, received=None):
+        self.status = status or {}
+        self.song = song or {}
+        self.connected = connected
+        self.mpd_version = mpd_version
+        self.received = time.monotonic() if received is None else received
+
+    @property
+    def state(self):
+        """ 'play', 'pause', 'stop' or 'not_running' """
+        return self.status.get('state', 'stop') if self.connected else 'not_running'
+
+    @property
+    def elapsed(self):
+        """ elapsed time of the current song in seconds, extrapolated while playing """
+        try:
+            elapsed = float(self.status['elapsed'])
+        except (KeyError, ValueError):
+            return 0.0
+        if self.state == 'play':
+            elapsed += time.monotonic() - self.received
+            try:
+                elapsed = min(elapsed, float(self.status['duration']))
+            except (KeyError, ValueError):
+                pass
+        return elapsed
+
+
+class StateChanges(object):
+    """ the values which changed between two PlayerStates ({key: new value}, None if removed) """
+
+    def __init__(self, old, new):
+        self.connected = old.connected != new.connected
+        self.status = diff(old.status, new.status)
+        self.song = diff(old.song, new.song)
+
+    def __bool__(self):
+        return bool(self.connected or self.status or self.song)
+
+
+def diff(old, new):
+    changes = dict((key, value) for key, value in new.items() if old.get(key) != value)
+    changes.update((key, None) for key in old if key not in new)
+    return changes
+
+
+class MpdState(object):
+    """ keeps the player state of MPD up to date with the idle command and notifies subscribers
+
+        The idle command blocks its connection, so MpdState has its own and the
+        commands of the daemon still go through their MpdConnection.
+    """
+
+    def __init__(self, host='localhost', port=6600, password=None, subsystems=SUBSYSTEMS):
+        # no timeout, idle waits until something changes
+        self.connection = MpdConnection(host, port, timeout=None, password=password)
+        self.subsystems = subsystems
+        self.state = PlayerState(connected=False)
+        self.subscribers = []
+        self.thread = None
+        self.stopping = False
+
+    def subscribe(self, callback):
+        """ callback(state, changes) is called for every change (from the MpdState thread) """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def update(self, state):
+        changes = StateChanges(self.state, state)
+        self.state = state
+        if not changes:
+            return
+        for callback in list(self.subscribers):
+            try:
+                callback(state, changes)
+            except Exception:
+                logger.exception('State subscriber {callback} failed'.format(callback=callback))
+
+    def refresh(self):
+        """ fetch status and currentsong once """
+        status, song = self.connection.command_list([('status',), ('currentsong',)])
+        self.update(PlayerState(status, song, mpd_version=self.connection.mpd_version))
+
+    def wait(self):
+        """ refresh the state after the next change in MPD """
+        client = self.connection.client
+        if client is None or self.stopping:
+            return
+        # not through the connection: it would reconnect after stop() closed the socket
+        # and hold its lock while waiting
+        changed = client.idle(*self.subsystems)
+        logger.debug('MPD changed: {changed}'.format(changed=changed))
+        self.refresh()
+
+    def run(self):
+        while not self.stopping:
+            try:
+                if not self.connection.connected:
+                    self.refresh()
+                self.wait()
+            except (MPDError, OSError) as e:
+                if self.stopping:
+                    break
+                if self.state.connected:
+                    logger.warning('Lost connection to MPD: {e}'.format(e=e))
+                self.update(PlayerState(connected=False))
+                self.connection.disconnect()
+                # MpdConnection delays the next attempt
+                time.sleep(max(self.connection.retry_at - time.monotonic(), 0.1))
+
+    def start(self):
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name='MpdState', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping = True
+        # closing the socket ends the idle command
+        self.connection.disconnect()
+        if self.thread is not None:
+            self.thread.join(1)
+            self.thread = None
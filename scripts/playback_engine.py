@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# In-process playback for daemon_rfid_reader.py
+#
+# This is a python port of the audio folder branch of rfid_trigger_play.sh
+# (including the parts of playout_controls.sh, resume_play.sh, single_play.sh
+# and shuffle_play.sh it calls). It resolves the card through
+# shared/shortcuts/<cardid> (see card_index.py) and talks to MPD over one
+# persistent connection, so no shell, php, nc or mpc process has to be
+# spawned for a swipe.
+#
+# Everything the engine does not cover (control cards, unknown cards,
+# podcasts, live streams, spotify, ...) is left to rfid_trigger_play.sh:
+# play_card() returns False and the caller falls back to the shell script.
+
+import logging
+import os
+import re
+import time
+
+from mpd import MPDError
+
+from card_index import CardIndex
+from mpd_connection import MpdConnection
+from playlist_manifest import ManifestCache
+
+logger = logging.getLogger(__name__)
+
+# files in a folder which are handled by playlist_recursive_by_folder.php in a special way
+SPECIAL_FOLDER_FILES = ('podcast.txt', 'livestream.txt', 'spotify.txt')
+
+shell_var_re = re.compile(r'^\s*([A-Za-z_][A-Za-z0-9_]*)=(.*)$')
+
+
+def read_shell_config(path):
+    """ read a file of shell variables (KEY="value" per line) into a dict """
+    config = {}
+    with open(path, 'r') as f:
+        for line in f:
+            match = shell_var_re.match(line)
+            if match:
+                config[match.group(1)] = match.group(2).strip().strip('"')
+    return config
+
+
+def write_shell_config(path, changes):
+    """ replace the given variables in a file of shell variables, keeping all other lines """
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    remaining = dict(changes)
+    for i, line in enumerate(lines):
+        match = shell_var_re.match(line)
+        if match and match.group(1) in remaining:
+            lines[i] = '{key}="{value}"\n'.format(key=match.group(1), value=remaining.pop(match.group(1)))
+    for key, value in remaining.items():
+        lines.append('{key}="{value}"\n'.format(key=key, value=value))
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+
+def read_first_line(path, default=''):
+    try:
+        with open(path, 'r') as f:
+            return f.readline().strip()
+    except (IOError, OSError):
+        return default
+
+
+def write_file(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+class CachedConfig(object):
+    """ shell variable file which is only read again when it was modified """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.values = None
+
+    def get(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        if mtime != self.mtime:
+            self.values = read_shell_config(self.path)
+            self.mtime = mtime
+        return self.values
+
+
+class PlaybackEngine(object):
+    """ Plays the audio folder assigned to a card without spawning rfid_trigger_play.sh """
+
+    def __init__(self, dir_path, mpd=None, watcher=None):
+        self.dir_path = dir_path
+        self.settings_path = os.path.join(dir_path, '..', 'settings')
+        self.shared_path = os.path.join(dir_path, '..', 'shared')
+        self.mpd = mpd if mpd is not None else MpdConnection()
+        # shortcuts and track lists, cached while the watcher reports their changes
+        # the track lists are stored in the manifests of the folders (shared/manifests)
+        self.manifests = ManifestCache(os.path.join(self.shared_path, 'manifests'), self._durations)
+        self.index = CardIndex(os.path.join(self.shared_path, 'shortcuts'), watcher, self.manifests)
+        self.global_conf = CachedConfig(os.path.join(self.settings_path, 'global.conf'))
+        self.trigger_conf = CachedConfig(os.path.join(self.settings_path, 'rfid_trigger_play.conf'))
+
+    def control_cards(self):
+        """ card ids assigned to commands in rfid_trigger_play.conf """
+        trigger_conf = self.trigger_conf.get()
+        if trigger_conf is None:
+            return None
+        return set(value for value in trigger_conf.values() if value and not value.startswith('%'))
+
+    def play_card(self, cardid):
+        """ play the audio folder assigned to cardid
+            returns False if the card has to be handled by rfid_trigger_play.sh instead
+        """
+        global_conf = self.global_conf.get()
+        control_cards = self.control_cards()
+        if global_conf is None or control_cards is None or cardid in control_cards:
+            return False
+        if global_conf.get('EDITION', 'classic') != 'classic':
+            return False
+
+        folder = self.index.folder(cardid)
+        if folder is None:
+            return False
+        folder_path = os.path.join(global_conf.get('AUDIOFOLDERSPATH', ''), folder)
+        contents = self.index.contents(folder, folder_path)
+        if contents is None or 'folder.conf' not in contents.names:
+            return False
+        if any(f in contents.names for f in SPECIAL_FOLDER_FILES):
+            return False
+
+        try:
+            self._log_card(cardid, folder)
+            self._play_folder(global_conf, folder, folder_path, contents.tracks)
+        except (MPDError, OSError) as e:
+            logger.warning('Playback engine failed for card {cardid}: {e}'.format(cardid=cardid, e=e))
+            return False
+        return True
+
+    def pause(self):
+        """ pause the player
+            returns False if MPD could not be reached
+        """
+        try:
+            self.mpd.pause(1)
+        except (MPDError, OSError) as e:
+            logger.warning('Playback engine could not pause: {e}'.format(e=e))
+            return False
+        return True
+
+    def _durations(self, folder):
+        """ durations of the tracks of a folder in MPD's database """
+        try:
+            entries = self.mpd.lsinfo(folder)
+        except (MPDError, OSError) as e:
+            logger.debug('No durations for {folder}: {e}'.format(folder=folder, e=e))
+            return {}
+        durations = {}
+        for entry in entries:
+            # mpd < 0.20 only reports the duration in whole seconds (time)
+            duration = entry.get('duration', entry.get('time'))
+            if 'file' in entry and duration is not None:
+                durations[os.path.basename(entry['file'])] = float(duration)
+        return durations
+
+    def _log_card(self, cardid, folder):
+        now = time.strftime('%Y-%m-%d.%H:%M:%S')
+        write_file(os.path.join(self.shared_path, 'latestID.txt'),
+                   "Card ID '{cardid}' was used at '{now}'.\n"
+                   "This ID has been used before.\n"
+                   "The shortcut points to audiofolder '{folder}'.\n".format(cardid=cardid, now=now, folder=folder))
+        write_file(os.path.join(self.settings_path, 'Latest_RFID'), cardid + '\n')
+
+    def preload(self):
+        """ fill the card index with all shortcuts and the track lists of their folders """
+        global_conf = self.global_conf.get()
+        if global_conf is not None:
+            self.index.preload(global_conf.get('AUDIOFOLDERSPATH', ''))
+
+    def _play_folder(self, global_conf, folder, folder_path, tracks):
+        playlist_name = folder.replace('/', ' % ')
+        last_playlist = read_first_line(os.path.join(self.settings_path, 'Latest_Playlist_Played'))
+        if last_playlist == playlist_name and not self._second_swipe(global_conf.get('SECONDSWIPE'), folder_path):
+            return
+
+        self._save_position(global_conf)
+        self.mpd.stop()
+        self._write_playlist(global_conf, folder, tracks, playlist_name)
+        self._load_and_play(folder_path, playlist_name)
+        write_file(os.path.join(self.settings_path, 'Latest_Folder_Played'), folder + '\n')
+        write_file(os.path.join(self.settings_path, 'Latest_Playlist_Played'), playlist_name + '\n')
+        logger.info('Playing {folder}'.format(folder=folder))
+
+    def _second_swipe(self, second_swipe, folder_path):
+        """ react to a swipe of the card whose playlist is loaded
+            returns True if the playlist has to be started (again)
+        """
+        status = self.mpd.status()
+        if int(status.get('playlistlength', 0)) == 0:
+            # after a reboot we want to play the playlist once no matter what the setting is
+            return True
+        if second_swipe == 'PAUSE':
+            if status.get('state') == 'play':
+                self._unmute()
+                self.mpd.pause(1)
+            else:
+                self._resume_player(folder_path)
+            return False
+        if second_swipe == 'PLAY':
+            self._resume_player(folder_path)
+            return False
+        if second_swipe == 'NOAUDIOPLAY':
+            # once the playlist has finished, the swipe counts as a first swipe
+            return not self.mpd.currentsong()
+        if second_swipe == 'SKIPNEXT':
+            self._unmute()
+            self.mpd.next()
+            return False
+        return True
+
+    def _resume_player(self, folder_path):
+        folder_conf = read_shell_config(os.path.join(folder_path, 'folder.conf'))
+        if folder_conf.get('SINGLE') == 'ON':
+            self.mpd.single(1)
+            self.mpd.random(0)
+        else:
+            self.mpd.single(0)
+        self._unmute()
+        self.mpd.play()
+
+    def _unmute(self):
+        volume_file = os.path.join(self.settings_path, 'Audio_Volume_Level')
+        if os.path.isfile(volume_file):
+            self.mpd.setvol(int(float(read_first_line(volume_file, '0'))))
+            os.remove(volume_file)
+
+    def _save_position(self, global_conf):
+        """ store song and elapsed time of the playing folder in its folder.conf """
+        folder = read_first_line(os.path.join(self.settings_path, 'Latest_Folder_Played'))
+        folder_conf_path = os.path.join(global_conf.get('AUDIOFOLDERSPATH', ''), folder, 'folder.conf')
+        if not folder or not os.path.isfile(folder_conf_path):
+            return
+        folder_conf = read_shell_config(folder_conf_path)
+        if folder_conf.get('RESUME') != 'ON' and folder_conf.get('SINGLE') != 'ON':
+            return
+        elapsed = self.mpd.status().get('elapsed')
+        # mpd reports an elapsed time only if the audio is playing or is paused
+        if elapsed:
+            write_shell_config(folder_conf_path, {
+                'CURRENTFILENAME': self.mpd.currentsong().get('file', ''),
+                'ELAPSED': elapsed,
+                'PLAYSTATUS': 'Stopped',
+            })
+
+    def _write_playlist(self, global_conf, folder, tracks, playlist_name):
+        playlist_path = os.path.join(global_conf.get('PLAYLISTSFOLDERPATH', ''), playlist_name + '.m3u')
+        write_file(playlist_path, ''.join('{folder}/{name}\n'.format(folder=folder, name=name) for name in tracks))
+
+    def _load_and_play(self, folder_path, playlist_name):
+        folder_conf_path = os.path.join(folder_path, 'folder.conf')
+        folder_conf = read_shell_config(folder_conf_path)
+
+        self.mpd.clear()
+        self.mpd.load(playlist_name)
+        self.mpd.single(1 if folder_conf.get('SINGLE') == 'ON' else 0)
+        if folder_conf.get('SHUFFLE') == 'ON':
+            self.mpd.shuffle()
+        else:
+            self.mpd.random(0)
+        self._unmute()
+
+        if folder_conf.get('RESUME') != 'ON' and folder_conf.get('SINGLE') != 'ON':
+            self.mpd.play()
+            return
+        if folder_conf.get('PLAYSTATUS') == 'Stopped':
+            found = self.mpd.playlistfind('filename', folder_conf.get('CURRENTFILENAME', ''))
+            if found:
+                self.mpd.play(found[0]['pos'])
+                self.mpd.seekcur(folder_conf.get('ELAPSED', '0'))
+            else:
+                self.mpd.play()
+            # if the playlist ends without a savepos event, the next resume starts from the beginning
+            write_shell_config(folder_conf_path, {'PLAYSTATUS': 'Playing'})
+        else:
+            self.mpd.play()
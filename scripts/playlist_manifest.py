@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# Manifests of the audio folders in shared/manifests
+#
+# A manifest is a JSON file with the sorted track list of one audio folder
+# (as playlist_recursive_by_folder.php would build it), the modification
+# time and duration of every track, all names in the folder and the
+# modification time of the folder when it was listed. As long as the folder
+# has the same modification time, the track list is taken from the
+# manifest instead of listing the folder. When it changed, the folder is
+# listed again; durations of tracks which were not modified are kept.
+#
+# The manifest of the folder "Artist/Album" is "Artist % Album.json", like
+# the playlists. playlist_recursive_by_folder.php reads the manifests too
+# (see manifest_tracks() in htdocs/func.php). PHP only knows the
+# modification time in seconds, so it only trusts a manifest which was
+# built in a later second than the last change of the folder.
+
+import functools
+import json
+import logging
+import os
+import time
+
+from card_index import FolderContents, is_track, natural_sort_key
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def manifest_name(folder):
+    return folder.replace('/', ' % ') + '.json'
+
+
+def read_manifest(path):
+    """ the manifest as dict or None if there is no valid one """
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(path, manifest):
+    """ replace the manifest at once, so a reader never sees half of it """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+def build_manifest(folder_path, mtime_ns, previous=None, durations=None):
+    """ list the folder, returns the manifest or None if the folder does not exist
+
+        previous: the outdated manifest of the folder, its durations are kept
+        durations: function returning the durations of the tracks ({name: seconds}),
+            only called if a track has no known duration
+    """
+    try:
+        entries = list(os.scandir(folder_path))
+    except OSError:
+        return None
+    known = {}
+    if previous is not None:
+        known = dict((track['name'], track) for track in previous.get('tracks', []))
+    tracks = []
+    for entry in sorted((entry for entry in entries if is_track(entry)), key=lambda e: natural_sort_key(e.name)):
+        try:
+            track_mtime_ns = entry.stat().st_mtime_ns
+        except OSError:
+            continue
+        old = known.get(entry.name)
+        duration = old['duration'] if old is not None and old.get('mtime_ns') == track_mtime_ns else None
+        tracks.append({'name': entry.name, 'mtime_ns': track_mtime_ns, 'duration': duration})
+
+    if durations is not None and any(track['duration'] is None for track in tracks):
+        found = durations()
+        for track in tracks:
+            if track['duration'] is None:
+                track['duration'] = found.get(track['name'])
+
+    return {
+        'version': MANIFEST_VERSION,
+        'mtime_ns': mtime_ns,
+        'mtime': mtime_ns // 1000000000,
+        'built': int(time.time()),
+        'names': sorted(entry.name for entry in entries),
+        'tracks': tracks,
+    }
+
+
+def manifest_contents(manifest):
+    return FolderContents(frozenset(manifest['names']), [track['name'] for track in manifest['tracks']])
+
+
+class ManifestCache(object):
+    """ lists audio folders through their manifests
+
+        durations(folder): function returning {name: seconds} for the tracks of a folder or None
+    """
+
+    def __init__(self, manifests_path, durations=None):
+        self.manifests_path = manifests_path
+        self.durations = durations
+
+    def manifest(self, folder, folder_path):
+        """ the current manifest of the folder or None if the folder does not exist """
+        try:
+            mtime_ns = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return None
+        path = os.path.join(self.manifests_path, manifest_name(folder))
+        manifest = read_manifest(path)
+        if manifest is not None and manifest.get('mtime_ns') == mtime_ns:
+            return manifest
+
+        durations = functools.partial(self.durations, folder) if self.durations is not None else None
+        manifest = build_manifest(folder_path, mtime_ns, manifest, durations)
+        if manifest is None:
+            return None
+        try:
+            if not os.path.isdir(self.manifests_path):
+                os.makedirs(self.manifests_path)
+            write_manifest(path, manifest)
+        except (IOError, OSError) as e:
+            logger.warning('Could not write the manifest of {folder}: {e}'.format(folder=folder, e=e))
+        return manifest
+
+    def contents(self, folder, folder_path):
+        manifest = self.manifest(folder, folder_path)
+        return manifest_contents(manifest) if manifest is not None else None
@@ -141,6 +141,23 @@ foreach($folders as $folder) {
             */
             $spotifyURL = file_get_contents($folder."/spotify.txt");
             $folder_files = array($spotifyURL);
+        } elseif(($folder_files = manifest_tracks($Audio_Folders_Path, $folder)) !== false) {
+            /*
+            * ordinary, local files listed in the manifest of the folder
+            * (see scripts/playlist_manifest.py), no need to scan the folder
+            */
+            foreach ($folder_files as $key => $value) {
+                if ($edition == "plusSpotify") {
+                    $folder_files[$key] = "local:track:".str_replace("%2F", "/", rawurlencode(str_replace($Audio_Folders_Path."/", "", $folder."/".$value)));
+                } elseif ($edition == "classic") {
+                    // the same path as for the scanned folder below, the manifest must not change the playlist
+                    $folder_files[$key] = substr($Audio_Folders_Path."/".$folder."/".$value, strlen($Audio_Folders_Path) + 1, strlen($folder."/".$value));
+                }
+            }
+            /*
+            * order like the scanned folder (the manifest is sorted by python, which may differ in details)
+            */
+            usort($folder_files, 'strnatcasecmp');
         } else {
             /*
             * ordinary, local files
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# In-memory store of the card assignments file (card_assignments_file)
+#
+# The file is parsed once, every value is converted once (like
+# Phoniebox.get_setting does) and kept in a dict of CardSettings records.
+# Changes are tracked, so the file is only written if something changed
+# (e.g. a resume position) and then replaced at once (temp file + rename),
+# a power cut never leaves half a file on the SD card.
+#
+# With thousands of registered cards, parsing every section would cost
+# more than the few cards which are actually used. Reading the file only
+# indexes where the sections are (CardSections), a section is parsed when
+# its card is used first. Sections which were never used are written back
+# as they were read and are compared as text when the file is read again.
+# Sections are parsed on whichever thread uses the card first, the index
+# is changed under CardSections.lock.
+
+import codecs
+import os
+import re
+import threading
+
+from ConfigParserExtended import ConfigParserExtended
+
+
+def str2bool(s):
+    """ convert string to a python boolean """
+    return s.lower() in ("yes", "true", "t", "1")
+
+
+def str2num(s):
+    """ convert string to an int or a float """
+    try:
+        return int(s)
+    except ValueError:
+        return float(s)
+
+
+# like configparser: the name is everything up to the last ], the rest of the line is ignored
+section_re = re.compile(r'^\[(?P<header>[^\n]+)\][^\n]*', re.M)
+option_re = re.compile(r'(?P<key>.*?)\s*(?:(?P<delimiter>[=:])\s*(?P<value>.*))?$')
+
+
+def index_sections(text):
+    """ {section: (start, end) of its options in text}, only the headers are parsed
+        (section headers have to start at the beginning of a line)
+    """
+    sections = {}
+    matches = list(section_re.finditer(text))
+    for number, match in enumerate(matches):
+        end = matches[number + 1].start() if number + 1 < len(matches) else len(text)
+        name = match.group('header')
+        if name in sections:
+            raise ValueError("Section {} is in the card assignments more than once".format(name))
+        sections[name] = (match.end(), end)
+    return sections
+
+
+def parse_options(text):
+    """ the options of one section like ConfigParser(allow_no_value=True, interpolation=None) reads them,
+        but a repeated option replaces the first one and a line without option name is skipped
+        (configparser raises DuplicateOptionError and ParsingError)
+    """
+    # option: lines of the value or None
+    options = {}
+    key = None
+    indent = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            # blank lines belong to a multi-line value, trailing ones are removed below
+            if key is not None and options[key] is not None:
+                options[key].append("")
+            continue
+        if stripped[0] in "#;":
+            continue
+        line_indent = len(line) - len(line.lstrip())
+        if key is not None and line_indent > indent and options[key] is not None:
+            # continuation of a multi-line value
+            options[key].append(stripped)
+            continue
+        indent = line_indent
+        match = option_re.match(stripped)
+        key = match.group('key').rstrip().lower() or None
+        if key is None:
+            continue
+        if match.group('delimiter') is None:
+            # option without value
+            options[key] = None
+        else:
+            options[key] = [match.group('value').strip()]
+    return dict((key, None if lines is None else "\n".join(lines).rstrip()) for key, lines in options.items())
+
+
+def convert(raw):
+    """ value of an option as returned by get_setting """
+    if raw is None:
+        # option without value
+        return -1
+    try:
+        return str2num(raw)
+    except ValueError:
+        return raw
+
+
+class CardSettings(object):
+    """ the settings of one card: raw string and converted value of every option """
+    __slots__ = ('cardid', 'raw', 'values')
+
+    def __init__(self, cardid, options=None):
+        self.cardid = cardid
+        self.raw = {}
+        self.values = {}
+        for key, value in (options or {}).items():
+            self.set(key, value)
+
+    def get(self, key, opt_type="string"):
+        """ the value of the option or -1 if it is not set """
+        if key not in self.raw:
+            return -1
+        if "bool" in opt_type.lower():
+            return self.raw[key] is not None and str2bool(self.raw[key])
+        return self.values[key]
+
+    def set(self, key, value):
+        """ returns True if the value changed """
+        raw = None if value is None else str(value)
+        if key in self.raw and self.raw[key] == raw:
+            return False
+        self.raw[key] = raw
+        self.values[key] = convert(raw)
+        return True
+
+
+class CardSections(object):
+    """ card id -> CardSettings, the section of a card is parsed when it is used first
+
+        text: content of the card assignments file, index: its sections (see index_sections)
+    """
+
+    def __init__(self, text="", index=None):
+        self.text = text
+        self.index = index or {}
+        self.parsed = {}
+        # a card moves from index to parsed at once for every thread
+        self.lock = threading.RLock()
+
+    def unparsed(self, cardid):
+        """ the text of the section of a card which was not used yet, otherwise None """
+        bounds = self.index.get(cardid)
+        if bounds is None:
+            return None
+        return self.text[bounds[0]:bounds[1]]
+
+    def get(self, cardid, default=None):
+        card = self.parsed.get(cardid)
+        if card is None and cardid in self.index:
+            with self.lock:
+                card = self.parsed.get(cardid)
+                if card is None and cardid in self.index:
+                    card = CardSettings(cardid, parse_options(self.unparsed(cardid)))
+                    self.parsed[cardid] = card
+                    del self.index[cardid]
+        return card if card is not None else default
+
+    def __getitem__(self, cardid):
+        card = self.get(cardid)
+        if card is None:
+            raise KeyError(cardid)
+        return card
+
+    def __setitem__(self, cardid, card):
+        with self.lock:
+            self.parsed[cardid] = card
+            self.index.pop(cardid, None)
+
+    def __delitem__(self, cardid):
+        if self.pop(cardid) is None:
+            raise KeyError(cardid)
+
+    def pop(self, cardid, default=None):
+        with self.lock:
+            if cardid in self.index:
+                # not parsed, the card is removed anyway
+                self.get(cardid)
+            return self.parsed.pop(cardid, default)
+
+    def __contains__(self, cardid):
+        with self.lock:
+            return cardid in self.parsed or cardid in self.index
+
+    def keys(self):
+        with self.lock:
+            return list(self.parsed) + list(self.index)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        with self.lock:
+            return len(self.parsed) + len(self.index)
+
+
+class CardAssignments(object):
+    """ card id -> CardSettings, written to path only if dirty """
+
+    # options which change while playing and are kept when the assignments are read again
+    resume_options = ["resume_song", "resume_elapsed"]
+
+    def __init__(self, path=None):
+        self.path = path
+        self.cards = CardSections()
+        self.dirty = False
+        # modification time of the file when it was read or written
+        self.mtime = None
+
+    @classmethod
+    def read(cls, path):
+        """ index the sections of the file, they are parsed when they are used """
+        try:
+            # universal newlines like configparser, a CRLF file is written back with LF
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            mtime = os.stat(path).st_mtime
+        except (IOError, OSError):
+            raise ValueError("Config file {} not found!".format(path))
+        store = cls(path)
+        store.cards = CardSections(text, index_sections(text))
+        store.mtime = mtime
+        return store
+
+    def __contains__(self, cardid):
+        return str(cardid) in self.cards
+
+    def sections(self):
+        return self.cards.keys()
+
+    def get(self, cardid, key, opt_type="string"):
+        """ the value of the option or -1 if the card or option is unknown """
+        card = self.cards.get(str(cardid))
+        if card is None:
+            return -1
+        return card.get(key, opt_type)
+
+    def set(self, cardid, key, value):
+        cardid = str(cardid)
+        if cardid not in self.cards:
+            self.cards[cardid] = CardSettings(cardid)
+        if self.cards[cardid].set(key, value):
+            self.dirty = True
+
+    def set_resume(self, cardid, song, elapsed):
+        """ update the resume position of a known card without marking the file as changed
+            (the positions are kept in the journal, see ResumeJournal.py), returns True if it changed
+        """
+        card = self.cards.get(str(cardid))
+        if card is None:
+            return False
+        changed = card.set("resume_song", song)
+        return card.set("resume_elapsed", elapsed) or changed
+
+    def remove(self, cardid):
+        if self.cards.pop(str(cardid), None) is not None:
+            self.dirty = True
+
+    def update(self, static):
+        """ take the cards of static (read from disk), but keep the resume positions in memory
+            only the sections which differ from the ones in memory are parsed
+        """
+        changed = set(self.cards.keys()) != set(static.cards.keys())
+        for cardid in static.cards.keys():
+            if cardid not in self.cards:
+                continue
+            unparsed = static.cards.unparsed(cardid)
+            if unparsed is not None and unparsed == self.cards.unparsed(cardid):
+                continue
+            current = self.cards[cardid]
+            card = static.cards[cardid]
+            for key in self.resume_options:
+                if key in current.raw:
+                    card.set(key, current.raw[key])
+            if card.raw != current.raw:
+                changed = True
+        self.cards = static.cards
+        if static.mtime is not None:
+            self.mtime = static.mtime
+        if changed:
+            self.dirty = True
+        return changed
+
+    def merge(self, changes):
+        """ replace the options of the changed cards ({cardid: options or None to remove it}),
+            but keep the resume positions in memory, returns True if something changed
+        """
+        changed = False
+        for cardid, options in changes.items():
+            current = self.cards.get(cardid)
+            if options is None:
+                if current is not None:
+                    del self.cards[cardid]
+                    changed = True
+                continue
+            card = CardSettings(cardid, options)
+            if current is not None:
+                for key in self.resume_options:
+                    if key in current.raw:
+                        card.set(key, current.raw[key])
+                if card.raw == current.raw:
+                    continue
+            self.cards[cardid] = card
+            changed = True
+        if changed:
+            self.dirty = True
+        return changed
+
+    def changed_on_disk(self):
+        """ True if the file was modified by someone else since it was read or written """
+        try:
+            return os.stat(self.path).st_mtime != self.mtime
+        except OSError:
+            return False
+
+    def sorted_cardids(self):
+        return sorted(self.cards.keys(), key=lambda c: (len(c), c))
+
+    def as_parser(self, sections=None):
+        """ the cards (or only the given sections) as ConfigParserExtended """
+        parser = ConfigParserExtended(allow_no_value=True, interpolation=None)
+        for cardid in sections or self.sorted_cardids():
+            if cardid not in self.cards:
+                continue
+            parser.add_section(cardid)
+            for key, raw in self.cards[cardid].raw.items():
+                parser.set(cardid, key, raw)
+        return parser
+
+    def write(self, f):
+        """ write the cards like ConfigParser.write, sections which were not used are copied """
+        cards = self.cards
+        with cards.lock:
+            for cardid in self.sorted_cardids():
+                unparsed = cards.unparsed(cardid)
+                if unparsed is not None:
+                    f.write("[{}]{}\n\n".format(cardid, unparsed.rstrip()))
+                    continue
+                f.write("[{}]\n".format(cardid))
+                for key, raw in cards[cardid].raw.items():
+                    if raw is None:
+                        f.write("{}\n".format(key))
+                    else:
+                        f.write("{} = {}\n".format(key, raw.replace("\n", "\n\t")))
+                f.write("\n")
+
+    def save(self, force=False):
+        """ write the file if something changed, returns True if it was written """
+        if not self.dirty and not force:
+            return False
+        temp_path = self.path + ".tmp"
+        with codecs.open(temp_path, 'w', 'utf-8') as f:
+            self.write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        # make the rename itself survive a power cut
+        dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self.mtime = os.stat(self.path).st_mtime
+        self.dirty = False
+        return True
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Feedback sounds (startup sound, card detection sound) without blocking
+#
+# The WAV files are read into memory once. play() only queues the sound,
+# a background thread plays it, so a swipe does not wait for the beep.
+# With pyalsaaudio (pip3 install pyalsaaudio) the thread keeps one ALSA
+# handle open and writes the samples directly; without it, one aplay
+# process per sound gets the file through stdin.
+
+import collections
+import queue
+import subprocess
+import threading
+import wave
+
+try:
+    import alsaaudio
+except ImportError:
+    alsaaudio = None
+
+Sound = collections.namedtuple('Sound', ['channels', 'rate', 'sampwidth', 'frames', 'wav'])
+
+
+def read_sound(path):
+    """ the decoded WAV file """
+    with open(path, 'rb') as f:
+        data = f.read()
+    with wave.open(path, 'rb') as w:
+        return Sound(w.getnchannels(), w.getframerate(), w.getsampwidth(), w.readframes(w.getnframes()), data)
+
+
+class FeedbackSoundPlayer(object):
+    """ plays short WAV files on a background thread """
+
+    # sounds which are played at most after the current one
+    max_queued = 2
+    period_size = 1024
+
+    def __init__(self, device="sysdefault"):
+        self.device = device
+        self.sounds = {}
+        self.queue = queue.Queue(self.max_queued)
+        self.thread = None
+        self.pcm = None
+        self.pcm_format = None
+
+    def load(self, path):
+        """ read the sound into memory (once), returns None if it can not be read """
+        if path not in self.sounds:
+            try:
+                self.sounds[path] = read_sound(path)
+            except (IOError, OSError, EOFError, wave.Error) as e:
+                print("Could not read sound {}: {}".format(path, e))
+                self.sounds[path] = None
+        return self.sounds[path]
+
+    def play(self, path):
+        """ queue the sound and return at once """
+        sound = self.load(path)
+        if sound is None:
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="FeedbackSound", daemon=True)
+            self.thread.start()
+        try:
+            self.queue.put_nowait(sound)
+        except queue.Full:
+            # a lot of swipes in a row, one beep is enough
+            pass
+
+    def run(self):
+        while True:
+            sound = self.queue.get()
+            try:
+                if alsaaudio is not None:
+                    self.play_alsa(sound)
+                else:
+                    self.play_aplay(sound)
+            except Exception as e:
+                print("Could not play sound: {}".format(e))
+                self.pcm = None
+
+    def open_pcm(self, sound):
+        pcm_format = (sound.channels, sound.rate, sound.sampwidth)
+        if self.pcm is not None and self.pcm_format == pcm_format:
+            return self.pcm
+        formats = {1: alsaaudio.PCM_FORMAT_U8, 2: alsaaudio.PCM_FORMAT_S16_LE,
+                   3: alsaaudio.PCM_FORMAT_S24_3LE, 4: alsaaudio.PCM_FORMAT_S32_LE}
+        pcm = alsaaudio.PCM(alsaaudio.PCM_PLAYBACK, device=self.device)
+        pcm.setchannels(sound.channels)
+        pcm.setrate(sound.rate)
+        pcm.setformat(formats[sound.sampwidth])
+        pcm.setperiodsize(self.period_size)
+        self.pcm = pcm
+        self.pcm_format = pcm_format
+        return pcm
+
+    def play_alsa(self, sound):
+        pcm = self.open_pcm(sound)
+        chunk = self.period_size * sound.channels * sound.sampwidth
+        for start in range(0, len(sound.frames), chunk):
+            pcm.write(sound.frames[start:start + chunk])
+
+    def play_aplay(self, sound):
+        aplay = subprocess.Popen(["aplay", "-q", "-D", self.device, "-"], stdin=subprocess.PIPE)
+        aplay.communicate(sound.wav)
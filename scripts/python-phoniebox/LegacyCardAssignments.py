@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Incremental translation of the legacy card assignments
+#
+# The legacy web interface assigns a card with a file named after the card
+# id in shared/shortcuts (first line: the audio folder) and keeps the
+# settings of the folder in <audio folder>/folder.conf. LegacyTranslator
+# remembers the modification time and size of every shortcut and
+# folder.conf it translated; translate() only reads the files which
+# changed since the last call and returns the changed cards, so the
+# periodic translation costs one listing of the shortcuts folder.
+
+import os
+
+# folder.conf setting: card setting (None: not translated)
+CARDSETTINGS_MAP = {"CURRENTFILENAME": None,
+                    "ELAPSED": "resume_elapsed",
+                    "PLAYSTATUS": None,
+                    "RESUME": "resume",
+                    "SHUFFLE": "random",
+                    "LOOP": "repeat"}
+
+
+def is_int(s):
+    """ return True if string is an int """
+    try:
+        int(s)
+        return True
+    except ValueError:
+        return False
+
+
+def signature(path):
+    """ modification time and size of a file or None if it does not exist """
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    return (status.st_mtime_ns, status.st_size)
+
+
+def read_uri(path):
+    with open(path, encoding='utf-8') as f:
+        return f.readline().strip()
+
+
+def read_folderconf(path):
+    """ the card settings of a folder.conf """
+    settings = {}
+    with open(path, encoding='utf-8') as f:
+        lines = f.readlines()
+    for line in lines:
+        if "=" not in line:
+            continue
+        key, value = line.strip().replace('"', '').split("=", 1)
+        if CARDSETTINGS_MAP.get(key) is None:
+            continue
+        if key != "ELAPSED":
+            #  ignore 0 and OFF values
+            settings[CARDSETTINGS_MAP[key]] = "0" if value in ("0", "OFF") else "1"
+        else:
+            try:
+                elapsed_val = float(value)
+            except ValueError:
+                elapsed_val = 0
+            settings[CARDSETTINGS_MAP[key]] = str(elapsed_val)
+    return settings
+
+
+class LegacyTranslator(object):
+    """ translates the shortcuts and folder.conf files which changed into card settings
+
+        defaults: the options of every card (default_cardsettings)
+        known: card ids which are reported as removed if they have no shortcut
+    """
+
+    def __init__(self, shortcuts_path, audiofolders_path, defaults, known=()):
+        self.shortcuts_path = shortcuts_path
+        self.audiofolders_path = audiofolders_path
+        self.defaults = dict(defaults)
+        # card id: (signature of the shortcut, uri, signature of folder.conf)
+        self.cards = dict((cardid, None) for cardid in known)
+
+    def translate_card(self, cardid, uri, folderconf):
+        options = dict(self.defaults)
+        options["cardid"] = cardid
+        options["uri"] = uri
+        if folderconf is not None and os.path.isfile(folderconf):
+            options.update(read_folderconf(folderconf))
+        return options
+
+    def translate(self):
+        """ the cards which changed since the last call: {card id: options or None if removed} """
+        changes = {}
+        found = set()
+        shortcuts = [entry for entry in os.scandir(self.shortcuts_path) if is_int(entry.name) and entry.is_file()]
+        for entry in shortcuts:
+            cardid = entry.name
+            found.add(cardid)
+            status = entry.stat()
+            shortcut = (status.st_mtime_ns, status.st_size)
+            known = self.cards.get(cardid)
+            if known is not None and known[0] == shortcut:
+                uri = known[1]
+            else:
+                try:
+                    uri = read_uri(entry.path)
+                except (IOError, OSError, UnicodeDecodeError):
+                    continue
+            folderconf = None
+            if self.audiofolders_path is not None:
+                folderconf = os.path.join(self.audiofolders_path, uri, "folder.conf")
+            state = (shortcut, uri, signature(folderconf) if folderconf is not None else None)
+            if known == state:
+                continue
+            changes[cardid] = self.translate_card(cardid, uri, folderconf)
+            self.cards[cardid] = state
+        for cardid in set(self.cards) - found:
+            changes[cardid] = None
+            del self.cards[cardid]
+        return changes
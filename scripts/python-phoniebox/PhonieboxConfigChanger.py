@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 
 # import json
-import os, sys, signal
+import csv
+import os, sys
 # from mpd import MPDClient
 import configparser
 # from RawConfigParserExtended import RawConfigParserExtended
@@ -40,44 +41,61 @@ class PhonieboxConfigChanger(Phoniebox):
     def __init__(self, configFilePath=defaultconfigFilePath):
         Phoniebox.__init__(self, configFilePath)
 
-    def assigncard(self, cardid, uri):
-        section = cardid
+    def assigncard(self, cardid, uri, save=True):
         # set uri and cardid for card (section = cardid)
-        if not section in self.cardAssignments.sections():
-            self.cardAssignments.add_section(section)
-        self.cardAssignments.set(section, "cardid", cardid)
-        self.cardAssignments.set(section, "uri", uri)
-        # write updated assignments to file
-        with open(self.config['card_assignments_file'], 'w') as cardAssignmentsFile:
-            self.cardAssignments.write(cardAssignmentsFile)
-
-    def removecard(self, cardid):
-        section = cardid
-        if section in self.cardAssignments.sections():
-            self.cardAssignments.remove_section(section)
-        # write updated assignments to file
-        with open(self.config['card_assignments_file'], 'w') as f:
-            self.cardAssignments.write(f)
+        self.cardAssignments.set(cardid, "cardid", cardid)
+        self.cardAssignments.set(cardid, "uri", uri)
+        # write updated assignments to file (if they changed), replaced at once
+        if save:
+            self.cardAssignments.save()
+
+    def assigncards(self, assignments):
+        """ assign all cards of [(cardid, uri), ...] and write the file once """
+        for cardid, uri in assignments:
+            self.assigncard(cardid, uri, save=False)
+        return self.cardAssignments.save()
+
+    def removecard(self, cardid, save=True):
+        self.cardAssignments.remove(cardid)
+        # write updated assignments to file (if they changed), replaced at once
+        if save:
+            self.cardAssignments.save()
+
+    def importcsv(self, csvfile):
+        """ assign the cards of a CSV file as exported by htdocs/rfidExportCsv.php
+            (header "id","value"), control cards ("%CMD...%") are skipped
+        """
+        assignments = []
+        with open(csvfile, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                cardid = (row.get("id") or "").strip()
+                uri = (row.get("value") or "").strip()
+                if not cardid or not uri:
+                    continue
+                if uri.startswith("%") and uri.endswith("%"):
+                    self.log("Skipping control card {} ({}).".format(cardid, uri), 3)
+                    continue
+                assignments.append((cardid, uri))
+        self.assigncards(assignments)
+        self.log("Assigned {} cards from {}.".format(len(assignments), csvfile), 3)
 
     def set(self, section, key, value):
-        try:
-            num = int(section)
-            parser = self.cardAssignments
-            config_file = self.config.get("phoniebox", "card_assignments_file")
-        except ValueError:
-            parser = self.config
+        if is_int(section):
+            self.cardAssignments.set(section, key, value)
+            self.cardAssignments.save()
+            return
+        parser = self.config
         # update value
         try:
             parser.set(section, key, value)
-            self.debug("Set {} = {} in section {}".format(key, value, section))
+            self.log("Set {} = {} in section {}".format(key, value, section), 5)
         except configparser.NoSectionError as e:
             raise e
 
     def get(self, section, t="ini"):
-        try:
-            num = int(section)
-            parser = self.cardAssignments
-        except ValueError:
+        if is_int(section):
+            parser = self.cardAssignments.as_parser([section])
+        else:
             parser = self.config
 
         if t == "json":
@@ -87,15 +105,18 @@ class PhonieboxConfigChanger(Phoniebox):
         else:
             print(parser.print_ini(section))
 
-    def print_usage(self):
-        print("Usage: {} set ".format(sys.argv[0]))
+    @staticmethod
+    def print_usage():
+        print("Usage: {} [configfile] assigncard <cardid> <uri> | removecard <cardid> | "
+              "importcsv <csvfile> | set <section> <key> <value> | get <section> [ini|json|dict]".format(sys.argv[0]))
 
 
-def main(self):
+def main():
 
-    cmdlist = ["assigncard", "removecard", "set", "get"]
+    cmdlist = ["assigncard", "removecard", "importcsv", "set", "get"]
 
-    if len(sys.argv) < 1:
+    if len(sys.argv) < 2:
+        PhonieboxConfigChanger.print_usage()
         sys.exit()
     else:
         if sys.argv[1] in cmdlist:
@@ -110,29 +131,31 @@ def main(self):
         ConfigChanger = PhonieboxConfigChanger(configFilePath)
         try:
             if cmd == "assigncard":
-                cardid = sys.argv[2+shift]
-                uri = sys.argv[3+shift]
+                cardid = sys.argv[2 + shift]
+                uri = sys.argv[3 + shift]
                 ConfigChanger.assigncard(cardid, uri)
             elif cmd == "removecard":
-                cardid = sys.argv[2+shift]
+                cardid = sys.argv[2 + shift]
                 ConfigChanger.removecard(cardid)
+            elif cmd == "importcsv":
+                ConfigChanger.importcsv(sys.argv[2 + shift])
             elif cmd == "set":
-                section = sys.argv[2+shift]
-                key = sys.argv[3+shift]
-                value = sys.argv[4+shift]
+                section = sys.argv[2 + shift]
+                key = sys.argv[3 + shift]
+                value = sys.argv[4 + shift]
                 ConfigChanger.set(section, key, value)
             elif cmd == "get":
-                section = sys.argv[2+shift]
+                section = sys.argv[2 + shift]
                 try:
-                    t = sys.argv[3+shift]
+                    t = sys.argv[3 + shift]
                 except:
                     t = "ini"
                 ConfigChanger.get(section, t)
             else:
                 # will never be reached
                 print("supported commands are {} and {}".format(", ".join(cmdlist[:-1]), cmdlist[-1]))
-        except:
-            self.print_usage()
+        except IndexError:
+            ConfigChanger.print_usage()
 
 
 if __name__ == "__main__":
@@ -1,51 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-# import threading
 import sys, os.path
 import signal
+import configparser
+from functools import partial
 from Phoniebox import Phoniebox
-from time import sleep, time
+from ResumeJournal import ResumeCheckpointer
+from mpd import MPDError
+from time import monotonic, time
+# the event loop, file watcher and MPD state are shared with the other python daemons in scripts/
+from event_loop import EventLoop, Worker, add_card_reader
+from file_watcher import FileWatcher
+from mpd_state import MpdState
 
 # get absolute path of this script
 dir_path = os.path.dirname(os.path.realpath(__file__))
 defaultconfigFilePath = os.path.join(dir_path, 'phoniebox.conf')
 
-# watchdog blocks the script, so it cannot be used in the same file as the PhonieboxDaemon
-# from watchdog.observers import Observer
-# from watchdog.events import FileSystemEventHandler
-# from os.path import dirname
-
-# class FileModifiedHandler(FileSystemEventHandler):
-
-#    """ watch the given file for changes and execute callback function on modification """
-#    def __init__(self, file_path, callback):
-#        self.file_path = file_path
-#        self.callback = callback
-
-#        # set observer to watch for changes in the directory
-#        self.observer = Observer()
-#        self.observer.schedule(self, dirname(file_path), recursive=False)
-#        self.observer.start()
-#        try:
-#            while True:
-#                sleep(1)
-#        except KeyboardInterrupt:
-#            self.observer.stop()
-#        self.observer.join()
-#
-#    def on_modified(self, event):
-#        # only act on the change that we're looking for
-#        if not event.is_directory and event.src_path.endswith(self.file_path):
-#            daemon.log("cardAssignmentsFile modified!",3)
-#            self.callback() # call callback
-
 
 class PhonieboxDaemon(Phoniebox):
     """ This subclass of Phoniebox is to be called directly, running as RFID reader daemon """
 
     def __init__(self, configFilePath=defaultconfigFilePath):
         Phoniebox.__init__(self, configFilePath)
+        self.configFilePath = configFilePath
         self.lastplayedID = 0
 
     def run(self):
@@ -58,82 +37,146 @@ class PhonieboxDaemon(Phoniebox):
         self.mpd_init_settings()
         state = self.client.status()["state"]
 
-        daemon.play_alsa(daemon.get_setting("phoniebox", 'startup_sound'))
+        # save the resume position of the playing card in the background
+        mpd = self.settings.mpd
+        self.mpdState = MpdState(mpd.host, mpd.port, mpd.password)
+        self.checkpointer = ResumeCheckpointer(self.cardAssignments, self.resumeJournal, self.mpdState,
+                                               self.settings.phoniebox.resume_checkpoint_interval)
+        self.checkpointer.start()
+        self.mpdState.start()
+
+        # read the sounds into memory before the first swipe
+        if self.settings.phoniebox.card_detection_sound is not None:
+            self.feedbackSounds.load(self.settings.phoniebox.card_detection_sound)
+        if self.settings.phoniebox.startup_sound is not None:
+            self.play_alsa(self.settings.phoniebox.startup_sound)
         if state == "play":
             self.client.play()
 
-        # launch watcher for config files, blocks the script
-        # TODO: it would be better to watch the changes with a second process that
-        # tells the PhonieboxDaemon to reload the config whenever needed.
-
-        # card_assignments_file = daemon.get_setting("phoniebox","card_assignments_file")
-        # cardAssignmentsWatchdog = FileModifiedHandler(card_assignments_file, self.update_cardAssignments)
-        # ConfigWatchdog = FileModifiedHandler(configFilePath, self.read_config)
-
-#        # start_reader runs an endless loop, nothing will be executed afterwards
-        daemon.start_reader()
+        # start_reader runs the event loop, nothing will be executed afterwards
+        self.start_reader()
 
     def start_reader(self):
+        """ read cards on an event loop, MPD commands and file writes run in their own threads
+
+            A slow SD card or a hanging MPD does not hold up reading the next card.
+        """
         from Reader import Reader
         reader = Reader()
 
-        card_detection_sound = self.get_setting("phoniebox", "card_detection_sound")
-        debounce_time = self.get_setting("phoniebox", "debounce_time")
-        if debounce_time == -1:
-            debounce_time = 0.5
-        second_swipe_delay = self.get_setting("phoniebox", "second_swipe_delay")
-        if second_swipe_delay == -1:
-            second_swipe_delay = 0
-        store_card_assignments = self.get_setting("phoniebox", "store_card_assignments")
-        if store_card_assignments == -1:
-            store_card_assignments = 30
-        last_swipe = 0
-        last_write_card_assignments = 0
-
-        while True:
-            # reading the card id
-            cardid = reader.reader.readCard()
-#            cardid = None
-#            sleep(debounce_time)
-            try:
-                # start the player script and pass on the cardid
-                if cardid is not None:
-                    print("Card ID: {}".format(int(cardid)))
-                    filename = self.get_setting("phoniebox", "Latest_RFID_file")
-                    if filename != -1:
-                        self.print_to_file(filename, "\'{}\' was used at {}".format(cardid, time()))
-                    if card_detection_sound != -1:
-                        self.play_alsa(card_detection_sound)
-                    if cardid in self.cardAssignments.sections():
-                        # second swipe detection
-                        if int(cardid) == int(self.lastplayedID) and time()-last_swipe > second_swipe_delay:
-                            self.log("Second swipe for {}".format(cardid), 3)
-                            self.do_second_swipe()
-                        # if first swipe, just play
-                        else:
-                            last_swipe = time()
-                            self.do_start_playlist(cardid)
-                        # do not react for debounce_time
-                        sleep(debounce_time)
-                    else:
-                        self.log("Card with ID {} not mapped yet.".format(cardid), 1)
-
-            except OSError as e:
-                print("Execution failed:", e)
-
-            # check if it is time for the next update of the cardAssignments and do it
-            # Note: this is purely time-based and not clever at all. Find a
-            # TODO: find a better way to check for changes in the files on disk to trigger the update
-            if time()-last_write_card_assignments > store_card_assignments and store_card_assignments != False:
-                # store card assignments
-                if self.get_setting("phoniebox", "translate_legacy_cardassignments", "bool") == True:
-                    legacy_cardAssignments = self.translate_legacy_cardAssignments(last_write_card_assignments)
-                    self.update_cardAssignments(legacy_cardAssignments)
-                else:
-                    self.update_cardAssignments(self.read_cardAssignments)
-
-                self.write_new_cardAssignments()
-                last_write_card_assignments = time()
+        self.loop = EventLoop()
+        # a few swipes may wait for MPD, more are dropped
+        self.mpdWorker = Worker("mpd-commands", maxsize=2)
+        self.persistenceWorker = Worker("persistence", maxsize=4)
+        self.ignoreCardsUntil = 0
+        self.lastSwipe = 0
+        # the card assignments file changed and has to be read again / the reload is in the queue
+        self.reloadPending = False
+        self.reloadQueued = False
+
+        add_card_reader(self.loop, reader.reader, self.on_card)
+        watcher = FileWatcher(self.loop)
+        watcher.watch_file(self.configFilePath, self.on_config_changed)
+        watcher.watch_file(self.cardAssignments.path, self.on_cardAssignments_changed)
+        self.schedule(self.settings.phoniebox.store_card_assignments, self.on_store_timer)
+        self.schedule(15, self.on_keepalive_timer)
+        self.loop.run_forever()
+
+    def schedule(self, delay, callback):
+        if delay:
+            self.loop.call_later(delay, callback)
+
+    def on_card(self, cardid):
+        # debounce without sleeping, the loop keeps running
+        if monotonic() < self.ignoreCardsUntil:
+            return
+        print("Card ID: {}".format(cardid))
+        settings = self.settings.phoniebox
+        filename = settings.latest_rfid_file
+        if filename is not None:
+            self.persistenceWorker.submit(partial(self.print_to_file, filename,
+                                                  "\'{}\' was used at {}".format(cardid, time())))
+        # feedback for every card, also for the ones which are not mapped yet
+        # the loop only queues the sound, MPD is paused by the MPD worker
+        if settings.card_detection_sound is not None:
+            self.feedbackSounds.play(settings.card_detection_sound)
+        if cardid not in self.cardAssignments:
+            self.log("Card with ID {} not mapped yet.".format(cardid), 1)
+            if settings.card_detection_sound is not None:
+                self.mpdWorker.submit(self.pause_mpd)
+            return
+        if self.mpdWorker.submit(partial(self.play_card, cardid)):
+            # do not react for debounce_time
+            self.ignoreCardsUntil = monotonic() + self.settings.phoniebox.debounce_time
+
+    def play_card(self, cardid):
+        """ runs in the MPD worker """
+        settings = self.settings.phoniebox
+        try:
+            if settings.card_detection_sound is not None:
+                self.client.pause()
+            # second swipe detection
+            if str(cardid) == str(self.lastplayedID) and monotonic() - self.lastSwipe > settings.second_swipe_delay:
+                self.log("Second swipe for {}".format(cardid), 3)
+                self.do_second_swipe()
+            # if first swipe, just play
+            else:
+                self.lastSwipe = monotonic()
+                self.do_start_playlist(cardid)
+        except (OSError, MPDError) as e:
+            print("Execution failed:", e)
+
+    def pause_mpd(self):
+        """ runs in the MPD worker while the card detection sound of an unmapped card plays """
+        try:
+            self.client.pause()
+        except (OSError, MPDError) as e:
+            print("Execution failed:", e)
+
+    def on_store_timer(self):
+        self.persistenceWorker.submit(self.store_cardAssignments)
+        self.schedule(self.settings.phoniebox.store_card_assignments, self.on_store_timer)
+
+    def on_keepalive_timer(self):
+        self.mpdWorker.submit(self.client.keepalive)
+        # a reload which did not fit into the queue (the store timer can be turned off)
+        self.submit_reload()
+        self.schedule(15, self.on_keepalive_timer)
+
+    def store_cardAssignments(self):
+        """ runs in the persistence worker """
+        with self.checkpointer.lock:
+            if self.settings.phoniebox.translate_legacy_cardassignments:
+                # reads only the shortcuts and folder.conf files which changed
+                self.translate_legacy_cardAssignments()
+            # written only if an assignment changed
+            self.write_new_cardAssignments()
+
+    def on_cardAssignments_changed(self):
+        self.reloadPending = True
+        self.submit_reload()
+
+    def submit_reload(self):
+        """ queue one reload however often the file changed, retried by the keepalive timer if the queue is full """
+        if self.reloadPending and not self.reloadQueued:
+            self.reloadQueued = self.persistenceWorker.submit(self.reload_cardAssignments)
+
+    def reload_cardAssignments(self):
+        """ runs in the persistence worker after the card assignments file was changed """
+        # changes from now on need another reload
+        self.reloadQueued = False
+        self.reloadPending = False
+        with self.checkpointer.lock:
+            if not self.settings.phoniebox.translate_legacy_cardassignments and self.cardAssignments.changed_on_disk():
+                self.update_cardAssignments(self.read_cardAssignments())
+
+    def on_config_changed(self):
+        try:
+            self.read_config(self.configFilePath)
+        except (ValueError, configparser.Error) as e:
+            self.log("Keeping the previous configuration, {} is invalid: {}".format(self.configFilePath, e), 1)
+            return
+        self.log("Read configuration {} again.".format(self.configFilePath), 3)
 
     def signal_handler(self, signal, frame):
         """ catches signal and triggers the graceful exit """
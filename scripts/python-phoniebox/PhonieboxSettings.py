@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Snapshot of phoniebox.conf
+#
+# The configuration is interpolated and converted once when it is read
+# (Phoniebox.read_config) instead of on every get_setting call. The known
+# settings are declared in SCHEMA with their type and default and are
+# available as attributes, e.g. settings.phoniebox.log_level. A setting
+# which can not be converted raises ValueError while reading the
+# configuration, not in the middle of a swipe.
+
+import configparser
+
+from CardAssignments import convert, str2bool
+
+
+def path(s):
+    """ a path or None if it is empty """
+    return s or None
+
+
+# marks a setting which has to be in the configuration
+REQUIRED = object()
+
+# section: [(key, type, default)], keys in lower case like configparser returns them
+SCHEMA = {
+    "phoniebox": [
+        ("log_level", int, 3),
+        ("debounce_time", float, 0.5),
+        ("audiofolders_path", path, None),
+        ("card_assignments_file", path, REQUIRED),
+        ("card_detection_sound", path, None),
+        ("startup_sound", path, None),
+        ("alsa_device", str, "sysdefault"),
+        ("latest_rfid_file", path, None),
+        ("translate_legacy_cardassignments", str2bool, False),
+        ("shortcuts_path", path, None),
+        ("store_card_assignments", float, 30),
+        ("resume_checkpoint_interval", float, 10),
+        ("second_swipe", str, "default"),
+        ("second_swipe_delay", float, 0),
+        ("init_volume", int, 0),
+        ("max_volume", int, 100),
+        ("volume_step", int, 2),
+    ],
+    "mpd": [
+        ("host", str, "localhost"),
+        ("port", int, 6600),
+        ("timeout", float, 3),
+        ("password", path, None),
+    ],
+}
+
+
+class Section(object):
+    """ the typed settings of one section as attributes """
+
+    def __init__(self, name, values):
+        self.name = name
+        self.__dict__.update(values)
+
+
+class PhonieboxSettings(object):
+    """ converted values of all options of a configuration (ConfigParser) """
+
+    def __init__(self, parser):
+        # section: {key: raw value}, interpolated once
+        self.raw = {}
+        # section: {key: value as returned by get_setting}
+        self.values = {}
+        for section in parser.sections():
+            try:
+                self.raw[section] = dict(parser.items(section))
+            except configparser.InterpolationError as e:
+                raise ValueError("Invalid configuration in section [{}]: {}".format(section, e))
+            self.values[section] = dict((key, convert(raw)) for key, raw in self.raw[section].items())
+
+        for section, options in SCHEMA.items():
+            raw = self.raw.get(section, {})
+            values = {}
+            for key, opt_type, default in options:
+                if key not in raw or raw[key] is None:
+                    if default is REQUIRED:
+                        raise ValueError("Missing setting {} in section [{}]".format(key, section))
+                    values[key] = default
+                    continue
+                try:
+                    values[key] = opt_type(raw[key])
+                except ValueError:
+                    raise ValueError("Invalid setting \"{} = {}\" in section [{}]".format(key, raw[key], section))
+            setattr(self, section, Section(section, values))
+
+    def get(self, section, key, opt_type="string"):
+        """ the value like Phoniebox.get_setting returns it: -1 if it is not set """
+        if section not in self.values:
+            print("No section {}".format(section))
+            return -1
+        if key.lower() not in self.values[section]:
+            print("No option {} in section {}".format(key, section))
+            return -1
+        key = key.lower()
+        if "bool" in opt_type.lower():
+            return self.raw[section][key] is not None and str2bool(self.raw[section][key])
+        return self.values[section][key]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Resume positions which survive a power cut
+#
+# ResumeCheckpointer follows the player state of MPD (mpd_state.py, idle)
+# and takes the position of the playing card whenever MPD reports a change
+# (pause, next track, ...) and every checkpoint_interval seconds while
+# playing. A new position is only kept in the card assignments in memory
+# and appended as one line to the journal next to card_assignments_file,
+# the card assignments file itself is not written for it.
+#
+# On start the journal is replayed. When the card assignments file is
+# written anyway (or the journal has more than max_entries lines) the
+# positions are in the file and the journal is emptied (compaction).
+
+import json
+import os
+import threading
+import time
+
+
+class ResumeJournal(object):
+    """ append-only file of resume positions, one JSON object per line """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = 0
+
+    def replay(self):
+        """ the last position of every card in the journal: {cardid: (song, elapsed)} """
+        positions = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except (IOError, OSError):
+            return positions
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                positions[entry["cardid"]] = (entry["song"], entry["elapsed"])
+            except (ValueError, KeyError, TypeError):
+                # the last line of a power cut
+                continue
+        self.entries = len(lines)
+        return positions
+
+    def append(self, cardid, song, elapsed):
+        line = json.dumps({"cardid": cardid, "song": song, "elapsed": elapsed}, separators=(',', ':'))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries += 1
+
+    def clear(self):
+        """ the positions are in the card assignments file now """
+        if self.entries == 0:
+            return
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.entries = 0
+
+
+class ResumeCheckpointer(object):
+    """ keeps the resume position of the playing card up to date
+
+        mpd_state: mpd_state.MpdState the player state is taken from
+    """
+
+    def __init__(self, cardAssignments, journal, mpd_state, checkpoint_interval=10, max_entries=500):
+        self.cardAssignments = cardAssignments
+        self.journal = journal
+        # the playing card and since when (states of MPD from before belong to the previous card)
+        self.cardid = None
+        self.since = 0
+        self.mpd_state = mpd_state
+        self.checkpoint_interval = checkpoint_interval
+        self.max_entries = max_entries
+        # the journal is emptied only together with writing the card assignments file
+        self.lock = threading.RLock()
+        self.thread = None
+
+    def card_started(self, cardid):
+        self.since = time.monotonic()
+        self.cardid = str(cardid)
+
+    def card_stopped(self):
+        self.cardid = None
+
+    def record(self, cardid, song, elapsed):
+        """ keep a position in memory and in the journal (if it changed) """
+        with self.lock:
+            if not self.cardAssignments.set_resume(cardid, song, elapsed):
+                return
+            self.journal.append(cardid, song, elapsed)
+            if self.journal.entries > self.max_entries:
+                self.compact()
+
+    def checkpoint(self, player=None):
+        player = player or self.mpd_state.state
+        cardid = self.cardid
+        if cardid is None or player.received < self.since:
+            return
+        if player.state not in ("play", "pause") or "song" not in player.status:
+            return
+        if self.cardAssignments.get(cardid, "resume") not in (-1, 1):
+            return
+        self.record(cardid, player.status["song"], "{:.3f}".format(player.elapsed))
+
+    def on_change(self, player, changes):
+        if changes.status or changes.song:
+            self.checkpoint(player)
+
+    def save(self, force=False):
+        """ write the card assignments file if it changed (or force) and empty the journal then """
+        with self.lock:
+            written = self.cardAssignments.save(force)
+            if written:
+                self.journal.clear()
+            return written
+
+    def compact(self):
+        """ write the positions to the card assignments file and empty the journal """
+        return self.save(force=True)
+
+    def run(self):
+        while True:
+            time.sleep(self.checkpoint_interval)
+            if self.mpd_state.state.state == "play":
+                self.checkpoint()
+
+    def start(self):
+        self.mpd_state.subscribe(self.on_change)
+        if self.checkpoint_interval > 0:
+            self.thread = threading.Thread(target=self.run, name="ResumeCheckpointer", daemon=True)
+            self.thread.start()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Settings of daemon_rfid_reader.py which are read from the settings folder.
+#
+# The settings are parsed once into a ReaderSettings snapshot and parsed
+# again when the web app changes one of the files. Code on the card path
+# only reads the already converted values of the current snapshot.
+
+import collections
+import logging
+import os
+
+from card_ids import FORMATS, LEGACY
+from playback_engine import read_first_line, read_shell_config
+
+logger = logging.getLogger(__name__)
+
+ReaderSettings = collections.namedtuple('ReaderSettings', [
+    'same_id_delay',         # Second_Swipe_Pause: seconds until the same card is accepted again
+    'control_cards_nodelay',  # Second_Swipe_Pause_Controls: control cards ignore same_id_delay
+    'swipe_or_place',        # Swipe_or_Place: SWIPENOTPLACE or PLACENOTSWIPE
+    'card_removal_timeout',  # Card_Removal_Timeout: seconds until a card counts as removed, None for default
+    'control_cards',         # CMD... card ids in global.conf
+    'card_id_format',        # Card_Id_Format: LEGACY or CANONICAL card ids, see card_ids.py
+])
+
+SETTINGS_FILES = ['Second_Swipe_Pause', 'Second_Swipe_Pause_Controls', 'Swipe_or_Place',
+                  'Card_Removal_Timeout', 'Card_Id_Format', 'global.conf']
+
+
+def load_control_cards(global_conf_path):
+    """ returns the ids of the control cards (CMD... in global.conf) as frozenset """
+    if not os.path.isfile(global_conf_path):
+        return frozenset()
+    config = read_shell_config(global_conf_path)
+    return frozenset(value for key, value in config.items() if key.startswith('CMD') and value)
+
+
+def load_reader_settings(settings_path):
+    """ read all settings, raises ValueError if a setting is invalid """
+    def setting(name, default):
+        return read_first_line(os.path.join(settings_path, name), default) or default
+
+    removal_timeout = setting('Card_Removal_Timeout', None)
+    card_id_format = setting('Card_Id_Format', LEGACY)
+    if card_id_format not in FORMATS:
+        raise ValueError('Card_Id_Format must be one of {formats}'.format(formats=', '.join(FORMATS)))
+    return ReaderSettings(
+        same_id_delay=float(setting('Second_Swipe_Pause', '2')),
+        control_cards_nodelay=setting('Second_Swipe_Pause_Controls', 'ON') == 'ON',
+        swipe_or_place=setting('Swipe_or_Place', 'SWIPENOTPLACE'),
+        card_removal_timeout=float(removal_timeout) if removal_timeout is not None else None,
+        control_cards=load_control_cards(os.path.join(settings_path, 'global.conf')),
+        card_id_format=card_id_format,
+    )
+
+
+class ReaderSettingsCache(object):
+    """ holds the current ReaderSettings and replaces them when a settings file changes """
+
+    def __init__(self, settings_path, watcher=None, on_change=None):
+        self.settings_path = settings_path
+        self.on_change = on_change
+        self.settings = load_reader_settings(settings_path)
+        if watcher is not None:
+            for name in SETTINGS_FILES:
+                watcher.watch_file(os.path.join(settings_path, name), self.reload)
+
+    def reload(self):
+        try:
+            settings = load_reader_settings(self.settings_path)
+        except ValueError as e:
+            logger.error('Invalid settings, keeping the previous ones: {e}'.format(e=e))
+            return
+        if settings != self.settings:
+            logger.info('Settings changed: {settings}'.format(settings=settings))
+            self.settings = settings
+            if self.on_change is not None:
+                self.on_change(settings)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Card reader backends of Reader.py
+#
+# Every backend lives in its own module, which is only imported when its
+# reader is configured in deviceName.txt. So a box with a USB reader never
+# loads pirc522, serial, RPi.GPIO or smartcard and the other way round.
+#
+# deviceName.txt contains one line per reader, either the name of a backend
+# (MFRC522, RDM6300, PN532, PCSC) or the name of a USB input device. A USB
+# device can be given as "name;phys" to choose between several devices of
+# the same name (RegisterDevice.py.Multi). A USB reader which sends hex
+# card ids and presses shift for the letters A-F gets the option shift as
+# third field, e.g. "RFID;;shift" or "RFID;usb-front/input0;shift"; its
+# card ids are decoded with upper case letters instead of an X for every
+# shift press (see keycode_decoder.py).
+
+import collections
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# name in deviceName.txt: module and class of the backend
+BACKENDS = collections.OrderedDict([
+    ('MFRC522', ('readers.mfrc522', 'Mfrc522Reader')),
+    ('RDM6300', ('readers.rdm6300', 'Rdm6300Reader')),
+    ('PN532', ('readers.pn532', 'Pn532Reader')),
+    ('PCSC', ('readers.pcsc', 'PcscReader')),
+])
+# backend of all readers which are not listed in BACKENDS
+USB_BACKEND = ('readers.usb', 'UsbReader')
+
+DeviceEntry = collections.namedtuple('DeviceEntry', ['name', 'phys', 'shift'])
+DeviceEntry.__new__.__defaults__ = (False,)
+
+
+class NonUsbDevice(object):
+    """ entry of get_devices() for a reader which is not a USB input device """
+    name = None
+
+    def __init__(self, name, phys=''):
+        self.name = name
+        self.phys = phys
+
+
+def load_backend(backend):
+    """ import the module of a backend and return its reader class """
+    module_name, class_name = backend
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def read_device_file(path):
+    """ read the readers registered in deviceName.txt as list of DeviceEntry """
+    entries = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+            name, _, options = line.partition(';')
+            phys, _, options = options.partition(';')
+            shift = 'shift' in [option.strip() for option in options.split(',')]
+            entries.append(DeviceEntry(name, phys or None, shift))
+    return entries
+
+
+def create_readers(entries):
+    """ create the reader backends for the entries of deviceName.txt
+        all USB devices are read by one UsbReader
+    """
+    readers = []
+    usb_entries = []
+    for entry in entries:
+        if entry.name in BACKENDS:
+            logger.debug('Loading {name} reader'.format(name=entry.name))
+            readers.append(load_backend(BACKENDS[entry.name])())
+        else:
+            usb_entries.append(entry)
+    if usb_entries:
+        readers.append(load_backend(USB_BACKEND).from_entries(usb_entries))
+    return readers
+
+
+def get_devices():
+    """ all readers which can be registered: the non-USB backends followed by the USB input devices """
+    devices = [NonUsbDevice(name) for name in BACKENDS]
+    try:
+        from readers.usb import list_input_devices
+    except ImportError:
+        logger.warning('evdev is not installed, USB readers are not listed')
+        return devices
+    return devices + list_input_devices()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# Interface of the reader backends
+
+
+class CardReader(object):
+    """ base class of the reader backends
+
+        readCard(): block until a card is read, returns the card id or None
+        pollCard(): check the field once without blocking, returns the card id
+            or None if there is no card (only backends with can_poll = True)
+        cleanup(): release the hardware
+    """
+    # the backend can tell if a card is in the field (card presence detection)
+    can_poll = False
+    # seconds between two pollCard() calls
+    poll_interval = 0.05
+
+    def readCard(self):
+        raise NotImplementedError
+
+    def pollCard(self):
+        raise NotImplementedError('{name} can not poll for cards'.format(name=type(self).__name__))
+
+    def cleanup(self):
+        pass
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# MFRC522 reader connected to the SPI bus
+#
+# pirc522 sets up the SPI bus, the reset line and the IRQ line (GPIO 18,
+# board numbering). The card communication is done here on register level:
+# * the MFRC522 pulls the IRQ line when a frame was received or its timer
+#   ran out (no card answered), so the reader sleeps on the IRQ instead of
+#   reading the interrupt register over SPI until the command has finished
+#   (pirc522 does that busy-polling and re-initializes the chip for every
+#   REQA in wait_for_tag())
+# * the UID of the card in the field is cached: as long as the card answers
+#   a WUPA it is still there, without anticollision. The card is put into
+#   HALT after every check, so it answers the next WUPA right away.
+# * the field is checked every poll_interval seconds
+# Without a wired IRQ line the reader still works, every command then takes
+# the full timeout.
+
+import logging
+import time
+
+from card_ids import CardId
+from readers.base import CardReader
+
+logger = logging.getLogger(__name__)
+
+# registers
+COMMAND_REG = 0x01
+COM_IEN_REG = 0x02
+COM_IRQ_REG = 0x04
+ERROR_REG = 0x06
+FIFO_DATA_REG = 0x09
+FIFO_LEVEL_REG = 0x0A
+BIT_FRAMING_REG = 0x0D
+
+# commands
+IDLE = 0x00
+TRANSMIT = 0x04
+TRANSCEIVE = 0x0C
+
+# bits of ComIrqReg and ComIEnReg
+IRQ_INV = 0x80
+RX_IRQ = 0x20
+IDLE_IRQ = 0x10
+ERR_IRQ = 0x02
+TIMER_IRQ = 0x01
+# BufferOvfl, CollErr, ParityErr, ProtocolErr
+ERRORS = 0x1B
+
+# ISO 14443A frames
+REQA = 0x26
+WUPA = 0x52
+ANTICOLL = [0x93, 0x20]
+# HLTA with its CRC_A
+HLTA = [0x50, 0x00, 0x57, 0xCD]
+
+POLL_INTERVAL = 0.05
+
+
+def card_id(uid):
+    """ the card id is made of the decimal values of the UID and its check byte like it always was
+        (the canonical card id leaves the check byte out)
+    """
+    return CardId(''.join(str(x) for x in uid), uid[:4])
+
+
+class Mfrc522(object):
+    """ commands of the MFRC522 over SPI
+
+        transfer: function doing a full duplex SPI transfer (spidev's xfer2)
+        irq: threading.Event which is set when the IRQ line becomes active or None
+        timeout: seconds to wait for the end of a command (the chip's timer is set to 25ms)
+    """
+
+    def __init__(self, transfer, irq=None, timeout=0.03):
+        self.transfer = transfer
+        self.irq = irq
+        self.timeout = timeout
+        if irq is not None:
+            # the IRQ line is active (low) when a frame was received, the timer ran out or a command ended
+            self.write(COM_IEN_REG, IRQ_INV | RX_IRQ | IDLE_IRQ | ERR_IRQ | TIMER_IRQ)
+
+    def write(self, register, *values):
+        self.transfer([(register << 1) & 0x7E] + list(values))
+
+    def read(self, register, count=1):
+        address = ((register << 1) & 0x7E) | 0x80
+        return self.transfer([address] * count + [0])[1:]
+
+    def start(self, command, data, last_bits=0):
+        self.write(COMMAND_REG, IDLE)
+        # clear the interrupt flags and the FIFO
+        self.write(COM_IRQ_REG, 0x7F)
+        self.write(FIFO_LEVEL_REG, 0x80)
+        self.write(FIFO_DATA_REG, *data)
+        self.write(BIT_FRAMING_REG, last_bits)
+        if self.irq is not None:
+            self.irq.clear()
+        self.write(COMMAND_REG, command)
+        if command == TRANSCEIVE:
+            # StartSend
+            self.write(BIT_FRAMING_REG, 0x80 | last_bits)
+
+    def wait(self, flags):
+        """ wait until one of the interrupt flags is set, returns ComIrqReg """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self.irq is not None:
+                self.irq.wait(max(0, deadline - time.monotonic()))
+                self.irq.clear()
+            irq = self.read(COM_IRQ_REG)[0]
+            if irq & flags or time.monotonic() >= deadline:
+                return irq
+
+    def transceive(self, data, last_bits=0):
+        """ send a frame to the card, returns the answer or None """
+        self.start(TRANSCEIVE, data, last_bits)
+        irq = self.wait(RX_IRQ | ERR_IRQ | TIMER_IRQ)
+        if not irq & RX_IRQ or self.read(ERROR_REG)[0] & ERRORS:
+            return None
+        length = self.read(FIFO_LEVEL_REG)[0]
+        return self.read(FIFO_DATA_REG, length) if length else []
+
+    def transmit(self, data):
+        """ send a frame the card does not answer """
+        self.start(TRANSMIT, data)
+        self.wait(IDLE_IRQ | ERR_IRQ)
+
+    def request(self, mode=WUPA):
+        """ returns True if a card answered the REQA or WUPA """
+        atqa = self.transceive([mode], last_bits=7)
+        return atqa is not None and len(atqa) == 2
+
+    def anticoll(self):
+        """ UID and check byte of the card or None """
+        uid = self.transceive(ANTICOLL)
+        if uid is None or len(uid) != 5 or uid[0] ^ uid[1] ^ uid[2] ^ uid[3] != uid[4]:
+            return None
+        return uid
+
+    def halt(self):
+        self.transmit(HLTA)
+
+
+class Mfrc522Reader(CardReader):
+    can_poll = True
+
+    def __init__(self, chip=None, poll_interval=POLL_INTERVAL):
+        self.rfid = None
+        if chip is None:
+            import pirc522
+            self.rfid = pirc522.RFID()
+            chip = Mfrc522(self.rfid.spi_transfer, self.rfid.irq)
+        self.chip = chip
+        self.poll_interval = poll_interval
+        self.uid = None
+
+    def read_uid(self):
+        """ full WUPA and anticollision, returns the card id or None """
+        self.uid = None
+        if self.chip.request(WUPA):
+            self.uid = self.chip.anticoll()
+            self.chip.halt()
+        return card_id(self.uid) if self.uid is not None else None
+
+    def readCard(self):
+        # Scan for cards every poll_interval seconds
+        while True:
+            cardid = self.read_uid()
+            if cardid is not None:
+                logger.info(cardid)
+                return cardid
+            time.sleep(self.poll_interval)
+
+    def pollCard(self):
+        # Check the field once without waiting for a tag (used for card presence detection)
+        if self.uid is None:
+            return self.read_uid()
+        if not self.chip.request(WUPA):
+            self.uid = None
+            return None
+        self.chip.halt()
+        return card_id(self.uid)
+
+    def cleanup(self):
+        if self.rfid is not None:
+            self.rfid.cleanup()
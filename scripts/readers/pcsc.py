@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# PC/SC readers (pcscd)
+# Requirements
+# apt install pcscd python3-pyscard
+#
+# The context and the list of readers are kept from one card to the next.
+# The readers are only listed again when pcscd reports that readers were
+# plugged in or out (PnP notification) or a reader went away. The state of
+# the readers tells if a card is in the field, so the UID is only read once
+# when a card is put on a reader and pollCard() does not talk to the card.
+
+import logging
+import time
+
+from smartcard.scard import (INFINITE, SCARD_E_INVALID_HANDLE, SCARD_E_NO_READERS_AVAILABLE,
+                             SCARD_E_NO_SERVICE, SCARD_E_READER_UNAVAILABLE, SCARD_E_SERVICE_STOPPED,
+                             SCARD_E_TIMEOUT, SCARD_E_UNKNOWN_READER, SCARD_LEAVE_CARD, SCARD_PROTOCOL_T0,
+                             SCARD_PROTOCOL_T1, SCARD_S_SUCCESS, SCARD_SCOPE_USER, SCARD_SHARE_SHARED,
+                             SCARD_STATE_CHANGED, SCARD_STATE_PRESENT, SCARD_STATE_UNAWARE, SCardConnect,
+                             SCardDisconnect, SCardEstablishContext, SCardGetErrorMessage,
+                             SCardGetStatusChange, SCardListReaders, SCardReleaseContext, SCardTransmit,
+                             error)
+from smartcard.util import PACK, toHexString
+
+from card_ids import CardId
+from readers.base import CardReader
+
+logger = logging.getLogger(__name__)
+
+# APDU which returns the UID of the card
+GET_UID = [0xFF, 0xCA, 0x00, 0x00, 0x00]
+# pseudo reader which changes its state when readers are plugged in or out
+PNP_NOTIFICATION = '\\\\?PnP?\\Notification'
+# errors after which the context is established again
+CONTEXT_ERRORS = (SCARD_E_NO_SERVICE, SCARD_E_SERVICE_STOPPED, SCARD_E_INVALID_HANDLE)
+# errors after which the readers are listed again
+READER_ERRORS = (SCARD_E_UNKNOWN_READER, SCARD_E_READER_UNAVAILABLE)
+# seconds to wait before trying again if pcscd is not available
+RETRY_DELAY = 1
+
+
+def check(hresult, message):
+    if hresult != SCARD_S_SUCCESS:
+        raise error('{message}: {error}'.format(message=message, error=SCardGetErrorMessage(hresult)))
+
+
+class PcscReader(CardReader):
+    can_poll = True
+
+    def __init__(self):
+        self.hcontext = None
+        # (reader, state) as passed to SCardGetStatusChange
+        self.states = []
+        # UID of the card on a reader, None if it could not be read
+        self.uids = {}
+        self.cards = []
+        self.retry_at = 0
+
+    def establish(self):
+        hresult, self.hcontext = SCardEstablishContext(SCARD_SCOPE_USER)
+        check(hresult, 'Failed to establish context')
+        self.states = []
+        self.uids = {}
+        self.list_readers()
+
+    def release(self):
+        if self.hcontext is not None:
+            hresult = SCardReleaseContext(self.hcontext)
+            if hresult != SCARD_S_SUCCESS:
+                logger.debug('Failed to release context: ' + SCardGetErrorMessage(hresult))
+            self.hcontext = None
+
+    def list_readers(self):
+        hresult, readers = SCardListReaders(self.hcontext, [])
+        if hresult == SCARD_E_NO_READERS_AVAILABLE:
+            readers = []
+        else:
+            check(hresult, 'Failed to list readers')
+        logger.debug('PC/SC readers: {readers}'.format(readers=readers))
+        known = dict(self.states)
+        self.states = [(reader, known.get(reader, SCARD_STATE_UNAWARE)) for reader in readers]
+        self.states.append((PNP_NOTIFICATION, known.get(PNP_NOTIFICATION, SCARD_STATE_UNAWARE)))
+        self.uids = dict((reader, uid) for reader, uid in self.uids.items() if reader in readers)
+
+    def update(self, timeout):
+        """ wait up to timeout ms for a reader to change its state
+            returns the UIDs of the cards which were put on a reader
+        """
+        if self.hcontext is None:
+            self.establish()
+        hresult, newstates = SCardGetStatusChange(self.hcontext, timeout, self.states)
+        if hresult == SCARD_E_TIMEOUT:
+            return []
+        if hresult in CONTEXT_ERRORS:
+            self.release()
+            check(hresult, 'Lost connection to pcscd')
+        if hresult in READER_ERRORS:
+            self.list_readers()
+            return []
+        check(hresult, 'Failed to get status change')
+
+        placed = []
+        plugged = False
+        self.states = []
+        for reader, eventstate, atr in newstates:
+            if reader == PNP_NOTIFICATION:
+                plugged = bool(eventstate & SCARD_STATE_CHANGED)
+            elif eventstate & SCARD_STATE_PRESENT:
+                if reader not in self.uids:
+                    self.uids[reader] = self.read_uid(reader)
+                    placed.append(self.uids[reader])
+            else:
+                self.uids.pop(reader, None)
+            self.states.append((reader, eventstate & ~SCARD_STATE_CHANGED))
+        if plugged:
+            self.list_readers()
+        return [uid for uid in placed if uid is not None]
+
+    def read_uid(self, reader):
+        hresult, hcard, protocol = SCardConnect(
+            self.hcontext, reader, SCARD_SHARE_SHARED, SCARD_PROTOCOL_T0 | SCARD_PROTOCOL_T1)
+        if hresult != SCARD_S_SUCCESS:
+            logger.warning('Failed to connect to the card: ' + SCardGetErrorMessage(hresult))
+            return None
+        try:
+            hresult, response = SCardTransmit(hcard, protocol, GET_UID)
+        finally:
+            SCardDisconnect(hcard, SCARD_LEAVE_CARD)
+        if hresult != SCARD_S_SUCCESS or response[-2:] != [0x90, 0x00]:
+            logger.warning('Failed to read the UID of the card')
+            return None
+        # the card id includes the status bytes (9000) like it always did
+        return CardId(toHexString(response, PACK), response[:-2])
+
+    def readCard(self):
+        while not self.cards:
+            try:
+                self.cards.extend(self.update(INFINITE))
+            except error as e:
+                logger.error(e)
+                time.sleep(RETRY_DELAY)
+        return self.cards.pop(0)
+
+    def pollCard(self):
+        if time.monotonic() < self.retry_at:
+            return None
+        try:
+            self.update(0)
+        except error as e:
+            logger.error(e)
+            self.retry_at = time.monotonic() + RETRY_DELAY
+            return None
+        return next((uid for uid in self.uids.values() if uid is not None), None)
+
+    def cleanup(self):
+        self.release()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# PN532 reader connected to the I2C bus (py532lib)
+
+import logging
+
+from py532lib.i2c import Pn532_i2c
+from py532lib.mifare import MIFARE_WAIT_FOR_ENTRY, Mifare
+
+from card_ids import CardId
+from readers.base import CardReader
+
+logger = logging.getLogger(__name__)
+
+
+class Pn532Reader(CardReader):
+    can_poll = True
+
+    def __init__(self):
+        Pn532_i2c()
+        self.device = Mifare()
+        self.device.SAMconfigure()
+        self.max_retries = None
+
+    def set_max_retries(self, max_retries):
+        # only send the RF configuration to the PN532 if it changes
+        if max_retries != self.max_retries:
+            self.device.set_max_retries(max_retries)
+            self.max_retries = max_retries
+
+    def readCard(self):
+        self.set_max_retries(MIFARE_WAIT_FOR_ENTRY)
+        uid = self.device.scan_field()
+        return CardId(str(+int('0x' + uid.hex(), 0)), uid)
+
+    def pollCard(self):
+        # Check the field once without waiting for a tag (used for card presence detection)
+        self.set_max_retries(1)
+        uid = self.device.scan_field()
+        if not uid:
+            return None
+        return CardId(str(+int('0x' + uid.hex(), 0)), uid)
+
+    def cleanup(self):
+        # Not sure if something needs to be done here.
+        logger.debug("PN532Reader clean up.")
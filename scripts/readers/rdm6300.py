@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# RDM6300 125kHz reader connected to the serial port (pyserial)
+#
+# The RDM6300 sends a frame of 14 bytes for a tag: STX, 10 hex digits of
+# data, 2 hex digits of checksum (xor of the 5 data bytes), ETX. It repeats
+# the frame as long as the tag is in the field.
+#
+# The bytes are read in bulk (whatever the serial port has available) into a
+# buffer, from which Rdm6300FrameDecoder takes the complete frames. Frames
+# with a wrong checksum are dropped. Repeated frames of a tag which stays in
+# the field are reported once. The same tag is reported again when it was
+# out of the field for hold_time seconds, so a second swipe works.
+
+import collections
+import logging
+import sys
+import time
+
+import serial
+
+from card_ids import CardId
+from readers.base import CardReader
+
+logger = logging.getLogger(__name__)
+
+STX = 0x02
+ETX = 0x03
+FRAME_LENGTH = 14
+
+
+def wiegand26(raw_card_id):
+    """ the 5 data bytes of the 12 hex digits of a frame, None if the checksum is wrong """
+    try:
+        values = bytearray.fromhex(raw_card_id)
+    except ValueError:
+        return None
+    checksum = 0
+    for value in values[:5]:
+        checksum ^= value
+    if len(values) != 6 or checksum != values[5]:
+        return None
+    return values[:5]
+
+
+def format_card_id(raw_card_id, number_format=''):
+    w26 = wiegand26(raw_card_id)
+    # the factory code w26[0] is ignored (also by the canonical card id)
+    if number_format == 'card_id_dec':
+        # this will return a 10 Digit card ID e.g. 0006762840
+        return CardId('{0:010d}'.format((w26[1] << 24) + (w26[2] << 16) + (w26[3] << 8) + w26[4]), w26[1:])
+    if number_format == 'card_id_float':
+        # this will return card ID as fraction e.g. 103,12632
+        return CardId('{0:d},{1:05d}'.format(((w26[1] << 8) + w26[2]), ((w26[3] << 8) + w26[4])), w26[1:])
+    # this will return the raw (original) card ID e.g. 070067315809
+    return CardId(raw_card_id, w26[1:])
+
+
+class Rdm6300FrameDecoder(object):
+    """ takes the frames out of the bytes read from the RDM6300 """
+
+    def __init__(self, hold_time=0.5):
+        self.hold_time = hold_time
+        self.buffer = bytearray()
+        self.card_id = None
+        self.last_seen = 0
+
+    def feed(self, data):
+        """ add the bytes read from the serial port
+            returns the raw card ids of the tags which came into the field
+        """
+        self.buffer += data
+        cards = []
+        while True:
+            start = self.buffer.find(STX)
+            if start < 0:
+                del self.buffer[:]
+                break
+            if len(self.buffer) - start < FRAME_LENGTH:
+                del self.buffer[:start]
+                break
+            if self.buffer[start + FRAME_LENGTH - 1] != ETX:
+                # not the start of a frame, look for the next STX
+                del self.buffer[:start + 1]
+                continue
+            raw_card_id = self.buffer[start + 1:start + FRAME_LENGTH - 1].decode('ascii', 'replace')
+            del self.buffer[:start + FRAME_LENGTH]
+            if wiegand26(raw_card_id) is None:
+                logger.debug('Dropping frame with wrong checksum: {raw}'.format(raw=raw_card_id))
+                continue
+            if self.seen(raw_card_id):
+                cards.append(raw_card_id)
+        return cards
+
+    def seen(self, raw_card_id):
+        """ remember the tag in the field, returns True if it just came into the field """
+        now = time.monotonic()
+        new = raw_card_id != self.card_id or now - self.last_seen >= self.hold_time
+        self.card_id = raw_card_id
+        self.last_seen = now
+        return new
+
+    def present(self):
+        """ raw card id of the tag in the field or None """
+        if self.card_id is not None and time.monotonic() - self.last_seen < self.hold_time:
+            return self.card_id
+        return None
+
+
+class Rdm6300Reader(CardReader):
+    can_poll = True
+
+    def __init__(self, param=None):
+        device = '/dev/ttyS0'
+        baudrate = 9600
+        ser_timeout = 0.1
+        try:
+            self.rfid_serial = serial.Serial(device, baudrate, timeout=ser_timeout)
+        except serial.SerialException as e:
+            logger.error(e)
+            sys.exit(1)
+
+        # The Rdm6300Reader supports 2 Additional Number Formats which can bee choosen
+        # by an optional parameter dictionary:
+        # {'numberformat':'card_id_float'} or {'numberformat':'card_id_dec'}
+        self.number_format = ''
+        if param is not None:
+            nf = param.get("numberformat")
+            if nf is not None:
+                self.number_format = nf
+        self.decoder = Rdm6300FrameDecoder()
+        self.cards = collections.deque()
+
+    def read_available(self, block):
+        """ read all bytes the serial port has, wait for the first one (up to the timeout) if block is True """
+        waiting = self.rfid_serial.in_waiting
+        if waiting or block:
+            self.cards.extend(self.decoder.feed(self.rfid_serial.read(waiting or 1)))
+
+    def readCard(self):
+        try:
+            while not self.cards:
+                self.read_available(True)
+        except serial.SerialException as se:
+            logger.error(se)
+            return None
+        return format_card_id(self.cards.popleft(), self.number_format)
+
+    def pollCard(self):
+        try:
+            self.read_available(False)
+        except serial.SerialException as se:
+            logger.error(se)
+            return None
+        self.cards.clear()
+        card_id = self.decoder.present()
+        return format_card_id(card_id, self.number_format) if card_id is not None else None
+
+    def cleanup(self):
+        self.rfid_serial.close()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# USB readers which type the card id like a keyboard (evdev input devices)
+#
+# Several devices can be read at the same time. Every device has its own
+# KeycodeDecoder, so swipes on different readers do not get mixed up. The
+# decoder of a device registered with the option shift decodes the letters
+# typed with shift as upper case letters (see readers/__init__.py).
+# readEvents(fd) returns the completed card ids as CardEvent with the phys
+# path of the device as reader_id.
+
+import collections
+import logging
+import sys
+from select import select
+
+from evdev import InputDevice, ecodes, list_devices
+
+from keycode_decoder import KeycodeDecoder
+from readers.base import CardReader
+
+logger = logging.getLogger(__name__)
+
+CardEvent = collections.namedtuple('CardEvent', ['reader_id', 'cardid', 'timestamp'])
+
+# keys every keyboard has (KEY_ESC up to KEY_S), see is_keyboard()
+KEYBOARD_KEYS = set(range(ecodes.KEY_ESC, ecodes.KEY_D))
+
+
+def list_input_devices():
+    return [InputDevice(fn) for fn in list_devices()]
+
+
+def is_keyboard(device):
+    """ some readers (e.g. KKMOON, HID 413d:2107) show up twice, only one of them sends the keys """
+    keys = device.capabilities().get(ecodes.EV_KEY, [])
+    return KEYBOARD_KEYS.issubset(keys) and 0 not in keys
+
+
+def find_device(devices, entry):
+    candidates = [device for device in devices
+                  if device.name == entry.name and (entry.phys is None or device.phys == entry.phys)]
+    if len(candidates) > 1:
+        candidates = [device for device in candidates if is_keyboard(device)] or candidates
+    return candidates[0] if candidates else None
+
+
+class UsbReader(CardReader):
+    """ devices: the evdev input devices, shift: the ones which send hex card ids with shift for A-F """
+
+    def __init__(self, devices, shift=()):
+        self.devices = {dev.fd: dev for dev in devices}
+        self.decoders = {dev.fd: KeycodeDecoder(shift=dev in shift) for dev in devices}
+        self.pending = collections.deque()
+
+    @classmethod
+    def from_entries(cls, entries):
+        """ reader for the USB devices of the deviceName.txt entries which are connected """
+        input_devices = list_input_devices()
+        devices = []
+        shift = []
+        for entry in entries:
+            device = find_device(input_devices, entry)
+            if device is None:
+                logger.error('Could not find the device {name}'.format(name=entry.name))
+                continue
+            devices.append(device)
+            if entry.shift:
+                shift.append(device)
+        if not devices:
+            sys.exit('Could not find the device %s\n. Make sure it is connected' %
+                     ', '.join(entry.name for entry in entries))
+        return cls(devices, shift)
+
+    def readEvents(self, fd):
+        """ read the available key events of one device
+            returns the card ids completed by them as list of CardEvent
+        """
+        cards = []
+        dev = self.devices[fd]
+        try:
+            events = list(dev.read())
+        except BlockingIOError:
+            return cards
+        for cardid, event in self.decoders[fd].decode_events(events):
+            cards.append(CardEvent(dev.phys, cardid, event.timestamp()))
+        return cards
+
+    def readCardEvent(self):
+        """ block until any of the devices sent a card id, returns it as CardEvent """
+        while not self.pending:
+            r, w, x = select(self.devices, [], [])
+            for fd in r:
+                self.pending.extend(self.readEvents(fd))
+        return self.pending.popleft()
+
+    def readCard(self):
+        return self.readCardEvent().cardid
+
+    def cleanup(self):
+        for dev in self.devices.values():
+            dev.close()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the scripts are no package, make them importable like daemon_rfid_reader.py does
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# the modules of python-phoniebox import each other the same way
+sys.path.insert(1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python-phoniebox')))
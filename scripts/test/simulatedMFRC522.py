@@ -0,0 +1,103 @@
+# Register model of an MFRC522 with an ISO 14443A card in its field
+# for the tests of readers/mfrc522.py
+
+import threading
+
+from readers.mfrc522 import (ANTICOLL, BIT_FRAMING_REG, COM_IEN_REG, COM_IRQ_REG, COMMAND_REG, FIFO_DATA_REG,
+                             FIFO_LEVEL_REG, HLTA, IDLE_IRQ, REQA, RX_IRQ, TIMER_IRQ, TRANSCEIVE, TRANSMIT, WUPA)
+
+ATQA = [0x04, 0x00]
+
+
+class SimulatedMFRC522(object):
+
+    def __init__(self):
+        self.registers = [0] * 64
+        self.fifo = []
+        self.irq = threading.Event()
+        self.uid = None
+        self.card_state = 'IDLE'
+        # frames sent to the card
+        self.frames = []
+        self.transfers = 0
+
+    def place(self, uid):
+        self.uid = list(uid) + [uid[0] ^ uid[1] ^ uid[2] ^ uid[3]]
+        self.card_state = 'IDLE'
+
+    def remove(self):
+        self.uid = None
+
+    def transfer(self, data):
+        """ spidev's xfer2: the first byte is the address, reads return the value of the previous address """
+        self.transfers += 1
+        address = (data[0] >> 1) & 0x3F
+        if not data[0] & 0x80:
+            for value in data[1:]:
+                self.write(address, value)
+            return [0] * len(data)
+        result = [0]
+        for value in data[1:]:
+            result.append(self.read(address))
+            address = (value >> 1) & 0x3F
+        return result
+
+    def read(self, address):
+        if address == FIFO_DATA_REG:
+            return self.fifo.pop(0) if self.fifo else 0
+        if address == FIFO_LEVEL_REG:
+            return len(self.fifo)
+        return self.registers[address]
+
+    def write(self, address, value):
+        if address == FIFO_DATA_REG:
+            self.fifo.append(value)
+        elif address == FIFO_LEVEL_REG:
+            if value & 0x80:
+                self.fifo = []
+        elif address == COM_IRQ_REG:
+            if value & 0x80:
+                self.set_irq(value & 0x7F)
+            else:
+                self.registers[COM_IRQ_REG] &= ~value
+        elif address == COMMAND_REG:
+            self.registers[COMMAND_REG] = value
+            if value == TRANSMIT:
+                self.send()
+                self.set_irq(IDLE_IRQ)
+        elif address == BIT_FRAMING_REG:
+            self.registers[BIT_FRAMING_REG] = value & 0x7F
+            if value & 0x80 and self.registers[COMMAND_REG] == TRANSCEIVE:
+                answer = self.send()
+                if answer is None:
+                    self.set_irq(TIMER_IRQ)
+                else:
+                    self.fifo = answer
+                    self.set_irq(RX_IRQ)
+        else:
+            self.registers[address] = value
+
+    def set_irq(self, flags):
+        self.registers[COM_IRQ_REG] |= flags
+        if self.registers[COM_IRQ_REG] & self.registers[COM_IEN_REG] & 0x7F:
+            self.irq.set()
+
+    def send(self):
+        frame, self.fifo = self.fifo, []
+        self.frames.append(frame)
+        if self.uid is None:
+            return None
+        if frame == [WUPA] or (frame == [REQA] and self.card_state != 'HALT'):
+            if self.card_state == 'READY':
+                # a card which is not idle goes back to idle on an unexpected frame
+                self.card_state = 'IDLE'
+                return None
+            self.card_state = 'READY'
+            return list(ATQA)
+        if frame == ANTICOLL and self.card_state == 'READY':
+            return list(self.uid)
+        if frame == HLTA:
+            self.card_state = 'HALT'
+        elif self.card_state == 'READY':
+            self.card_state = 'IDLE'
+        return None
@@ -0,0 +1,166 @@
+import configparser
+import io
+import os
+import sys
+import threading
+
+import pytest
+from mock import patch
+
+from CardAssignments import CardAssignments, index_sections, parse_options
+
+TEXT = """[1234]
+uri = line1
+    line2
+
+    line3
+
+# not part of the value
+resume = 1
+Random: 0
+
+[  456  ]
+shuffle
+; comment
+    ; indented comment
+uri=Hörspiel/Folge 1
+empty =
+
+[789] ; rest of the header line
+  indented = option
+  next = option
+"""
+
+
+def write(path, content, newline=None):
+    with open(str(path), 'w', encoding='utf-8', newline=newline) as f:
+        f.write(content)
+
+
+def configparser_sections(path):
+    parser = configparser.ConfigParser(allow_no_value=True, interpolation=None)
+    parser.read(str(path), encoding='utf-8')
+    return dict((section, dict(parser.items(section))) for section in parser.sections())
+
+
+def card_sections(store):
+    return dict((cardid, dict(store.cards[cardid].raw)) for cardid in store.sections())
+
+
+def test_parse_like_configparser():
+    parser = configparser.ConfigParser(allow_no_value=True, interpolation=None)
+    parser.read_string(TEXT)
+    index = index_sections(TEXT)
+    assert sorted(index) == sorted(parser.sections())
+    for section, (start, end) in index.items():
+        assert parse_options(TEXT[start:end]) == dict(parser.items(section))
+    assert parse_options(TEXT[slice(*index['1234'])])['uri'] == 'line1\nline2\n\nline3'
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_read_like_configparser(tmp_path, newline):
+    write(tmp_path / 'cards.txt', TEXT, newline)
+    assert card_sections(CardAssignments.read(str(tmp_path / 'cards.txt'))) == \
+        configparser_sections(tmp_path / 'cards.txt')
+
+
+def test_duplicate_section():
+    with pytest.raises(ValueError):
+        index_sections('[1]\nuri = a\n[1]\nuri = b\n')
+
+
+def test_save_and_read_again(tmp_path):
+    path = str(tmp_path / 'cards.txt')
+    write(path, TEXT, '\r\n')
+    store = CardAssignments.read(path)
+    store.set('1234', 'resume_elapsed', '12.5')
+    store.set('1111', 'uri', 'new\n\nlines')
+    assert store.save()
+
+    saved = configparser_sections(path)
+    assert card_sections(CardAssignments.read(path)) == saved
+    assert saved['1234']['uri'] == 'line1\nline2\n\nline3'
+    assert saved['1234']['resume_elapsed'] == '12.5'
+    assert saved['1111'] == {'uri': 'new\n\nlines'}
+    assert saved['  456  ']['shuffle'] is None
+    with open(path, 'rb') as f:
+        assert b'\r' not in f.read()
+
+
+def test_write_while_cards_are_parsed(tmp_path):
+    path = str(tmp_path / 'cards.txt')
+    write(path, ''.join('[{0}]\nuri = Folder {0}\n\n'.format(cardid) for cardid in range(2000)))
+    store = CardAssignments.read(path)
+    errors = []
+
+    def parse():
+        try:
+            for cardid in range(2000):
+                store.get(cardid, 'uri')
+        except Exception as e:
+            errors.append(e)
+    interval = sys.getswitchinterval()
+    # switch threads as often as possible
+    sys.setswitchinterval(1e-6)
+    try:
+        thread = threading.Thread(target=parse)
+        thread.start()
+        while thread.is_alive():
+            f = io.StringIO()
+            store.write(f)
+            assert len(index_sections(f.getvalue())) == 2000
+        thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+
+@pytest.fixture
+def store(tmp_path):
+    write(tmp_path / 'cards.txt', '[1234]\nuri = Book\nresume = 1\n\n[5678]\nuri = Music\n')
+    return CardAssignments.read(str(tmp_path / 'cards.txt'))
+
+
+def test_only_changes_make_the_store_dirty(store):
+    store.set(1234, 'uri', 'Book')
+    store.set_resume(1234, '2', '30.0')
+    store.remove(9999)
+    assert not store.dirty
+    assert not store.save()
+
+    store.set(1234, 'uri', 'Other')
+    assert store.dirty
+    assert store.save()
+    assert not store.dirty
+    assert CardAssignments.read(store.path).get(1234, 'uri') == 'Other'
+
+    store.remove(5678)
+    assert store.dirty
+
+
+def test_failed_save_keeps_the_file(store):
+    with open(store.path) as f:
+        before = f.read()
+    store.set(1234, 'uri', 'Other')
+    with patch('CardAssignments.os.replace', side_effect=OSError('disk full')):
+        with pytest.raises(OSError):
+            store.save()
+    with open(store.path) as f:
+        assert f.read() == before
+    assert store.dirty
+
+
+def test_update_keeps_the_resume_positions(store):
+    store.set_resume(1234, '2', '30.0')
+    write(store.path, '[1234]\nuri = Book\nresume = 1\n\n[5678]\nuri = Other\n')
+    assert store.update(CardAssignments.read(store.path))
+    assert store.get(5678, 'uri') == 'Other'
+    assert store.get(1234, 'resume_elapsed') == 30.0
+
+
+def test_changed_on_disk(store):
+    assert not store.changed_on_disk()
+    os.utime(store.path, (store.mtime + 10, store.mtime + 10))
+    assert store.changed_on_disk()
+    store.save(force=True)
+    assert not store.changed_on_disk()
@@ -0,0 +1,35 @@
+from card_ids import CANONICAL, LEGACY, CardId, canonical_card_id, migrate, mfrc522_uid, normalize
+
+UID = bytes([0xDE, 0xAD, 0xBE, 0xEF])
+
+
+def test_canonical_card_id_is_padded():
+    assert canonical_card_id(UID) == '3735928559'
+    assert canonical_card_id(bytes([0x04, 0x2A, 0x71, 0x9C])) == '0069890460'
+    assert len(canonical_card_id(bytes(7))) == 17
+
+
+def test_card_id_is_the_legacy_card_id():
+    cardid = CardId('22217319023934', UID)
+    assert cardid == '22217319023934'
+    assert cardid.canonical == '3735928559'
+    assert normalize(cardid, LEGACY) == '22217319023934'
+    assert normalize(cardid, CANONICAL) == '3735928559'
+
+
+def test_card_id_without_uid_is_not_changed():
+    assert normalize('0012345678', CANONICAL) == '0012345678'
+
+
+def test_legacy_card_ids_of_all_backends():
+    assert migrate(['22217319023934'], 'MFRC522') == {'22217319023934': '3735928559'}
+    assert migrate(['3735928559'], 'PN532') == {'3735928559': '3735928559'}
+    assert migrate(['DEADBEEF9000'], 'PCSC') == {'DEADBEEF9000': '3735928559'}
+    assert migrate(['0006762840', '103,12632', '070067315809'], 'RDM6300') == {
+        '0006762840': '0006762840', '103,12632': '0006762840', '070067315809': '0006762840'}
+
+
+def test_ambiguous_mfrc522_card_id_is_not_converted():
+    # 4 42 113 156 195 and 44 2 113 156 195 both have a matching check byte
+    assert mfrc522_uid('442113156195') is None
+    assert migrate(['442113156195', 'no card'], 'MFRC522') == {}
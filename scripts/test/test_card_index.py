@@ -0,0 +1,94 @@
+import os
+import shutil
+
+import pytest
+
+from card_index import CardIndex, list_folder
+from event_loop import EventLoop
+from file_watcher import FileWatcher
+
+
+def write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def shared(tmp_path):
+    (tmp_path / 'shortcuts').mkdir()
+    (tmp_path / 'Book' / 'CD1').mkdir(parents=True)
+    write(tmp_path / 'shortcuts' / '1234', 'Book\n')
+    for name in ['10.mp3', '02.mp3', 'folder.conf', 'cover.jpg', '.hidden', 'Book.m3u']:
+        write(tmp_path / 'Book' / name, '')
+    return tmp_path
+
+
+@pytest.fixture
+def loop():
+    return EventLoop()
+
+
+@pytest.fixture
+def index(shared, loop):
+    return CardIndex(str(shared / 'shortcuts'), FileWatcher(loop, settle_time=0))
+
+
+def test_list_folder(shared):
+    contents = list_folder(str(shared / 'Book'))
+    assert contents.tracks == ['02.mp3', '10.mp3']
+    assert 'folder.conf' in contents.names
+    assert list_folder(str(shared / 'missing')) is None
+
+
+def test_without_watcher_nothing_is_cached(shared):
+    index = CardIndex(str(shared / 'shortcuts'))
+    assert index.folder('1234') == 'Book'
+    write(shared / 'shortcuts' / '1234', 'Other\n')
+    assert index.folder('1234') == 'Other'
+    assert index.folder('5678') is None
+
+
+def test_changed_shortcuts_are_read_again(shared, loop, index):
+    assert index.folder('1234') == 'Book'
+    write(shared / 'shortcuts' / '1234', 'Other\n')
+    write(shared / 'shortcuts' / '5678', 'Book\n')
+    loop.run_once()
+    assert index.folder('1234') == 'Other'
+    assert index.folder('5678') == 'Book'
+
+    os.remove(str(shared / 'shortcuts' / '1234'))
+    loop.run_once()
+    assert index.folder('1234') is None
+
+
+def test_track_list_is_cached_until_the_folder_changes(shared, loop, index):
+    folder_path = str(shared / 'Book')
+    contents = index.contents('Book', folder_path)
+    write(shared / 'Book' / 'folder.conf', 'PLAYSTATUS="Playing"\n')
+    loop.run_once()
+    assert index.contents('Book', folder_path) is contents
+
+    write(shared / 'Book' / '03.mp3', '')
+    loop.run_once()
+    assert index.contents('Book', folder_path).tracks == ['02.mp3', '03.mp3', '10.mp3']
+
+
+def test_preload(shared, index):
+    index.preload(str(shared))
+    assert index.folders[str(shared / 'Book')].tracks == ['02.mp3', '10.mp3']
+
+
+def test_recreated_folder_is_watched_again(shared, loop, index):
+    folder_path = str(shared / 'Book')
+    index.contents('Book', folder_path)
+    shutil.rmtree(folder_path)
+    loop.run_once()
+    assert folder_path not in index.watched
+
+    (shared / 'Book').mkdir()
+    write(shared / 'Book' / '01.mp3', '')
+    assert index.contents('Book', folder_path).tracks == ['01.mp3']
+
+    write(shared / 'Book' / '02.mp3', '')
+    loop.run_once()
+    assert index.contents('Book', folder_path).tracks == ['01.mp3', '02.mp3']
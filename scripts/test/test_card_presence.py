@@ -0,0 +1,68 @@
+import pytest
+from mock import Mock, patch
+
+from card_presence import CardPresenceTracker
+
+
+@pytest.fixture
+def clock():
+    with patch('time.monotonic') as monotonic:
+        monotonic.return_value = 100.0
+        yield monotonic
+
+
+@pytest.fixture
+def tracker(clock):
+    return CardPresenceTracker(Mock(), Mock(), Mock(), removal_timeout=0.1, removal_polls=2)
+
+
+def test_placed_once_while_present(tracker):
+    tracker.card_seen('1234')
+    tracker.card_seen('1234')
+    tracker.on_placed.assert_called_once_with('1234')
+
+
+def test_single_missed_poll_is_ignored(tracker, clock):
+    tracker.card_seen('1234')
+    clock.return_value += 0.2
+    tracker.card_missed()
+    tracker.on_removed.assert_not_called()
+
+
+def test_removed_after_missed_polls_and_timeout(tracker, clock):
+    tracker.card_seen('1234')
+    tracker.card_missed()
+    tracker.card_missed()
+    tracker.on_removed.assert_not_called()
+    clock.return_value += 0.15
+    tracker.card_missed()
+    tracker.on_removed.assert_called_once_with()
+
+
+def test_placed_again_after_removal(tracker, clock):
+    tracker.card_seen('1234')
+    clock.return_value += 0.15
+    tracker.card_missed()
+    tracker.card_missed()
+    tracker.card_seen('1234')
+    assert tracker.on_placed.call_count == 2
+
+
+def test_card_read_arms_removal_timer(tracker):
+    tracker.card_read('1234')
+    tracker.loop.call_later.assert_called_once_with(0.1, tracker.check)
+    tracker.card_read('1234')
+    tracker.loop.call_later.return_value.cancel.assert_called_once_with()
+
+
+def test_failed_poll_counts_as_missed(tracker, clock):
+    reader = Mock()
+    reader.pollCard.side_effect = ['1234', OSError('SPI error'), IOError('SPI error')]
+    tracker.start_polling(reader, poll_interval=0.05)
+    poll = tracker.loop.call_later.call_args[0][1]
+    clock.return_value = 101.0
+    poll()
+    poll()
+
+    tracker.on_removed.assert_called_once_with()
+    assert tracker.loop.call_later.call_count == 3
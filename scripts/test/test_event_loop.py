@@ -0,0 +1,90 @@
+import os
+import threading
+
+from mock import Mock
+
+from event_loop import EventLoop, Worker, add_card_reader, add_multi_card_reader
+
+
+def test_timer_fires_once():
+    loop = EventLoop()
+    callback = Mock()
+    loop.call_later(0, callback)
+    loop.run_once()
+    loop.call_later(0, Mock())
+    loop.run_once()
+    callback.assert_called_once_with()
+
+
+def test_cancelled_timer_does_not_fire():
+    loop = EventLoop()
+    callback = Mock()
+    loop.call_later(0, callback).cancel()
+    loop.call_later(0, Mock())
+    loop.run_once()
+    callback.assert_not_called()
+
+
+def test_failing_callbacks_do_not_stop_the_loop():
+    loop = EventLoop()
+    reader = Mock(spec=['readCard'])
+    cards = iter(['1234', '5678'])
+    blocked = threading.Event()
+    reader.readCard.side_effect = lambda: next(cards, None) or blocked.wait()
+    callback = Mock(side_effect=[ValueError('Audio_Volume_Level'), None])
+    timer = Mock()
+    loop.call_later(0, Mock(side_effect=OSError('disk full')))
+    loop.call_later(0, timer)
+
+    add_card_reader(loop, reader, callback)
+    while callback.call_count < 2:
+        loop.run_once()
+
+    timer.assert_called_once_with()
+    assert [call[0] for call in callback.call_args_list] == [('1234',), ('5678',)]
+
+
+def test_blocking_reader_is_run_in_thread():
+    loop = EventLoop()
+    reader = Mock(spec=['readCard'])
+    cards = iter(['1234', None])
+    blocked = threading.Event()
+    reader.readCard.side_effect = lambda: next(cards, None) or blocked.wait()
+    callback = Mock()
+
+    add_card_reader(loop, reader, callback)
+    loop.run_once()
+
+    callback.assert_called_once_with('1234')
+
+
+def test_usb_reader_devices_are_selected_separately():
+    loop = EventLoop()
+    front_r, front_w = os.pipe()
+    top_r, top_w = os.pipe()
+    reader = Mock()
+    reader.devices = {front_r: Mock(), top_r: Mock()}
+    reader.readEvents.side_effect = lambda fd: [('top', '5678', 1.0)] if fd == top_r else []
+    callback = Mock()
+
+    add_multi_card_reader(loop, reader, callback)
+    os.write(top_w, b'x')
+    loop.run_once()
+
+    reader.readEvents.assert_called_once_with(top_r)
+    callback.assert_called_once_with('top', '5678', 1.0)
+
+
+def test_worker_runs_callbacks_in_order_and_drops_when_busy():
+    started = threading.Event()
+    blocked = threading.Event()
+    done = []
+    worker = Worker('test-worker', maxsize=1)
+    assert worker.submit(lambda: started.set() or blocked.wait())
+    # the first callback is running, one may wait
+    started.wait()
+    assert worker.submit(lambda: done.append(1))
+    assert not worker.submit(lambda: done.append(2))
+    blocked.set()
+    worker.join()
+    assert done == [1]
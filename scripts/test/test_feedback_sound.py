@@ -0,0 +1,79 @@
+import threading
+import wave
+
+import pytest
+from mock import Mock, patch
+
+import FeedbackSound
+from FeedbackSound import FeedbackSoundPlayer
+
+
+def write_wav(path, frames=3000, channels=1, sampwidth=2, rate=22050):
+    with wave.open(str(path), 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sampwidth)
+        w.setframerate(rate)
+        w.writeframes(b'\x01' * frames * channels * sampwidth)
+    return str(path)
+
+
+@pytest.fixture
+def sound(tmp_path):
+    return write_wav(tmp_path / 'beep.wav')
+
+
+@pytest.fixture
+def alsaaudio():
+    with patch.object(FeedbackSound, 'alsaaudio') as alsaaudio:
+        yield alsaaudio
+
+
+def test_sound_is_read_once(sound):
+    player = FeedbackSoundPlayer()
+    with patch.object(FeedbackSound, 'read_sound', wraps=FeedbackSound.read_sound) as read_sound:
+        first = player.load(sound)
+        assert player.load(sound) is first
+    read_sound.assert_called_once_with(sound)
+    assert (first.channels, first.rate, first.sampwidth, len(first.frames)) == (1, 22050, 2, 6000)
+
+
+def test_unreadable_sound_is_not_played(tmp_path):
+    player = FeedbackSoundPlayer()
+    player.play(str(tmp_path / 'missing.wav'))
+    assert player.thread is None
+    assert player.load(str(tmp_path / 'missing.wav')) is None
+
+
+def test_sounds_beyond_the_queue_are_dropped(sound):
+    player = FeedbackSoundPlayer()
+    # no thread which empties the queue
+    player.thread = Mock()
+    for _ in range(player.max_queued + 2):
+        player.play(sound)
+    assert player.queue.qsize() == player.max_queued
+
+
+def test_alsa_handle_is_kept_for_the_same_format(alsaaudio, sound, tmp_path):
+    player = FeedbackSoundPlayer('sysdefault:CARD=Device')
+    player.play_alsa(player.load(sound))
+    player.play_alsa(player.load(sound))
+    alsaaudio.PCM.assert_called_once_with(alsaaudio.PCM_PLAYBACK, device='sysdefault:CARD=Device')
+    pcm = alsaaudio.PCM.return_value
+    # 3000 frames in periods of 1024 frames, twice
+    assert [len(call[0][0]) for call in pcm.write.call_args_list] == [2048, 2048, 1904] * 2
+
+    player.play_alsa(player.load(write_wav(tmp_path / 'stereo.wav', channels=2)))
+    assert alsaaudio.PCM.call_count == 2
+
+
+def test_aplay_without_alsaaudio(sound):
+    played = threading.Event()
+    with patch.object(FeedbackSound, 'alsaaudio', None), \
+            patch('FeedbackSound.subprocess.Popen') as popen:
+        popen.return_value.communicate.side_effect = lambda data: played.set()
+        player = FeedbackSoundPlayer('sysdefault')
+        player.play(sound)
+        assert played.wait(5)
+    popen.assert_called_once_with(['aplay', '-q', '-D', 'sysdefault', '-'], stdin=FeedbackSound.subprocess.PIPE)
+    with open(sound, 'rb') as f:
+        popen.return_value.communicate.assert_called_once_with(f.read())
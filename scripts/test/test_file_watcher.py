@@ -0,0 +1,65 @@
+import os
+
+from mock import Mock
+
+from event_loop import EventLoop
+from file_watcher import FileWatcher
+from reader_settings import load_control_cards
+
+
+def write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+def test_recreated_file_is_reported_once(tmp_path):
+    loop = EventLoop()
+    watcher = FileWatcher(loop, settle_time=0)
+    callback = Mock()
+    write(tmp_path / 'global.conf', 'CMDNEXT="1"\n')
+    watcher.watch_file(str(tmp_path / 'global.conf'), callback)
+
+    os.remove(str(tmp_path / 'global.conf'))
+    write(tmp_path / 'global.conf', 'CMDNEXT="2"\n')
+    write(tmp_path / 'other.conf', '')
+    loop.run_once()
+
+    callback.assert_called_once_with()
+
+
+def test_directory_reports_names(tmp_path):
+    loop = EventLoop()
+    watcher = FileWatcher(loop)
+    callback = Mock()
+    watcher.watch_directory(str(tmp_path), callback)
+
+    write(tmp_path / '1234', 'Book\n')
+    loop.run_once()
+
+    callback.assert_called_with('1234')
+
+
+def test_control_cards_match_exactly(tmp_path):
+    write(tmp_path / 'global.conf', 'AUDIOFOLDERSPATH="/tmp"\nCMDNEXT="12345"\nCMDPREV=""\n')
+    cards = load_control_cards(str(tmp_path / 'global.conf'))
+    assert cards == frozenset(['12345'])
+    assert '1234' not in cards
+
+
+def test_missing_global_conf_has_no_control_cards(tmp_path):
+    assert load_control_cards(str(tmp_path / 'global.conf')) == frozenset()
+
+
+def test_removed_directory_is_reported(tmp_path):
+    loop = EventLoop()
+    watcher = FileWatcher(loop)
+    callback = Mock()
+    removed = Mock()
+    (tmp_path / 'Book').mkdir()
+    watcher.watch_directory(str(tmp_path / 'Book'), callback, removed)
+
+    os.rmdir(str(tmp_path / 'Book'))
+    loop.run_once()
+
+    removed.assert_called_once_with()
+    assert watcher.watches == {}
@@ -0,0 +1,67 @@
+from collections import namedtuple
+
+from keycode_decoder import EV_KEY, KEY_ENTER, KEY_LEFTSHIFT, KeycodeDecoder, QWERTZ_KEYS
+
+Event = namedtuple('Event', ['type', 'code', 'value'])
+
+# key codes of the characters on a qwertz keyboard
+CODES = dict((char, code) for code, char in reversed(list(enumerate(QWERTZ_KEYS))))
+
+
+def typed(text, shift_code=None):
+    """ key events of a reader typing text followed by enter """
+    events = []
+    for char in text:
+        shift = shift_code is not None and char.isupper()
+        if shift:
+            events.append(Event(EV_KEY, shift_code, 1))
+        events.append(Event(EV_KEY, CODES[char.lower()], 1))
+        events.append(Event(EV_KEY, CODES[char.lower()], 0))
+        if shift:
+            events.append(Event(EV_KEY, shift_code, 0))
+    events.append(Event(EV_KEY, KEY_ENTER, 1))
+    events.append(Event(EV_KEY, KEY_ENTER, 0))
+    return events
+
+
+def legacy_read(events):
+    """ what Reader.readCard returned before the decoder """
+    stri = ''
+    for event in events:
+        if event.type == 1 and event.value == 1:
+            stri += QWERTZ_KEYS[event.code]
+            if event.code == KEY_ENTER:
+                break
+    return stri[:-1]
+
+
+def test_decimal_card():
+    assert KeycodeDecoder().decode(typed('0012345678')) == ['0012345678']
+
+
+def test_same_ids_as_legacy_reader():
+    events = typed('A1B2', shift_code=KEY_LEFTSHIFT)
+    assert KeycodeDecoder().decode(events) == [legacy_read(events)]
+
+
+def test_shift_decodes_upper_case_hex():
+    events = typed('04A3F2', shift_code=KEY_LEFTSHIFT)
+    assert KeycodeDecoder(shift=True).decode(events) == ['04A3F2']
+
+
+def test_cards_in_one_read_are_split():
+    events = typed('1234') + typed('5678')
+    assert KeycodeDecoder().decode(events) == ['1234', '5678']
+
+
+def test_card_split_over_reads():
+    decoder = KeycodeDecoder()
+    events = typed('1234')
+    assert decoder.decode(events[:3]) == []
+    assert decoder.decode(events[3:]) == ['1234']
+
+
+def test_long_card_and_unknown_keys():
+    decoder = KeycodeDecoder(max_length=4)
+    events = typed('1234567890') + [Event(EV_KEY, 300, 1), Event(EV_KEY, KEY_ENTER, 1)]
+    assert decoder.decode(events) == ['1234567890', 'X']
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from mock import patch
+
+from CardAssignments import CardAssignments
+from LegacyCardAssignments import LegacyTranslator
+
+DEFAULTS = {'resume': '0', 'random': '0'}
+
+
+def write(path, content, mtime=None):
+    with open(str(path), 'w') as f:
+        f.write(content)
+    if mtime is not None:
+        os.utime(str(path), (mtime, mtime))
+
+
+@pytest.fixture
+def shared(tmp_path):
+    (tmp_path / 'shortcuts').mkdir()
+    (tmp_path / 'audiofolders' / 'Book').mkdir(parents=True)
+    (tmp_path / 'audiofolders' / 'Music').mkdir()
+    write(tmp_path / 'shortcuts' / '1234', 'Book\n', mtime=1000)
+    write(tmp_path / 'shortcuts' / '5678', 'Music\n', mtime=1000)
+    write(tmp_path / 'shortcuts' / 'placeholder', 'ignored\n')
+    write(tmp_path / 'audiofolders' / 'Book' / 'folder.conf', 'RESUME="ON"\nSHUFFLE="OFF"\nELAPSED="12.5"\n', 1000)
+    return tmp_path
+
+
+@pytest.fixture
+def translator(shared):
+    return LegacyTranslator(str(shared / 'shortcuts'), str(shared / 'audiofolders'), DEFAULTS)
+
+
+def test_first_translation(translator):
+    assert translator.translate() == {
+        '1234': {'cardid': '1234', 'uri': 'Book', 'resume': '1', 'random': '0', 'resume_elapsed': '12.5'},
+        '5678': {'cardid': '5678', 'uri': 'Music', 'resume': '0', 'random': '0'},
+    }
+
+
+def test_unchanged_files_are_not_read_again(translator):
+    translator.translate()
+    with patch('LegacyCardAssignments.read_uri') as read_uri, \
+            patch('LegacyCardAssignments.read_folderconf') as read_folderconf:
+        assert translator.translate() == {}
+    read_uri.assert_not_called()
+    read_folderconf.assert_not_called()
+
+
+def test_changed_shortcut_and_folderconf(shared, translator):
+    translator.translate()
+    write(shared / 'shortcuts' / '5678', 'Book\n', mtime=2000)
+    assert translator.translate()['5678']['uri'] == 'Book'
+
+    write(shared / 'audiofolders' / 'Book' / 'folder.conf', 'RESUME="OFF"\n', mtime=2000)
+    changes = translator.translate()
+    assert sorted(changes) == ['1234', '5678']
+    assert changes['1234']['resume'] == '0'
+
+
+def test_removed_shortcut(shared):
+    translator = LegacyTranslator(str(shared / 'shortcuts'), str(shared / 'audiofolders'), DEFAULTS, known=['9999'])
+    assert translator.translate()['9999'] is None
+    os.remove(str(shared / 'shortcuts' / '1234'))
+    assert translator.translate() == {'1234': None}
+    assert translator.translate() == {}
+
+
+def test_merge_keeps_the_resume_position(translator):
+    cards = CardAssignments()
+    cards.merge(translator.translate())
+    cards.set_resume('5678', '3', '42.0')
+    cards.dirty = False
+
+    assert not cards.merge({'5678': {'cardid': '5678', 'uri': 'Music', 'resume': '0', 'random': '0'}})
+    assert not cards.dirty
+    assert cards.merge({'5678': {'cardid': '5678', 'uri': 'Other', 'resume': '0', 'random': '0'}, '1234': None})
+    assert cards.dirty
+    assert '1234' not in cards
+    assert cards.get('5678', 'uri') == 'Other'
+    assert cards.get('5678', 'resume_elapsed') == 42.0
@@ -0,0 +1,94 @@
+import pytest
+from mock import MagicMock, patch
+
+from mpd import CommandError, ConnectionError as MPDConnectionError
+
+from mpd_connection import MpdConnection
+
+
+@pytest.fixture
+def clients():
+    """ the MPDClient instances created by the connection """
+    created = []
+
+    def create():
+        client = MagicMock()
+        client.status.return_value = {'state': 'play'}
+        client.currentsong.return_value = {'file': 'Book/01.mp3'}
+        created.append(client)
+        return client
+    with patch('mpd_connection.MPDClient', side_effect=create):
+        yield created
+
+
+@pytest.fixture
+def clock():
+    with patch('mpd_connection.time') as time:
+        time.monotonic.return_value = 100.0
+        yield time
+
+
+def test_connection_is_kept(clients):
+    mpd = MpdConnection(password='secret')
+    assert mpd.status() == {'state': 'play'}
+    mpd.play()
+    assert len(clients) == 1
+    clients[0].connect.assert_called_once_with('localhost', 6600)
+    clients[0].password.assert_called_once_with('secret')
+
+
+def test_lost_connection_is_established_again(clients):
+    mpd = MpdConnection()
+    mpd.status()
+    clients[0].status.side_effect = MPDConnectionError('Connection lost')
+    assert mpd.status() == {'state': 'play'}
+    assert len(clients) == 2
+
+
+def test_reconnect_backs_off(clients, clock):
+    mpd = MpdConnection(min_delay=0.5, max_delay=2)
+
+    def refuse(host, port):
+        raise OSError('Connection refused')
+    with patch('mpd_connection.MPDClient') as client_class:
+        client_class.return_value.connect.side_effect = refuse
+        for delay in (0.5, 1, 2, 2):
+            with pytest.raises(OSError):
+                mpd.connect()
+            assert mpd.delay == delay
+            # no attempt before the delay is over
+            with pytest.raises(MPDConnectionError):
+                mpd.status()
+            clock.monotonic.return_value += delay
+        assert client_class.return_value.connect.call_count == 4
+    assert mpd.status() == {'state': 'play'}
+    assert mpd.delay == 0
+
+
+def test_wrong_password(clients):
+    mpd = MpdConnection(password='wrong')
+    with patch('mpd_connection.MPDClient') as client_class:
+        client_class.return_value.password.side_effect = CommandError('incorrect password')
+        with pytest.raises(CommandError):
+            mpd.status()
+    assert not mpd.connected
+
+
+def test_command_list(clients):
+    mpd = MpdConnection()
+    mpd.connect()
+    clients[0].command_list_end.return_value = [{'state': 'play'}, {'file': 'Book/01.mp3'}]
+    status, song = mpd.command_list([('status',), ('currentsong',)])
+    assert song == {'file': 'Book/01.mp3'}
+    clients[0].command_list_ok_begin.assert_called_once_with()
+
+
+def test_keepalive_pings_idle_connection(clients, clock):
+    mpd = MpdConnection(keepalive_interval=45)
+    mpd.status()
+    clock.monotonic.return_value += 10
+    mpd.keepalive()
+    clients[0].ping.assert_not_called()
+    clock.monotonic.return_value += 40
+    mpd.keepalive()
+    clients[0].ping.assert_called_once_with()
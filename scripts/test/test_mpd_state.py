@@ -0,0 +1,76 @@
+import pytest
+from mock import MagicMock, patch
+
+from mpd import ConnectionError as MPDConnectionError
+
+from mpd_state import MpdState, PlayerState
+
+
+@pytest.fixture
+def client():
+    """ the MPDClient of the idle connection """
+    client = MagicMock()
+    client.command_list_end.return_value = [{'state': 'play', 'volume': '30'}, {'file': 'Book/01.mp3'}]
+    with patch('mpd_connection.MPDClient', return_value=client):
+        yield client
+
+
+@pytest.fixture
+def changes(client):
+    state = MpdState()
+    received = []
+    state.subscribe(lambda player, changes: received.append(changes))
+    state.refresh()
+    return state, received
+
+
+def test_subscribers_get_the_changes(changes):
+    state, received = changes
+    assert state.state.state == 'play'
+    assert received[0].connected
+    assert received[0].song == {'file': 'Book/01.mp3'}
+
+
+def test_unchanged_state_is_not_announced(client, changes):
+    state, received = changes
+    state.refresh()
+    assert len(received) == 1
+    client.command_list_end.return_value = [{'state': 'play', 'volume': '40'}, {'file': 'Book/01.mp3'}]
+    state.refresh()
+    assert received[1].status == {'volume': '40'}
+    assert received[1].song == {}
+
+
+def test_state_is_refreshed_after_idle(client, changes):
+    state, received = changes
+    client.idle.return_value = ['player']
+    client.command_list_end.return_value = [{'state': 'stop'}, {}]
+    state.wait()
+    client.idle.assert_called_once_with('player', 'mixer', 'options', 'playlist')
+    assert received[1].status == {'state': 'stop', 'volume': None}
+    assert received[1].song == {'file': None}
+
+
+def test_lost_connection_is_not_running(client, changes):
+    state, received = changes
+    state.stopping = False
+    client.idle.side_effect = MPDConnectionError('Connection lost')
+
+    def stop(player, changes):
+        state.stopping = True
+    state.subscribe(stop)
+    state.run()
+    assert state.state.state == 'not_running'
+    assert received[1].connected
+
+
+def test_elapsed_counts_on_while_playing():
+    with patch('mpd_state.time') as time:
+        time.monotonic.return_value = 100.0
+        player = PlayerState({'state': 'play', 'elapsed': '12.5', 'duration': '20.0'})
+        time.monotonic.return_value = 103.0
+        assert player.elapsed == 15.5
+        time.monotonic.return_value = 200.0
+        assert player.elapsed == 20.0
+        paused = PlayerState({'state': 'pause', 'elapsed': '12.5'}, received=100.0)
+        assert paused.elapsed == 12.5
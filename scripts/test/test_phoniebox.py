@@ -0,0 +1,46 @@
+import pytest
+from mock import Mock
+
+from mpd import ConnectionError as MPDConnectionError
+
+from Phoniebox import Phoniebox
+
+
+def write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def box(tmp_path):
+    write(tmp_path / 'phoniebox.conf', '[phoniebox]\nlog_level = 0\ncard_assignments_file = {cards}\n'
+          'translate_legacy_cardassignments = 0\n\n[mpd]\nhost = localhost\n'.format(cards=tmp_path / 'cards.txt'))
+    write(tmp_path / 'cards.txt', '[1234]\nuri = Book\nresume = 1\nrandom = 0\n'
+          'resume_song = 2\nresume_elapsed = 30.5\n\n[5678]\nuri = Music\nresume = 0\nrandom = 1\nrepeat\n')
+    box = Phoniebox(str(tmp_path / 'phoniebox.conf'))
+    box.client = Mock()
+    return box
+
+
+def test_card_is_started_with_one_command_list(box):
+    assert box.start_card('1234')
+    box.client.command_list.assert_called_once_with([
+        ('repeat', 1), ('random', 0), ('single', 1), ('consume', 1),
+        ('clear',), ('add', 'Book'), ('seek', 2, 30.5)])
+
+
+def test_card_without_resume_is_played_from_the_start(box):
+    assert box.start_card('5678')
+    box.client.command_list.assert_called_once_with([
+        ('repeat', 1), ('random', 1), ('single', 1), ('consume', 1),
+        ('clear',), ('add', 'Music'), ('play',)])
+
+
+def test_resume_can_be_skipped(box):
+    assert box.start_card('1234', resume=False)
+    assert box.client.command_list.call_args[0][0][-1] == ('play',)
+
+
+def test_start_card_fails_on_mpd_error(box):
+    box.client.command_list.side_effect = MPDConnectionError('Connection lost')
+    assert not box.start_card('1234')
@@ -0,0 +1,47 @@
+import pytest
+from mock import patch
+
+from CardAssignments import CardAssignments
+from PhonieboxConfigChanger import PhonieboxConfigChanger
+
+
+def write(path, content):
+    with open(str(path), 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def changer(tmp_path):
+    write(tmp_path / 'phoniebox.conf', '[phoniebox]\nlog_level = 0\ncard_assignments_file = {cards}\n'
+          'translate_legacy_cardassignments = 0\n'.format(cards=tmp_path / 'cards.txt'))
+    write(tmp_path / 'cards.txt', '[1234]\nuri = Book\nresume_elapsed = 30.5\n')
+    return PhonieboxConfigChanger(str(tmp_path / 'phoniebox.conf'))
+
+
+def saved(changer):
+    return CardAssignments.read(changer.cardAssignments.path)
+
+
+def test_assigncards_writes_the_file_once(changer):
+    with patch.object(CardAssignments, 'save', autospec=True, side_effect=CardAssignments.save) as save:
+        assert changer.assigncards([('5678', 'Music'), ('9012', 'Radio'), ('1234', 'Other')])
+    save.assert_called_once_with(changer.cardAssignments)
+    cards = saved(changer)
+    assert [cards.get(cardid, 'uri') for cardid in ('1234', '5678', '9012')] == ['Other', 'Music', 'Radio']
+    assert cards.get('1234', 'resume_elapsed') == 30.5
+
+
+def test_importcsv_skips_control_cards(changer, tmp_path):
+    write(tmp_path / 'export.csv', '"id","value"\n"1111","%CMDSEEKBACK%"\n"5678","Music"\n'
+          '"9012","Hörspiel, Folge 1"\n"","Empty"\n')
+    changer.importcsv(str(tmp_path / 'export.csv'))
+    cards = saved(changer)
+    assert sorted(cards.sections()) == ['1234', '5678', '9012']
+    assert cards.get('9012', 'uri') == 'Hörspiel, Folge 1'
+
+
+def test_set_card_setting(changer):
+    changer.set('1234', 'resume', '0')
+    assert saved(changer).get('1234', 'resume') == 0
+    changer.set('phoniebox', 'log_level', '5')
+    assert changer.config.get('phoniebox', 'log_level') == '5'
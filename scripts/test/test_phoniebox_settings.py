@@ -0,0 +1,60 @@
+import pytest
+
+from ConfigParserExtended import ConfigParserExtended
+from PhonieboxSettings import PhonieboxSettings
+
+
+def settings(text):
+    parser = ConfigParserExtended()
+    parser.read_string(text)
+    return PhonieboxSettings(parser)
+
+
+CONFIG = """[phoniebox]
+base_path = /home/pi/RPi-Jukebox-RFID
+card_assignments_file = %(base_path)s/settings/Card_Assignments.txt
+debounce_time = 1.5
+startup_sound =
+translate_legacy_cardassignments = 1
+custom_option = 7
+"""
+
+
+def test_defaults_and_typed_values():
+    phoniebox = settings(CONFIG).phoniebox
+    assert phoniebox.card_assignments_file == '/home/pi/RPi-Jukebox-RFID/settings/Card_Assignments.txt'
+    assert phoniebox.debounce_time == 1.5
+    assert phoniebox.startup_sound is None
+    assert phoniebox.translate_legacy_cardassignments is True
+    assert phoniebox.log_level == 3
+    assert phoniebox.alsa_device == 'sysdefault'
+
+
+def test_section_which_is_missing_gets_the_defaults():
+    mpd = settings(CONFIG).mpd
+    assert (mpd.host, mpd.port, mpd.timeout, mpd.password) == ('localhost', 6600, 3, None)
+
+
+def test_get_like_get_setting():
+    loaded = settings(CONFIG)
+    assert loaded.get('phoniebox', 'custom_option') == 7
+    assert loaded.get('phoniebox', 'Debounce_Time') == 1.5
+    assert loaded.get('phoniebox', 'translate_legacy_cardassignments', 'bool') is True
+    assert loaded.get('phoniebox', 'unknown') == -1
+    assert loaded.get('unknown', 'log_level') == -1
+
+
+def test_required_setting():
+    with pytest.raises(ValueError, match='card_assignments_file'):
+        settings('[phoniebox]\nlog_level = 3\n')
+
+
+@pytest.mark.parametrize('line', ['log_level = info', 'second_swipe_delay = soon', 'store_card_assignments = 3x'])
+def test_invalid_value(line):
+    with pytest.raises(ValueError, match='Invalid setting'):
+        settings(CONFIG + line + '\n')
+
+
+def test_invalid_interpolation():
+    with pytest.raises(ValueError, match=r'\[phoniebox\]'):
+        settings(CONFIG + 'shortcuts_path = %(missing)s/shortcuts\n')
@@ -0,0 +1,80 @@
+import pytest
+from mock import MagicMock
+
+from card_index import natural_sort_key
+from playback_engine import PlaybackEngine, read_shell_config
+
+
+def write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def jukebox(tmp_path):
+    for folder in ['scripts', 'settings', 'shared/shortcuts', 'audiofolders/Book', 'playlists']:
+        (tmp_path / folder).mkdir(parents=True)
+    write(tmp_path / 'settings/global.conf',
+          'AUDIOFOLDERSPATH="{0}/audiofolders"\nPLAYLISTSFOLDERPATH="{0}/playlists"\n'
+          'SECONDSWIPE="PAUSE"\nEDITION="classic"\n'.format(tmp_path))
+    write(tmp_path / 'settings/rfid_trigger_play.conf', 'CMDMUTE="111"\nCMDSTOP="%CMDSTOP%"\n')
+    write(tmp_path / 'shared/shortcuts/222', 'Book\n')
+    write(tmp_path / 'audiofolders/Book/folder.conf',
+          'CURRENTFILENAME="Book/02.mp3"\nELAPSED="12.5"\nPLAYSTATUS="Stopped"\n'
+          'RESUME="ON"\nSHUFFLE="OFF"\nLOOP="OFF"\nSINGLE="OFF"\n')
+    for name in ['10.mp3', '02.mp3', 'cover.jpg', '.hidden']:
+        write(tmp_path / 'audiofolders/Book' / name, '')
+    return tmp_path
+
+
+@pytest.fixture
+def mpd():
+    mpd = MagicMock()
+    mpd.status.return_value = {'state': 'play', 'playlistlength': '2'}
+    mpd.playlistfind.return_value = [{'pos': '0'}]
+    return mpd
+
+
+@pytest.fixture
+def engine(jukebox, mpd):
+    return PlaybackEngine(str(jukebox / 'scripts'), mpd=mpd)
+
+
+def test_control_card_is_left_to_the_shell(engine, mpd):
+    assert engine.play_card('111') is False
+    mpd.assert_not_called()
+
+
+def test_unknown_card_is_left_to_the_shell(engine, mpd):
+    assert engine.play_card('333') is False
+
+
+def test_first_swipe_loads_playlist_and_resumes(engine, jukebox, mpd):
+    assert engine.play_card('222') is True
+
+    with open(str(jukebox / 'playlists/Book.m3u')) as f:
+        assert f.read() == 'Book/02.mp3\nBook/10.mp3\n'
+    mpd.load.assert_called_once_with('Book')
+    mpd.playlistfind.assert_called_once_with('filename', 'Book/02.mp3')
+    mpd.play.assert_called_once_with('0')
+    mpd.seekcur.assert_called_once_with('12.5')
+    folder_conf = read_shell_config(str(jukebox / 'audiofolders/Book/folder.conf'))
+    assert folder_conf['PLAYSTATUS'] == 'Playing'
+    with open(str(jukebox / 'settings/Latest_Playlist_Played')) as f:
+        assert f.read().strip() == 'Book'
+
+
+def test_second_swipe_pauses(engine, jukebox, mpd):
+    write(jukebox / 'settings/Latest_Playlist_Played', 'Book\n')
+    assert engine.play_card('222') is True
+    mpd.pause.assert_called_once_with(1)
+    mpd.load.assert_not_called()
+
+
+def test_mpd_error_falls_back_to_shell(engine, mpd):
+    mpd.stop.side_effect = OSError('connection refused')
+    assert engine.play_card('222') is False
+
+
+def test_natural_sort_key():
+    assert sorted(['b10', 'B2', 'a1'], key=natural_sort_key) == ['a1', 'B2', 'b10']
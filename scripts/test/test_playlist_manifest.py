@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from mock import Mock
+
+from playlist_manifest import ManifestCache, manifest_name, read_manifest
+
+
+def write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / 'Artist' / 'Album' / 'CD1').mkdir(parents=True)
+    for name in ['10.mp3', '02.mp3', 'folder.conf', '.hidden']:
+        write(tmp_path / 'Artist' / 'Album' / name, '')
+    return str(tmp_path / 'Artist' / 'Album')
+
+
+@pytest.fixture
+def durations():
+    return Mock(return_value={'02.mp3': 61.5, '10.mp3': 120.0})
+
+
+@pytest.fixture
+def cache(tmp_path, durations):
+    return ManifestCache(str(tmp_path / 'manifests'), durations)
+
+
+def test_manifest_is_written(tmp_path, folder, cache, durations):
+    contents = cache.contents('Artist/Album', folder)
+    assert contents.tracks == ['02.mp3', '10.mp3']
+    assert contents.names == frozenset(['02.mp3', '10.mp3', 'folder.conf', '.hidden', 'CD1'])
+    durations.assert_called_once_with('Artist/Album')
+
+    manifest = read_manifest(str(tmp_path / 'manifests' / 'Artist % Album.json'))
+    assert [(track['name'], track['duration']) for track in manifest['tracks']] == [
+        ('02.mp3', 61.5), ('10.mp3', 120.0)]
+    assert manifest['mtime_ns'] == os.stat(folder).st_mtime_ns
+
+
+def test_unchanged_folder_is_not_listed_again(folder, cache, durations, monkeypatch):
+    cache.contents('Artist/Album', folder)
+    scandir = Mock(side_effect=AssertionError('folder listed again'))
+    monkeypatch.setattr(os, 'scandir', scandir)
+    assert cache.contents('Artist/Album', folder).tracks == ['02.mp3', '10.mp3']
+    assert durations.call_count == 1
+
+
+def test_changed_folder_keeps_known_durations(tmp_path, folder, cache, durations):
+    cache.contents('Artist/Album', folder)
+    write(os.path.join(folder, '03.mp3'), '')
+    # make sure the folder has another modification time, even on coarse file systems
+    os.utime(folder, ns=(0, os.stat(folder).st_mtime_ns + 1000000000))
+    durations.return_value = {'03.mp3': 10.0}
+
+    assert cache.contents('Artist/Album', folder).tracks == ['02.mp3', '03.mp3', '10.mp3']
+    manifest = read_manifest(str(tmp_path / 'manifests' / manifest_name('Artist/Album')))
+    assert [track['duration'] for track in manifest['tracks']] == [61.5, 10.0, 120.0]
+
+
+def test_missing_folder(tmp_path, cache):
+    assert cache.contents('Missing', str(tmp_path / 'Missing')) is None
@@ -0,0 +1,73 @@
+import pytest
+from mock import Mock
+
+from reader_settings import ReaderSettingsCache, load_reader_settings
+
+
+def write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+def test_defaults(tmp_path):
+    settings = load_reader_settings(str(tmp_path))
+    assert settings.same_id_delay == 2.0
+    assert settings.control_cards_nodelay is True
+    assert settings.swipe_or_place == 'SWIPENOTPLACE'
+    assert settings.card_removal_timeout is None
+    assert settings.control_cards == frozenset()
+    assert settings.card_id_format == 'LEGACY'
+
+
+def test_values_are_converted(tmp_path):
+    write(tmp_path / 'Second_Swipe_Pause', '5\n')
+    write(tmp_path / 'Second_Swipe_Pause_Controls', 'OFF\n')
+    write(tmp_path / 'Swipe_or_Place', 'PLACENOTSWIPE\n')
+    write(tmp_path / 'Card_Removal_Timeout', '0.5\n')
+    write(tmp_path / 'Card_Id_Format', 'CANONICAL\n')
+    write(tmp_path / 'global.conf', 'CMDNEXT="1234"\nCMDPREV=""\n')
+    settings = load_reader_settings(str(tmp_path))
+    assert settings.same_id_delay == 5.0
+    assert settings.control_cards_nodelay is False
+    assert settings.swipe_or_place == 'PLACENOTSWIPE'
+    assert settings.card_removal_timeout == 0.5
+    assert settings.control_cards == frozenset(['1234'])
+    assert settings.card_id_format == 'CANONICAL'
+
+
+def test_invalid_value_raises(tmp_path):
+    write(tmp_path / 'Second_Swipe_Pause', 'soon\n')
+    with pytest.raises(ValueError):
+        load_reader_settings(str(tmp_path))
+    write(tmp_path / 'Second_Swipe_Pause', '2\n')
+    write(tmp_path / 'Card_Id_Format', 'HEX\n')
+    with pytest.raises(ValueError):
+        load_reader_settings(str(tmp_path))
+
+
+def test_reload_reports_changes(tmp_path):
+    on_change = Mock()
+    cache = ReaderSettingsCache(str(tmp_path), on_change=on_change)
+    cache.reload()
+    on_change.assert_not_called()
+
+    write(tmp_path / 'Swipe_or_Place', 'PLACENOTSWIPE\n')
+    cache.reload()
+    on_change.assert_called_once_with(cache.settings)
+    assert cache.settings.swipe_or_place == 'PLACENOTSWIPE'
+
+
+def test_reload_keeps_settings_on_invalid_value(tmp_path):
+    write(tmp_path / 'Second_Swipe_Pause', '3\n')
+    cache = ReaderSettingsCache(str(tmp_path))
+    write(tmp_path / 'Second_Swipe_Pause', '3s\n')
+    cache.reload()
+    assert cache.settings.same_id_delay == 3.0
+
+
+def test_watches_settings_files(tmp_path):
+    watcher = Mock()
+    cache = ReaderSettingsCache(str(tmp_path), watcher)
+    watched = [call[0][0] for call in watcher.watch_file.call_args_list]
+    assert str(tmp_path / 'global.conf') in watched
+    watcher.watch_file.assert_called_with(watched[-1], cache.reload)
@@ -0,0 +1,85 @@
+import sys
+
+import pytest
+from mock import Mock, patch
+
+from readers import DeviceEntry, create_readers, read_device_file
+
+evdev = pytest.importorskip('evdev')
+from evdev import ecodes  # noqa: E402
+
+from readers import usb  # noqa: E402
+
+
+def key(code, timestamp=1.0):
+    return Mock(type=ecodes.EV_KEY, value=1, code=code, timestamp=Mock(return_value=timestamp))
+
+
+def card_keys(digits, timestamp=1.0):
+    return [key(ecodes.ecodes['KEY_' + digit]) for digit in digits] + [key(ecodes.KEY_ENTER, timestamp)]
+
+
+def input_device(name, phys, fd, keyboard=True):
+    device = Mock(fd=fd, phys=phys)
+    device.name = name
+    keys = list(range(ecodes.KEY_ESC, ecodes.KEY_D)) if keyboard else [0, ecodes.KEY_ESC]
+    device.capabilities.return_value = {ecodes.EV_KEY: keys}
+    return device
+
+
+@pytest.fixture
+def devices():
+    devices = [input_device('RFID', 'usb-front/input0', 3), input_device('RFID', 'usb-top/input0', 4)]
+    with patch.object(usb, 'list_input_devices', return_value=devices):
+        yield devices
+
+
+def test_read_device_file(tmp_path):
+    (tmp_path / 'deviceName.txt').write_text('MFRC522;\nRFID;usb-front/input0\nHex;;shift\n\n')
+    assert read_device_file(str(tmp_path / 'deviceName.txt')) == [
+        DeviceEntry('MFRC522', None), DeviceEntry('RFID', 'usb-front/input0'), DeviceEntry('Hex', None, True)]
+
+
+def test_only_the_selected_backend_is_imported(devices):
+    for module in ('readers.mfrc522', 'readers.rdm6300', 'readers.pn532', 'readers.pcsc'):
+        sys.modules.pop(module, None)
+    readers = create_readers([DeviceEntry('RFID', None)])
+    assert [type(reader) for reader in readers] == [usb.UsbReader]
+    assert not {'readers.mfrc522', 'readers.rdm6300', 'readers.pn532', 'readers.pcsc'} & set(sys.modules)
+
+
+def test_keyboard_device_is_preferred(devices):
+    devices[0].capabilities.return_value = {ecodes.EV_KEY: [0, ecodes.KEY_ESC]}
+    reader, = create_readers([DeviceEntry('RFID', None)])
+    assert list(reader.devices) == [4]
+
+
+def test_interleaved_swipes_are_decoded_per_device(devices):
+    reader, = create_readers([DeviceEntry('RFID', 'usb-front/input0'), DeviceEntry('RFID', 'usb-top/input0')])
+    front_keys = card_keys('1234', timestamp=1.0)
+    top_keys = card_keys('5678', timestamp=2.0)
+    devices[0].read.side_effect = [front_keys[:2], front_keys[2:]]
+    devices[1].read.side_effect = [top_keys[:3], top_keys[3:]]
+
+    assert reader.readEvents(3) == []
+    assert reader.readEvents(4) == []
+    assert reader.readEvents(3) == [('usb-front/input0', '1234', 1.0)]
+    assert reader.readEvents(4) == [('usb-top/input0', '5678', 2.0)]
+
+
+def test_read_card_returns_queued_cards_in_order(devices):
+    reader, = create_readers([DeviceEntry('RFID', 'usb-front/input0')])
+    devices[0].read.return_value = card_keys('12') + card_keys('34')
+    with patch.object(usb, 'select', return_value=([3], [], [])):
+        assert reader.readCard() == '12'
+        assert reader.readCard() == '34'
+
+
+def test_shift_option_decodes_upper_case(devices):
+    reader, = create_readers([DeviceEntry('RFID', 'usb-front/input0', True), DeviceEntry('RFID', 'usb-top/input0')])
+    shift_up = Mock(type=ecodes.EV_KEY, value=0, code=ecodes.KEY_LEFTSHIFT)
+    shifted = [key(ecodes.KEY_LEFTSHIFT), key(ecodes.KEY_A), shift_up]
+    devices[0].read.return_value = shifted + card_keys('1')
+    devices[1].read.return_value = shifted + card_keys('1')
+    assert reader.readEvents(3) == [('usb-front/input0', 'A1', 1.0)]
+    assert reader.readEvents(4) == [('usb-top/input0', 'Xa1', 1.0)]
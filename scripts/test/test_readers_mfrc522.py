@@ -0,0 +1,57 @@
+import pytest
+
+from readers.mfrc522 import ANTICOLL, Mfrc522, Mfrc522Reader
+from simulatedMFRC522 import SimulatedMFRC522
+
+UID = [0x04, 0x2A, 0x71, 0x9C]
+
+
+@pytest.fixture
+def chip():
+    return SimulatedMFRC522()
+
+
+@pytest.fixture
+def reader(chip):
+    # a long timeout: the tests only finish quickly if the IRQ is used
+    return Mfrc522Reader(Mfrc522(chip.transfer, chip.irq, timeout=5))
+
+
+def test_no_card(reader):
+    assert reader.pollCard() is None
+
+
+def test_card_id_is_the_decimal_uid(reader, chip):
+    chip.place(UID)
+    cardid = reader.pollCard()
+    assert cardid == '442113156195'
+    assert cardid.canonical == '0069890460'
+
+
+def test_present_card_is_not_read_again(reader, chip):
+    chip.place(UID)
+    reader.pollCard()
+    for i in range(3):
+        assert reader.pollCard() == '442113156195'
+    assert chip.frames.count(ANTICOLL) == 1
+
+
+def test_removed_card(reader, chip):
+    chip.place(UID)
+    reader.pollCard()
+    chip.remove()
+    assert reader.pollCard() is None
+    chip.place([0x01, 0x02, 0x03, 0x04])
+    assert reader.pollCard() == '12344'
+
+
+def test_read_card(reader, chip):
+    chip.place(UID)
+    assert reader.readCard() == '442113156195'
+
+
+def test_without_irq(chip):
+    reader = Mfrc522Reader(Mfrc522(chip.transfer, timeout=0.01))
+    assert reader.pollCard() is None
+    chip.place(UID)
+    assert reader.pollCard() == '442113156195'
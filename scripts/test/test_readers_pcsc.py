@@ -0,0 +1,97 @@
+import sys
+import types
+
+import pytest
+from mock import DEFAULT, Mock, patch
+
+
+def stub_smartcard():
+    """ smartcard.scard and smartcard.util with the constants of pcsclite, the functions are patched by the tests """
+    scard = types.ModuleType('smartcard.scard')
+    constants = dict(
+        INFINITE=0xFFFFFFFF, SCARD_S_SUCCESS=0, SCARD_E_INVALID_HANDLE=0x80100003, SCARD_E_UNKNOWN_READER=0x80100009,
+        SCARD_E_TIMEOUT=0x8010000A, SCARD_E_READER_UNAVAILABLE=0x80100017, SCARD_E_NO_SERVICE=0x8010001D,
+        SCARD_E_SERVICE_STOPPED=0x8010001E, SCARD_E_NO_READERS_AVAILABLE=0x8010002E, SCARD_LEAVE_CARD=0,
+        SCARD_PROTOCOL_T0=1, SCARD_PROTOCOL_T1=2, SCARD_SCOPE_USER=0, SCARD_SHARE_SHARED=2, SCARD_STATE_UNAWARE=0,
+        SCARD_STATE_CHANGED=0x2, SCARD_STATE_EMPTY=0x10, SCARD_STATE_PRESENT=0x20)
+    scard.__dict__.update(constants)
+    for name in ('SCardConnect', 'SCardDisconnect', 'SCardEstablishContext', 'SCardGetStatusChange',
+                 'SCardListReaders', 'SCardReleaseContext', 'SCardTransmit'):
+        setattr(scard, name, Mock(name=name))
+    scard.SCardGetErrorMessage = lambda hresult: 'error 0x{0:08X}'.format(hresult)
+    scard.error = type('error', (Exception,), {})
+    util = types.ModuleType('smartcard.util')
+    util.PACK = 1
+    util.toHexString = lambda data, format=0: ''.join('{0:02X}'.format(value) for value in data)
+    package = types.ModuleType('smartcard')
+    package.scard = scard
+    package.util = util
+    return {'smartcard': package, 'smartcard.scard': scard, 'smartcard.util': util}
+
+
+try:
+    import smartcard.scard  # noqa: F401
+    modules = {}
+except ImportError:
+    # pyscard is not installed (e.g. CI), the backend only needs the names
+    modules = stub_smartcard()
+with patch.dict(sys.modules, modules):
+    from smartcard.scard import SCARD_STATE_EMPTY
+    from readers import pcsc
+
+READER = 'ACS ACR122U 00 00'
+UID = [0x04, 0xA2, 0x3F, 0x90, 0x00]
+
+
+@pytest.fixture
+def scard():
+    names = ('SCardEstablishContext', 'SCardListReaders', 'SCardGetStatusChange', 'SCardConnect',
+             'SCardTransmit', 'SCardDisconnect', 'SCardReleaseContext')
+    with patch.multiple(pcsc, **dict((name, DEFAULT) for name in names)) as mocks:
+        mocks['SCardEstablishContext'].return_value = (pcsc.SCARD_S_SUCCESS, 1)
+        mocks['SCardListReaders'].return_value = (pcsc.SCARD_S_SUCCESS, [READER])
+        mocks['SCardConnect'].return_value = (pcsc.SCARD_S_SUCCESS, 2, pcsc.SCARD_PROTOCOL_T1)
+        mocks['SCardTransmit'].return_value = (pcsc.SCARD_S_SUCCESS, UID)
+        yield mocks
+
+
+def status(*reader_states):
+    return pcsc.SCARD_S_SUCCESS, [(reader, state, []) for reader, state in reader_states]
+
+
+def test_context_is_kept_across_reads(scard):
+    present = pcsc.SCARD_STATE_PRESENT | pcsc.SCARD_STATE_CHANGED
+    scard['SCardGetStatusChange'].side_effect = [
+        status((READER, present), (pcsc.PNP_NOTIFICATION, 0)),
+        status((READER, SCARD_STATE_EMPTY | pcsc.SCARD_STATE_CHANGED), (pcsc.PNP_NOTIFICATION, 0)),
+        status((READER, present), (pcsc.PNP_NOTIFICATION, 0)),
+    ]
+    reader = pcsc.PcscReader()
+    assert reader.readCard() == '04A23F9000'
+    assert reader.readCard() == '04A23F9000'
+    scard['SCardEstablishContext'].assert_called_once()
+    scard['SCardListReaders'].assert_called_once()
+    assert scard['SCardDisconnect'].call_count == 2
+
+
+def test_poll_reads_uid_once_while_present(scard):
+    present = pcsc.SCARD_STATE_PRESENT
+    scard['SCardGetStatusChange'].side_effect = [
+        status((READER, present | pcsc.SCARD_STATE_CHANGED), (pcsc.PNP_NOTIFICATION, 0)),
+        (pcsc.SCARD_E_TIMEOUT, []),
+        status((READER, SCARD_STATE_EMPTY | pcsc.SCARD_STATE_CHANGED), (pcsc.PNP_NOTIFICATION, 0)),
+    ]
+    reader = pcsc.PcscReader()
+    assert reader.pollCard() == '04A23F9000'
+    assert reader.pollCard() == '04A23F9000'
+    assert reader.pollCard() is None
+    scard['SCardTransmit'].assert_called_once()
+
+
+def test_readers_are_listed_again_on_pnp_notification(scard):
+    scard['SCardListReaders'].side_effect = [(pcsc.SCARD_E_NO_READERS_AVAILABLE, []),
+                                             (pcsc.SCARD_S_SUCCESS, [READER])]
+    scard['SCardGetStatusChange'].return_value = status((pcsc.PNP_NOTIFICATION, pcsc.SCARD_STATE_CHANGED))
+    reader = pcsc.PcscReader()
+    assert reader.pollCard() is None
+    assert [state[0] for state in reader.states] == [READER, pcsc.PNP_NOTIFICATION]
@@ -0,0 +1,56 @@
+import pytest
+from mock import patch
+
+pytest.importorskip('serial')
+from readers.rdm6300 import Rdm6300FrameDecoder, format_card_id, wiegand26  # noqa: E402
+
+CARD = '070067315809'
+OTHER = '0700673158'
+
+
+def frame(data):
+    checksum = 0
+    for value in bytearray.fromhex(data):
+        checksum ^= value
+    return b'\x02' + '{data}{checksum:02X}'.format(data=data, checksum=checksum).encode() + b'\x03'
+
+
+@pytest.fixture
+def clock():
+    with patch('time.monotonic') as monotonic:
+        monotonic.return_value = 100.0
+        yield monotonic
+
+
+def test_checksum_is_checked():
+    assert list(wiegand26(CARD)) == [0x07, 0x00, 0x67, 0x31, 0x58]
+    assert wiegand26('070067315808') is None
+
+
+def test_number_formats():
+    assert format_card_id(CARD) == CARD
+    assert format_card_id(CARD, 'card_id_dec') == '0006762840'
+    assert format_card_id(CARD, 'card_id_float') == '103,12632'
+
+
+def test_frames_split_over_reads_and_garbage(clock):
+    decoder = Rdm6300FrameDecoder()
+    data = b'\x00\x17' + frame('0700673158')
+    assert decoder.feed(data[:7]) == []
+    assert decoder.feed(data[7:]) == [CARD]
+
+
+def test_wrong_checksum_is_dropped(clock):
+    decoder = Rdm6300FrameDecoder()
+    assert decoder.feed(b'\x02070067315808\x03' + frame('1200AB34CD')) == ['1200AB34CD40']
+
+
+def test_repeated_frames_are_reported_once(clock):
+    decoder = Rdm6300FrameDecoder(hold_time=0.5)
+    assert decoder.feed(frame(OTHER) * 3) == [CARD]
+    clock.return_value += 0.2
+    assert decoder.feed(frame(OTHER)) == []
+    assert decoder.present() == CARD
+    clock.return_value += 0.6
+    assert decoder.present() is None
+    assert decoder.feed(frame(OTHER)) == [CARD]
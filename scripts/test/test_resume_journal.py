@@ -0,0 +1,91 @@
+import pytest
+from mock import Mock, patch
+
+from CardAssignments import CardAssignments
+from mpd_state import PlayerState
+from ResumeJournal import ResumeCheckpointer, ResumeJournal
+
+
+def write(path, content):
+    with open(str(path), 'w') as f:
+        f.write(content)
+
+
+def paused(song, elapsed, received):
+    return PlayerState({'state': 'pause', 'song': song, 'elapsed': elapsed}, received=received)
+
+
+@pytest.fixture
+def cards(tmp_path):
+    write(tmp_path / 'cards.txt', '[1234]\nuri = Book\nresume = 1\n\n[5678]\nuri = Music\nresume = 0\n')
+    return CardAssignments.read(str(tmp_path / 'cards.txt'))
+
+
+@pytest.fixture
+def journal(cards):
+    return ResumeJournal(cards.path + '.journal')
+
+
+@pytest.fixture
+def checkpointer(cards, journal):
+    checkpointer = ResumeCheckpointer(cards, journal, Mock(), max_entries=2)
+    with patch('ResumeJournal.time.monotonic', return_value=100):
+        checkpointer.card_started(1234)
+    return checkpointer
+
+
+def test_replay_skips_a_truncated_line(journal):
+    journal.append('1234', '0', '1.000')
+    journal.append('5678', '2', '3.000')
+    journal.append('1234', '1', '4.500')
+    with open(journal.path, 'a') as f:
+        f.write('{"cardid":"5678","so')
+
+    replayed = ResumeJournal(journal.path)
+    assert replayed.replay() == {'1234': ('1', '4.500'), '5678': ('2', '3.000')}
+    assert replayed.entries == 4
+
+
+def test_clear_removes_the_journal(journal):
+    assert journal.replay() == {}
+    journal.append('1234', '0', '1.000')
+    journal.clear()
+    assert journal.entries == 0
+    assert journal.replay() == {}
+
+
+def test_states_from_before_the_card_are_ignored(checkpointer, journal):
+    checkpointer.checkpoint(paused('3', '20.0', received=99))
+    assert journal.entries == 0
+
+    checkpointer.checkpoint(paused('1', '12.5', received=101))
+    assert journal.replay() == {'1234': ('1', '12.500')}
+    checkpointer.card_stopped()
+    checkpointer.checkpoint(paused('2', '1.0', received=102))
+    assert journal.entries == 1
+
+
+def test_only_cards_with_resume_are_recorded(checkpointer, cards, journal):
+    with patch('ResumeJournal.time.monotonic', return_value=100):
+        checkpointer.card_started(5678)
+    checkpointer.checkpoint(paused('1', '12.5', received=101))
+    assert journal.entries == 0
+    assert cards.get(5678, 'resume_song') == -1
+
+
+def test_unchanged_position_is_not_appended(checkpointer, journal):
+    checkpointer.checkpoint(paused('1', '12.5', received=101))
+    checkpointer.checkpoint(paused('1', '12.5', received=102))
+    assert journal.entries == 1
+    assert not checkpointer.cardAssignments.dirty
+
+
+def test_journal_is_compacted_into_the_card_assignments(checkpointer, journal, cards):
+    for elapsed in ('1.0', '2.0', '3.0'):
+        checkpointer.checkpoint(paused('1', elapsed, received=101))
+
+    assert journal.entries == 0
+    assert journal.replay() == {}
+    saved = CardAssignments.read(cards.path)
+    assert saved.get(1234, 'resume_elapsed') == 3.0
+    assert saved.get(1234, 'resume_song') == 1